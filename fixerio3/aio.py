@@ -0,0 +1,410 @@
+"""
+This file provides asyncio counterparts of the get_rates and convert modules and of the
+Fixerio class. Requests are made with aiohttp (pip install fixerio3[async]) so they do
+not block the event loop, and AsyncFixerio uses the same cache as Fixerio.
+
+async get_rates(date: str = DEFAULT_DATE, base: str = DEFAULT_BASE, symbols: str = None) -> dict:
+async convert(amount: float, target: str, base: str = DEFAULT_BASE, date: str = DEFAULT_DATE) -> float:
+"""
+
+import asyncio
+import time
+from fixerio3.exceptions import FixerioException
+from fixerio3.exceptions import FixerioInvalidCurrency
+from fixerio3.exceptions import FixerioApiError
+from fixerio3.fixerio import DEFAULT_BASE
+from fixerio3.fixerio import DEFAULT_DATE
+from fixerio3.fixerio import OPEN_BASE_URL
+from fixerio3.fixerio import PAID_BASE_URL
+from fixerio3.fixerio import Fixerio
+from fixerio3.fixerio import MAX_TIMESERIES_DAYS
+from fixerio3.fixerio import _build_request
+from fixerio3.fixerio import _date_range
+from fixerio3.fixerio import _format_currency
+from fixerio3.fixerio import _check_response
+from fixerio3.fixerio import LATEST
+from fixerio3.fixerio import StaleRates
+from fixerio3.transport import DEFAULT_BACKOFF
+from fixerio3.transport import DEFAULT_POOL_SIZE
+from fixerio3.transport import DEFAULT_RETRIES
+from fixerio3.transport import DEFAULT_TIMEOUT
+from fixerio3.transport import RETRY_STATUS
+from fixerio3.transport import check_status
+from fixerio3.metrics import DEFAULT_METRICS
+from fixerio3.analytics import RangeIndex
+from fixerio3.utils import AsyncBatcher
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+# Modify DEFAULT_CONCURRENCY to change how many requests gather_rates runs at once
+DEFAULT_CONCURRENCY = 10
+
+
+def _new_client_session(pool_size=DEFAULT_POOL_SIZE):
+    """ Returns an aiohttp.ClientSession keeping up to pool_size connections alive per host """
+    if aiohttp is None:
+        raise ImportError("The asyncio client requires aiohttp. Install it with 'pip install fixerio3[async]'")
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit_per_host=pool_size))
+
+
+def _client_timeout(timeout):
+    """ Converts a requests style timeout (seconds or a (connect, read) tuple) to aiohttp's """
+    if isinstance(timeout, tuple):
+        return aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+    return aiohttp.ClientTimeout(total=timeout)
+
+
+async def fetch_json(session, url, params=None, timeout=DEFAULT_TIMEOUT,
+                     retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, metrics=None) -> dict:
+    """ Performs a GET request on url and returns the decoded json body, retrying with
+        exponential backoff on connection errors, 5xx and rate limiting (429) responses.
+        Every attempt is recorded in metrics (a metrics.Metrics) if given """
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        status, size = None, 0
+        try:
+            async with session.get(url, params=params, timeout=_client_timeout(timeout)) as response:
+                status = response.status
+                body = await response.read()
+                size = len(body)
+                if status not in RETRY_STATUS or attempt >= retries:
+                    check_status(status)
+                    json_data = await response.json(content_type=None)
+                    if metrics is not None:
+                        metrics.record_request(url, time.perf_counter() - start, status, size, json_data)
+                    return json_data
+            if metrics is not None:
+                metrics.record_request(url, time.perf_counter() - start, status, size)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError, ValueError, FixerioApiError) as e:
+            if metrics is not None:
+                metrics.record_request(url, time.perf_counter() - start, status, size, error=e)
+            if attempt >= retries or isinstance(e, (ValueError, FixerioApiError)):
+                raise
+        await asyncio.sleep(backoff * (2 ** attempt))
+        attempt += 1
+
+
+async def get_rates(date: str=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None,
+                    paid_membership=False, access_key=None, session=None, timeout=DEFAULT_TIMEOUT,
+                    metrics=DEFAULT_METRICS) -> dict:
+    """ Fetches rates for the given parameters (NO CACHING)
+        Same parameters as fixerio.get_rates, except that session is an aiohttp.ClientSession.
+        If session is omitted, a new one is opened and closed for this call only.
+    """
+    if paid_membership:
+        if access_key is not None:
+            base_url = PAID_BASE_URL
+        else:
+            raise FixerioException('When using the paid membership an API kEY must also be provided.')
+    else:
+        base_url = OPEN_BASE_URL
+        access_key = None
+
+    if not (isinstance(symbols, (list, str)) or (symbols is None)):
+        raise ValueError(""" Invalid value entered for the symbols parameter.
+                                     Check your input and try again """)
+    url, payload = _build_request(base_url, date, base, symbols, access_key)
+    if session is None:
+        async with _new_client_session() as session:
+            json_data = await fetch_json(session, url, params=payload, timeout=timeout, metrics=metrics)
+    else:
+        json_data = await fetch_json(session, url, params=payload, timeout=timeout, metrics=metrics)
+    return _check_response(json_data)['rates']
+
+
+async def convert(amount: float, target: str, base: str=DEFAULT_BASE, date=DEFAULT_DATE,
+                  paid_membership=False, access_key=None, session=None, timeout=DEFAULT_TIMEOUT,
+                  metrics=DEFAULT_METRICS) -> float:
+    """ Converts an amount from the base currency to the target currency (NO CACHING)
+        Same parameters as fixerio.convert, except that session is an aiohttp.ClientSession.
+    """
+    if base == target:
+        return amount
+    conversion_rate = await get_rates(date=date, base=base, symbols=target,
+                                      paid_membership=paid_membership, access_key=access_key,
+                                      session=session, timeout=timeout, metrics=metrics)
+    return float(amount) * conversion_rate[target]
+
+
+class AsyncFixerio(Fixerio):
+    """
+    asyncio counterpart of the Fixerio class.
+    Takes the same parameters plus max_concurrency (the number of requests gather_rates
+    and the other bulk methods run at once) and shares the Fixerio cache, so get_rates,
+    convert, convert_many, convert_minor_units, get_timeseries, fluctuation and stats
+    must be awaited. Concurrent tasks asking for the same table are merged into one
+    request like the threads of a Fixerio (see batch_window).
+
+    The aiohttp session is opened on first use; call 'await close()' or use the object
+    as an async context manager to release it.
+    """
+
+    def __init__(self, *args, max_concurrency=DEFAULT_CONCURRENCY, **kwargs):
+        self._pool_size = kwargs.get('pool_size', DEFAULT_POOL_SIZE)
+        self._retries = kwargs.get('retries', DEFAULT_RETRIES)
+        self._backoff = kwargs.get('backoff', DEFAULT_BACKOFF)
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+        self._tasks = set()
+        Fixerio.__init__(self, *args, **kwargs)
+        self._batcher = AsyncBatcher(self._batcher.window)
+
+    def _new_session(self, pool_size, retries, backoff):
+        """ The aiohttp session must be created inside the event loop, see _get_session """
+        return None
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = _new_client_session(self._pool_size)
+        return self._session
+
+    def start_prefetch(self, bases, symbols=None, **kwargs):
+        """ Not available on the asyncio client: the prefetch thread would need a blocking session """
+        raise NotImplementedError('start_prefetch is only available on Fixerio objects')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """ Closes the aiohttp session if it is owned by this object and the connections of
+            the cache backend """
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._journal is not None:
+            self._journal.close()
+        self._cache.close()
+
+    async def get_rates(self, date: str=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None) -> dict:
+        """ Returns rates from cache if available, otherwise from the API (see Fixerio.get_rates) """
+        return await self._rates(self._key(date, base, symbols))
+
+    async def _rates(self, key):
+        """ Returns the rates of a RequestKey, derived from the pivot table when triangulating """
+        if self._triangulate:
+            table = await self._get_table(key._replace(base=self._pivot, symbols=None))
+            rates = self._cross_rates(table, key.base, key.symbols)
+            return StaleRates(rates, table.date, table.age) if isinstance(table, StaleRates) else rates
+        return await self._get_table(key)
+
+    async def _get_table(self, key):
+        """ Returns the rates of a RequestKey from cache if available, otherwise from the API """
+        cached = self._cached(key.base, key.symbols, key.date)
+        if cached is not None:
+            return cached
+        if key.latest and self._stale_while_revalidate:
+            stale = self._stale(key)
+            if stale is not None:
+                if self._start_revalidation(key):
+                    task = asyncio.ensure_future(self._run_revalidation(key))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                return stale
+        return await self._request_table(key)
+
+    async def _run_revalidation(self, key):
+        """ Refreshes the table of key (see Fixerio._run_revalidation) """
+        try:
+            await self._request_table(key)
+        except Exception as e:
+            self._metrics.record_revalidation(key.base, key.date, e)
+        else:
+            self._metrics.record_revalidation(key.base, key.date)
+
+    async def _request_table(self, key):
+        """ Returns the rates of a RequestKey from the API (unless the request recently failed).
+            Concurrent tasks asking for the same base and date are merged by the batcher """
+        self._negative.check(key)
+        symbols = None if key.symbols is None else frozenset(key.symbols)
+        try:
+            table = await self._batcher.do(key._replace(symbols=None), symbols, self._fetch)
+        except FixerioApiError as e:
+            self._negative.add(key, e)
+            raise
+        return self._select(table, key.symbols)
+
+    async def _fetch(self, key, symbols):
+        """ Requests the rates of symbols (None: all) of the table of key (see Fixerio._fetch) """
+        with self._lock:
+            table = self._cache.peek(key.base, key.date)
+            if table is not None and self._in_cache(key.base, symbols and list(symbols), key.date, table):
+                return table
+            symbols = self._request_symbols(key, symbols)
+        url, payload = _build_request(self._base_url, LATEST if key.latest else key.date, key.base,
+                                      symbols, self._access_key)
+        return self._from_response(await self._call_api_async(url, payload), key)
+
+    async def _call_api_async(self, url, payload):
+        """ Requests url through the circuit breaker (see Fixerio._call_api) """
+        self._breaker.before()
+        try:
+            json_data = _check_response(await fetch_json(self._get_session(), url, params=payload,
+                                                         timeout=self._timeout, retries=self._retries,
+                                                         backoff=self._backoff, metrics=self._metrics))
+        except Exception as e:
+            self._breaker.record(e)
+            raise
+        self._breaker.record()
+        return json_data
+
+    async def convert(self, amount, target, base=DEFAULT_BASE, date=DEFAULT_DATE):
+        """ Converts an amount from the base currency to the target currency (see Fixerio.convert) """
+        try:
+            if target is None:
+                raise FixerioInvalidCurrency("Enter a valid 'target' currency")
+            key = self._key(date, base, target)
+            if self._exact:
+                table = self._identity(base) if base == target else await self._exact_table(key)
+                return table.convert(amount, base, target)
+            if base == target:
+                return float(amount)
+            conversion_rate = self._cached(base, key.symbols, key.date)
+            if conversion_rate is None:
+                conversion_rate = await self._rates(key)
+            return float(amount) * float(conversion_rate[target])
+        except ValueError as e:
+            raise ValueError('Please enter a valid numeric amount to convert') from e
+        except TypeError as e:
+            raise TypeError('Please enter valid currency codes.') from e
+
+    async def _exact_table(self, key):
+        """ Returns the ExactTable of a RequestKey, fetching its rates if they are not cached """
+        table = self._cached_exact(key)
+        if table is not None:
+            self._metrics.record_cache(True, key.base, key.date)
+            return table
+        return self._exact_from(key, await self._rates(key))
+
+    async def convert_many(self, amounts, targets, bases=DEFAULT_BASE, dates=DEFAULT_DATE):
+        """ Converts many amounts at once (see Fixerio.convert_many). The tables of the
+            (base, date) groups are fetched concurrently, max_concurrency at a time """
+        rows, groups = self._conversion_rows(amounts, targets, bases, dates)
+
+        async def table(base, date, group):
+            symbols = sorted(group.difference({base}))
+            if not symbols:
+                return self._identity(base) if self._exact else dict()
+            if self._exact:
+                return await self._limited(self._exact_table(self._key(date, base, symbols)))
+            return await self._limited(self.get_rates(date=date, base=base, symbols=symbols))
+
+        tables = await asyncio.gather(*(table(base, date, group) for (base, date), group in groups.items()))
+        rates = dict()
+        for ((base, date), group), rates_table in zip(groups.items(), tables):
+            self._group_rates(rates, base, date, group, rates_table)
+        return self._converted(amounts, rows, rates)
+
+    async def convert_minor_units(self, amounts, target, base=DEFAULT_BASE, date=DEFAULT_DATE):
+        """ Converts integer amounts in minor units of base to minor units of target, exactly
+            (see Fixerio.convert_minor_units) """
+        if target is None:
+            raise FixerioInvalidCurrency("Enter a valid 'target' currency")
+        key = self._key(date, base, target)
+        table = self._identity(base) if base == target else await self._exact_table(key)
+        return self._minor_units(table, amounts, base, target)
+
+    async def _limited(self, awaitable):
+        """ Awaits awaitable while fewer than max_concurrency others are awaited """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        async with self._semaphore:
+            return await awaitable
+
+    async def _fetch_timeseries(self, start, end, base, symbols):
+        """ Requests one chunk of the timeseries endpoint and caches every table it contains """
+        json_data = await self._call_api_async(*self._timeseries_request(start, end, base, symbols))
+        return self._cache_timeseries(json_data, base)
+
+    async def get_timeseries(self, start, end=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None) -> dict:
+        """ Returns the rates of every day between start and end (see Fixerio.get_timeseries),
+            running at most max_concurrency requests at once """
+        first, last = self._check_range(start, end, base, symbols)
+        series = dict()
+        fetched = []
+        if self._paid_membership and not self._triangulate:
+            chunks = await asyncio.gather(*(self._limited(self._fetch_timeseries(chunk_start, chunk_end, base,
+                                                                                 _format_currency(symbols)))
+                                            for chunk_start, chunk_end in _date_range(first, last,
+                                                                                      MAX_TIMESERIES_DAYS)))
+            for chunk in chunks:
+                series.update(chunk)
+            fetched = [(base, date, rates) for date, rates in series.items()]
+        else:
+            # get_rates already persists every table it fetches
+            days = [str(day) for day, _ in _date_range(first, last)]
+            tables = await asyncio.gather(*(self._limited(self.get_rates(date=day, base=base, symbols=symbols))
+                                            for day in days))
+            series.update(zip(days, tables))
+        if self._cache_to_file:
+            self._persist(fetched)
+        return series
+
+    async def _history(self, days, base, symbols):
+        """ Returns the {date: rates} tables of the resolved business days 'days' (see
+            Fixerio._history), running at most max_concurrency requests at once """
+        missing, chunks = self._missing_days(days, base, symbols)
+        if chunks is not None:
+            fetched = await asyncio.gather(*(self._limited(self._fetch_timeseries(chunk_start, chunk_end,
+                                                                                  base, symbols))
+                                             for chunk_start, chunk_end in chunks))
+            if self._cache_to_file:
+                self._persist([(base, date, rates) for chunk in fetched for date, rates in chunk.items()])
+        elif missing:
+            await asyncio.gather(*(self._limited(self.get_rates(date=day, base=base, symbols=symbols))
+                                   for day in missing))
+        dates = self._history_dates(days)
+        tables = await asyncio.gather(*(self.get_rates(date=date, base=base, symbols=symbols) for date in dates))
+        return dict(zip(dates, tables))
+
+    async def _range_indexes(self, start, end, base, symbols):
+        """ Returns the first and last table dates of the range start to end and the
+            {currency: RangeIndex} covering them (see Fixerio._range_indexes) """
+        key, first_table, indexes, days = self._range_key(start, end, base, symbols)
+        if indexes is None:
+            indexes = self._index_history(key, await self._history(days, base, key.symbols))
+        return first_table, key.date, indexes
+
+    async def fluctuation(self, start, end=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None) -> dict:
+        """ Returns how the rates changed between start and end (see Fixerio.fluctuation) """
+        return self._query_indexes(*await self._range_indexes(start, end, base, symbols), RangeIndex.fluctuation)
+
+    async def stats(self, start, end=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None) -> dict:
+        """ Returns the statistics of the rates between start and end (see Fixerio.stats) """
+        return self._query_indexes(*await self._range_indexes(start, end, base, symbols), RangeIndex.summary)
+
+    async def get_matrix(self, date: str=DEFAULT_DATE):
+        """ Returns the cross-rate matrix of a date (see Fixerio.get_matrix) """
+        key = self._key(date, self._pivot, None)
+        await self._get_table(key)
+        return self._build_matrix(key.date, [self._pivot])
+
+    async def gather_rates(self, dates, bases, symbols=None) -> dict:
+        """
+        Fetches the rates of every (date, base) pair concurrently, running at most
+        max_concurrency requests at once. Pairs already in the cache are not requested.
+
+        dates
+            :param dates: dates to quote rates on
+            :type: list of str in the format 'yyyy-mm-dd' or 'latest'
+
+        bases
+            :param bases: currencies to quote rates against
+            :type: list of str (e.g. ['USD', 'EUR'])
+
+        symbols
+            :param symbols: currency symbols to request specific exchange rates for
+            :type: str or list e.g. 'USD,JPY,EUR' or [USD, JPY, EUR]
+
+        :return dict: a dictionary mapping every (date, base) pair to its rates
+        """
+        pairs = [(date, base) for date in dates for base in bases]
+        results = await asyncio.gather(*(self._limited(self.get_rates(date=date, base=base, symbols=symbols))
+                                         for date, base in pairs))
+        return dict(zip(pairs, results))
@@ -0,0 +1,109 @@
+"""
+This file provides the range indexes behind Fixerio.fluctuation and Fixerio.stats.
+A RangeIndex is built once from the daily rates of one currency and then answers the
+sum, mean, standard deviation, minimum and maximum of any range of days in O(1): sums
+come from prefix sums, minimums and maximums from sparse tables (the position of the
+extreme of every run of 2**k days, so that any range is covered by two overlapping runs).
+
+RangeIndex(dates, values)
+"""
+
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from math import sqrt
+
+
+def _sparse_table(values, better):
+    """ Returns the levels of a sparse table: level k holds, for every position i, the
+        position of the best value (according to better) of values[i:i + 2**k] """
+    levels = [array('l', range(len(values)))]
+    width = 1
+    while 2 * width <= len(values):
+        previous = levels[-1]
+        level = array('l', previous[:len(values) - 2 * width + 1])
+        for i in range(len(level)):
+            j = previous[i + width]
+            if better(values[j], values[level[i]]):
+                level[i] = j
+        levels.append(level)
+        width *= 2
+    return levels
+
+
+class RangeIndex:
+    """
+    Range statistics of the rates of one currency.
+
+    dates: sorted 'yyyy-mm-dd' dates of the rates
+    values: the rate of every date
+    """
+
+    def __init__(self, dates, values):
+        if len(dates) != len(values):
+            raise ValueError('dates and values must have the same length')
+        self.dates = list(dates)
+        self.values = array('d', values)
+        self._sums = array('d', [0.0]) * (len(values) + 1)
+        self._squares = array('d', [0.0]) * (len(values) + 1)
+        total = squares = 0.0
+        for i, value in enumerate(self.values):
+            total += value
+            squares += value * value
+            self._sums[i + 1] = total
+            self._squares[i + 1] = squares
+        self._min = _sparse_table(self.values, lambda a, b: a < b)
+        self._max = _sparse_table(self.values, lambda a, b: a > b)
+
+    def __len__(self):
+        return len(self.values)
+
+    def span(self, start, end):
+        """ Returns the positions (i, j) of the first and last dates between start and end
+            (both included), None if no date is in that range """
+        i = bisect_left(self.dates, start)
+        j = bisect_right(self.dates, end) - 1
+        return (i, j) if i <= j else None
+
+    def _extreme(self, levels, i, j, better):
+        k = (j - i + 1).bit_length() - 1
+        a, b = levels[k][i], levels[k][j - (1 << k) + 1]
+        return b if better(self.values[b], self.values[a]) else a
+
+    def argmin(self, i, j):
+        """ Position of the smallest value between positions i and j (both included) """
+        return self._extreme(self._min, i, j, lambda a, b: a < b)
+
+    def argmax(self, i, j):
+        """ Position of the largest value between positions i and j (both included) """
+        return self._extreme(self._max, i, j, lambda a, b: a > b)
+
+    def sum(self, i, j):
+        return self._sums[j + 1] - self._sums[i]
+
+    def mean(self, i, j):
+        return self.sum(i, j) / (j - i + 1)
+
+    def stdev(self, i, j):
+        """ Population standard deviation of the values between positions i and j """
+        count = j - i + 1
+        mean = self.sum(i, j) / count
+        variance = (self._squares[j + 1] - self._squares[i]) / count - mean * mean
+        return sqrt(max(variance, 0.0))
+
+    def fluctuation(self, i, j):
+        """ Returns the fluctuation between positions i and j like the fixer.io endpoint """
+        start_rate, end_rate = self.values[i], self.values[j]
+        change = end_rate - start_rate
+        return {'start_rate': start_rate, 'end_rate': end_rate, 'change': change,
+                'change_pct': change / start_rate * 100 if start_rate else None}
+
+    def summary(self, i, j):
+        """ Returns every statistic of the values between positions i and j """
+        low, high = self.argmin(i, j), self.argmax(i, j)
+        summary = {'start_date': self.dates[i], 'end_date': self.dates[j], 'count': j - i + 1,
+                   'min': self.values[low], 'min_date': self.dates[low],
+                   'max': self.values[high], 'max_date': self.dates[high],
+                   'mean': self.mean(i, j), 'stdev': self.stdev(i, j)}
+        summary.update(self.fluctuation(i, j))
+        return summary
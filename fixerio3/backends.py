@@ -0,0 +1,192 @@
+"""
+This file provides cache backends that share rate tables between processes, so that a
+table fetched by one worker is served from the cache by every other worker.
+Pass an instance as the 'cache' parameter of Fixerio. The in-memory backend is
+utils.Cache (the default).
+
+SQLiteCache(file): every process on a host opening the same SQLite file shares the cache
+RedisCache(client=None, url=None, prefix=DEFAULT_PREFIX): shares the cache through a
+    Redis (or Redis protocol compatible) server. Requires the redis package
+    (pip install fixerio3[redis]) unless a client object is passed in.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from fixerio3.utils import CacheBackend
+
+# Modify DEFAULT_PREFIX to change the prefix of the keys RedisCache stores
+DEFAULT_PREFIX = 'fixerio3:'
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache backend storing tables in an SQLite database file, shared by every process
+    (and thread) opening the same file. Tables are stored as json text, and expired
+    tables are deleted whenever a table is stored. Every thread gets its own connection,
+    all of them are closed by close().
+    """
+
+    def __init__(self, file, timeout=30.0, clock=time.time):
+        self.file = file
+        self._timeout = timeout
+        self._clock = clock
+        self._connections = dict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS rates (base TEXT NOT NULL, date TEXT NOT NULL, '
+                               'rates TEXT NOT NULL, expires REAL, PRIMARY KEY (base, date))')
+            connection.execute('CREATE INDEX IF NOT EXISTS rates_expires ON rates (expires)')
+
+    def _connection(self):
+        """ Returns the connection of the current thread (sqlite3 connections are not thread
+            safe), opening it on first use """
+        thread = threading.get_ident()
+        connection = self._connections.get(thread)
+        if connection is None:
+            # only used by this thread, but closed by whichever thread calls close()
+            connection = sqlite3.connect(self.file, timeout=self._timeout, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            with self._lock:
+                self._connections[thread] = connection
+        return connection
+
+    def count(self, base, date, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def peek(self, base, date):
+        row = self._connection().execute('SELECT rates FROM rates WHERE base = ? AND date = ? '
+                                         'AND (expires IS NULL OR expires > ?)',
+                                         (base, date, self._clock())).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def get(self, base, date):
+        rates = self.peek(base, date)
+        self.count(base, date, rates is not None)
+        return rates
+
+    def set(self, base, date, rates, expires=None):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM rates WHERE expires <= ?', (self._clock(),))
+            connection.execute('INSERT OR REPLACE INTO rates (base, date, rates, expires) VALUES (?, ?, ?, ?)',
+                               (base, date, json.dumps(dict(rates)), expires))
+
+    def delete(self, base, date):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM rates WHERE base = ? AND date = ?', (base, date))
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM rates')
+
+    def items(self):
+        rows = self._connection().execute('SELECT base, date, rates FROM rates WHERE expires IS NULL OR expires > ? '
+                                          'ORDER BY base, date', (self._clock(),))
+        return [((base, date), json.loads(rates)) for base, date, rates in rows]
+
+    def stats(self):
+        entries = self._connection().execute('SELECT COUNT(*) FROM rates WHERE expires IS NULL OR expires > ?',
+                                             (self._clock(),)).fetchone()[0]
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        """ Closes the connections of every thread. A new one is opened by the next call """
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache backend storing tables as json strings under '<prefix><base>:<date>' keys of a
+    Redis server, expiring them with the server's own TTLs.
+
+    client: any object with the get, set(name, value, ex=None), delete and scan_iter
+    methods of redis.Redis (e.g. a redis.Redis instance). If omitted, one is created from
+    url (e.g. 'redis://localhost:6379/0') with the redis package, and closed by close().
+    """
+
+    def __init__(self, client=None, url=None, prefix=DEFAULT_PREFIX, clock=time.time):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("RedisCache requires the redis package. "
+                                  "Install it with 'pip install fixerio3[redis]'") from e
+            client = redis.Redis.from_url(url) if url is not None else redis.Redis()
+            self._owns_client = True
+        else:
+            self._owns_client = False
+        self._client = client
+        self._prefix = prefix
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, base, date):
+        return '{}{}:{}'.format(self._prefix, base, date)
+
+    def peek(self, base, date):
+        value = self._client.get(self._key(base, date))
+        return None if value is None else json.loads(value)
+
+    def get(self, base, date):
+        rates = self.peek(base, date)
+        self.count(base, date, rates is not None)
+        return rates
+
+    def count(self, base, date, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def set(self, base, date, rates, expires=None):
+        ttl = None
+        if expires is not None:
+            ttl = max(1, int(expires - self._clock()))
+        self._client.set(self._key(base, date), json.dumps(dict(rates)), ex=ttl)
+
+    def delete(self, base, date):
+        self._client.delete(self._key(base, date))
+
+    def _keys(self):
+        keys = []
+        for key in self._client.scan_iter(match=self._prefix + '*'):
+            if isinstance(key, bytes):
+                key = key.decode('utf-8')
+            keys.append(key)
+        return keys
+
+    def clear(self):
+        keys = self._keys()
+        if keys:
+            self._client.delete(*keys)
+
+    def items(self):
+        items = []
+        for key in sorted(self._keys()):
+            base, date = key[len(self._prefix):].split(':', 1)
+            rates = self.peek(base, date)
+            if rates is not None:
+                items.append(((base, date), rates))
+        return items
+
+    def stats(self):
+        return {'entries': len(self._keys()), 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        """ Closes the connections of the client if it was created by this object """
+        if self._owns_client:
+            self._client.close()
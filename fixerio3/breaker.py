@@ -0,0 +1,176 @@
+"""
+This file provides the circuit breaker and the negative cache Fixerio uses so that a
+failing API is not called over and over again.
+
+CircuitBreaker(failure_threshold=DEFAULT_FAILURE_THRESHOLD, recovery_time=DEFAULT_RECOVERY_TIME,
+               half_open_calls=DEFAULT_HALF_OPEN_CALLS)
+    Opens after failure_threshold consecutive failures of the transport (connection
+    errors, timeouts, invalid responses, 5xx and 429 statuses) or of the account
+    (TRIP_CODES, e.g. 104 when the monthly quota is exhausted, which opens it at once).
+    While open every call fails fast with FixerioCircuitOpen. After recovery_time seconds
+    it is half-open: up to half_open_calls probe calls are let through, the circuit
+    closes if they succeed and opens again if they fail.
+
+NegativeCache(ttls=NEGATIVE_TTL, max_entries=DEFAULT_NEGATIVE_ENTRIES)
+    Remembers the API error of a request (keyed on base, date and symbols) for the number
+    of seconds NEGATIVE_TTL gives for its error code, so repeating the request raises an
+    equal error without calling the API.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from fixerio3.exceptions import FixerioApiError
+from fixerio3.exceptions import FixerioCircuitOpen
+
+# Modify these to change the defaults of every new circuit breaker
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIME = 30.0  # seconds the circuit stays open before probing the API
+DEFAULT_HALF_OPEN_CALLS = 1
+# API error codes counted as failures of the circuit (the account cannot make requests)
+FAILURE_CODES = (101, 102, 104)
+# API error codes opening the circuit at once, with the seconds it then stays open
+TRIP_CODES = {104: 3600.0}
+
+# Modify NEGATIVE_TTL to change how long (in seconds) the error of a request is remembered
+# per error code. Errors of codes not listed are not remembered.
+NEGATIVE_TTL = {101: 60, 102: 60, 103: 3600, 104: 300, 105: 3600, 106: 300,
+                201: 3600, 202: 3600, 301: 3600, 302: 3600}
+DEFAULT_NEGATIVE_ENTRIES = 1024
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker:
+    """ Circuit breaker around the API calls of a Fixerio object (see the module docstring) """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, recovery_time=DEFAULT_RECOVERY_TIME,
+                 half_open_calls=DEFAULT_HALF_OPEN_CALLS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_until = 0.0
+        self._probes = 0
+        self._last_code = None
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self._clock() >= self._opened_until:
+                return HALF_OPEN
+            return self._state
+
+    def _open(self, seconds):
+        self._state = OPEN
+        self._opened_until = self._clock() + seconds
+        self._probes = 0
+        self.opened += 1
+
+    def before(self):
+        """ Raises FixerioCircuitOpen if the call must not be made """
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            now = self._clock()
+            if self._state == OPEN and now >= self._opened_until:
+                self._state = HALF_OPEN
+                self._probes = 0
+            if self._state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            self.rejected += 1
+            retry_after = max(self._opened_until - now, 0.0)
+            code = self._last_code
+        raise FixerioCircuitOpen('The fixer.io API is not called for {:.0f} more seconds after repeated '
+                                 'failures (last error code: {})'.format(retry_after, code),
+                                 retry_after=retry_after, code=code)
+
+    def record(self, error=None):
+        """ Records the outcome of a call let through by before(): None if it succeeded,
+            otherwise the exception it raised """
+        with self._lock:
+            if error is None or (isinstance(error, FixerioApiError) and error.status is None
+                                 and error.code not in FAILURE_CODES):
+                # the API answered, even if with an error about the request itself
+                if self._state == HALF_OPEN:
+                    self._probes = max(self._probes - 1, 0)
+                self._state = CLOSED
+                self._failures = 0
+                return
+            self._failures += 1
+            self._last_code = getattr(error, 'code', None)
+            if self._last_code in TRIP_CODES:
+                self._open(TRIP_CODES[self._last_code])
+            elif self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open(self.recovery_time)
+
+    def reset(self):
+        """ Closes the circuit """
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def stats(self):
+        return {'circuit': self.state, 'circuit_opened': self.opened, 'circuit_rejected': self.rejected}
+
+
+def _copy(error):
+    """ Returns a new exception equal to error, so that a remembered error is not raised
+        again with the traceback and context of a previous request """
+    if isinstance(error, FixerioApiError):
+        return type(error)(*error.args, code=error.code, info=error.info, error_type=error.error_type,
+                           status=error.status)
+    return type(error)(*error.args)
+
+
+class NegativeCache:
+    """ Errors of recent API requests, keyed on the request (see the module docstring) """
+
+    def __init__(self, ttls=NEGATIVE_TTL, max_entries=DEFAULT_NEGATIVE_ENTRIES, clock=time.monotonic):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._errors = OrderedDict()
+        self.hits = 0
+
+    def __len__(self):
+        return len(self._errors)
+
+    def add(self, key, error):
+        """ Remembers error for key if its code has a time to live """
+        ttl = self.ttls.get(getattr(error, 'code', None))
+        if not ttl:
+            return
+        with self._lock:
+            self._errors[key] = (self._clock() + ttl, error)
+            self._errors.move_to_end(key)
+            while len(self._errors) > self.max_entries:
+                self._errors.popitem(last=False)
+
+    def check(self, key):
+        """ Raises the error remembered for key, if any """
+        if not self._errors:
+            return
+        with self._lock:
+            entry = self._errors.get(key)
+            if entry is None:
+                return
+            if entry[0] <= self._clock():
+                del self._errors[key]
+                return
+            self.hits += 1
+        raise _copy(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._errors.clear()
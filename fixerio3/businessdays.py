@@ -0,0 +1,158 @@
+"""
+This file provides the business-day calendar Fixerio uses to resolve the dates on which
+no rates are published (weekends and TARGET holidays) to the previous publication day.
+The API answers a request for such a date with the rates, and the date, of the previous
+publication day, so without the calendar those requests would never be found in the cache.
+
+BusinessCalendar learns these requested -> effective date aliases from the responses of
+the API, resolves weekends and TARGET holidays with the calendar rules without asking the
+API, can be seeded with the aliases of a whole range and is saved as json next to the
+file cache.
+
+target_holidays(year: int) -> set:
+is_business_day(day: datetime.date) -> bool:
+previous_business_day(day: datetime.date) -> datetime.date:
+BusinessCalendar(rules=True)
+"""
+
+import json
+import os
+import threading
+from datetime import date as dtdate
+from datetime import timedelta
+from functools import lru_cache
+from fixerio3.utils import atomic_write
+
+# Modify ALIASES_SUFFIX to change the name of the file the aliases are saved to next to the file cache
+ALIASES_SUFFIX = '.aliases'
+
+
+def _easter(year):
+    """ Returns Easter Sunday of year (Gregorian calendar, anonymous algorithm) """
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return dtdate(year, month, day + 1)
+
+
+@lru_cache(maxsize=64)
+def target_holidays(year):
+    """ Returns the TARGET closing days of year, on which the ECB publishes no rates:
+        New Year's Day and Christmas Day (plus 31 December up to 2001), and from 2000 on
+        Good Friday, Easter Monday, Labour Day (1 May) and 26 December """
+    holidays = {dtdate(year, 1, 1), dtdate(year, 12, 25)}
+    if year <= 2001:
+        holidays.add(dtdate(year, 12, 31))
+    if year >= 2000:
+        easter = _easter(year)
+        holidays.update({easter - timedelta(2), easter + timedelta(1), dtdate(year, 5, 1), dtdate(year, 12, 26)})
+    return frozenset(holidays)
+
+
+def is_business_day(day):
+    """ Returns True if rates are published on day (not a weekend nor a TARGET holiday) """
+    return day.weekday() < 5 and day not in target_holidays(day.year)
+
+
+def previous_business_day(day):
+    """ Returns day if it is a business day, otherwise the last business day before it """
+    while not is_business_day(day):
+        day -= timedelta(1)
+    return day
+
+
+@lru_cache(maxsize=4096)
+def _rule(date):
+    """ Returns the last business day on or before a 'yyyy-mm-dd' date, as 'yyyy-mm-dd' """
+    try:
+        return str(previous_business_day(dtdate(*(int(x) for x in date.split('-')))))
+    except ValueError:
+        return date
+
+
+class BusinessCalendar:
+    """
+    Requested -> effective date aliases of the days on which no rates are published.
+
+    rules: whether dates without a recorded alias are resolved with the TARGET calendar
+    (see is_business_day). Recorded aliases always take precedence, so closures the rules
+    do not know about are learnt from the API.
+    """
+
+    def __init__(self, rules=True):
+        self.rules = rules
+        self._aliases = dict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._aliases)
+
+    def __contains__(self, date):
+        return date in self._aliases
+
+    def resolve(self, date):
+        """ Returns the date whose table holds the rates of 'date' ('yyyy-mm-dd') """
+        for _ in range(8):
+            effective = self._aliases.get(date)
+            if effective is None and self.rules:
+                effective = _rule(date)
+            if effective is None or effective == date:
+                return date
+            date = effective
+        return date
+
+    def record(self, requested, effective):
+        """ Records that the API answered 'requested' with the table of 'effective'.
+            Returns True if the alias is new """
+        if requested == effective:
+            return False
+        with self._lock:
+            if self._aliases.get(requested) == effective:
+                return False
+            self._aliases[requested] = effective
+            return True
+
+    def seed(self, start, end):
+        """ Records the aliases of every weekend and TARGET holiday between start and end
+            (datetime.date or 'yyyy-mm-dd', both included). Returns the number of new aliases """
+        if isinstance(start, str):
+            start = dtdate(*(int(x) for x in start.split('-')))
+        if isinstance(end, str):
+            end = dtdate(*(int(x) for x in end.split('-')))
+        added = 0
+        day = start
+        while day <= end:
+            if not is_business_day(day):
+                added += self.record(str(day), str(previous_business_day(day)))
+            day += timedelta(1)
+        return added
+
+    def as_dict(self):
+        """ Returns the recorded aliases as a {requested: effective} dictionary """
+        with self._lock:
+            return dict(self._aliases)
+
+    def update(self, aliases):
+        """ Records every alias of a {requested: effective} dictionary """
+        with self._lock:
+            self._aliases.update((k, v) for k, v in aliases.items() if k != v)
+
+    def save(self, file):
+        """ Writes the aliases to file as json (atomically) """
+        with atomic_write(file, 'w') as f:
+            json.dump(self.as_dict(), f, sort_keys=True, separators=(',', ':'))
+
+    def load(self, file):
+        """ Records the aliases saved in file, if it exists. Returns True if it was read """
+        if not os.path.exists(file):
+            return False
+        with open(file, 'r', encoding='utf-8') as f:
+            self.update(json.load(f))
+        return True
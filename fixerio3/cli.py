@@ -0,0 +1,380 @@
+"""
+Command line bulk conversion of ledgers, installed as the 'fixerio3' console command.
+
+    fixerio3 [input] [-o output] [--format csv|jsonl] [--amount-column amount]
+             [--base-column base] [--target-column target] [--date-column date]
+             [--from CUR] [--to CUR] [--on DATE] [--output-column converted]
+             [--precision N] [--skip-errors] [--workers N] [--chunk-size N]
+             [--access-key KEY] [--base-url URL] [--triangulate] [--cache FILE] [--quiet]
+
+Rows are read from a CSV (with a header) or JSONL file, or from stdin, and written in
+the same format and order with the converted amount added in --output-column. The input
+is streamed twice: a first pass collects the distinct (base, date) tables, which are all
+fetched up front (stdin is first spooled to a temporary file), then the rows are
+converted in chunks by a pool of processes sharing a read-only snapshot of those rates.
+Progress and throughput are reported on stderr.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from fixerio3.exceptions import FixerioException
+from fixerio3.fixerio import Fixerio
+from fixerio3.fixerio import DEFAULT_DATE
+from fixerio3.fixerio import DEFAULT_WORKERS
+from fixerio3.utils import _open_text
+from fixerio3.utils import _atomic_text_writer
+from fixerio3.utils import write_to_file
+
+# Modify these to change the defaults of the command line
+DEFAULT_CHUNK_SIZE = 10000
+PROGRESS_INTERVAL = 1.0  # seconds between two progress reports
+JSONL_SUFFIXES = ('.jsonl', '.ndjson', '.jsonl.gz', '.ndjson.gz')
+
+
+class Converter:
+    """
+    Converts chunks of rows with a snapshot of rates. Picklable, so that it is sent once
+    to every worker process.
+
+    fmt: 'csv' (rows are lists of str) or 'jsonl' (rows are the lines of the input)
+    columns: {field: column} of the 'amount', 'base', 'target' and 'date' fields, the
+             column being an index for csv, a key for jsonl and None if the field is fixed
+    fixed: {field: value} of the fields given for every row
+    rates: {(base, date): {target: rate}}, the date being the one of the input
+    """
+
+    def __init__(self, fmt, columns, fixed, output_column, precision=None, skip_errors=False, rates=None):
+        self.fmt = fmt
+        self.columns = columns
+        self.fixed = fixed
+        self.output_column = output_column
+        self.precision = precision
+        self.skip_errors = skip_errors
+        self.rates = rates
+
+    def _field(self, row, field):
+        column = self.columns.get(field)
+        if column is None:
+            return self.fixed.get(field, DEFAULT_DATE if field == 'date' else None)
+        value = row[column] if self.fmt == 'csv' else row.get(column)
+        if field == 'date' and value in (None, ''):
+            return self.fixed.get('date', DEFAULT_DATE)
+        return value
+
+    def parse(self, row):
+        """ Returns a csv row as is and a jsonl line as a dictionary """
+        return row if self.fmt == 'csv' else json.loads(row)
+
+    def key(self, row):
+        """ Returns the (base, date, target) of a parsed row """
+        return self._field(row, 'base'), self._field(row, 'date'), self._field(row, 'target')
+
+    def _convert(self, row):
+        base, date, target = self.key(row)
+        try:
+            rate = self.rates[(base, date)][target]
+        except KeyError:
+            raise FixerioException('No rate from {} to {} on {}'.format(base, target, date)) from None
+        converted = float(self._field(row, 'amount')) * rate
+        return converted if self.precision is None else round(converted, self.precision)
+
+    def convert_chunk(self, chunk):
+        """ Converts a chunk of rows and returns (output text, rows, errors).
+            chunk is a (number of the first row, rows) pair """
+        first, rows = chunk
+        output = io.StringIO()
+        writer = csv.writer(output) if self.fmt == 'csv' else None
+        errors = 0
+        for number, line in enumerate(rows, first):
+            row = line
+            try:
+                row = self.parse(line)
+                converted = self._convert(row)
+            except (FixerioException, ValueError, TypeError, IndexError, AttributeError) as e:
+                if not self.skip_errors:
+                    raise FixerioException('Row {}: {}'.format(number, e)) from e
+                errors += 1
+                converted = ''
+            if writer is not None:
+                writer.writerow(row + [converted])
+            else:
+                if isinstance(row, dict):
+                    row[self.output_column] = converted
+                    output.write(json.dumps(row, separators=(',', ':')))
+                else:
+                    output.write(line.rstrip('\r\n'))
+                output.write('\n')
+        return output.getvalue(), len(rows), errors
+
+
+_converter = None  # the Converter of a worker process
+
+
+def _init_worker(converter):
+    global _converter
+    _converter = converter
+
+
+def _convert_chunk(chunk):
+    return _converter.convert_chunk(chunk)
+
+
+class Progress:
+    """ Reports the rows converted and the throughput on 'stream' at most every 'interval' seconds """
+
+    def __init__(self, stream=sys.stderr, total=None, interval=PROGRESS_INTERVAL, quiet=False):
+        self.stream = stream
+        self.total = total
+        self.interval = interval
+        self.quiet = quiet
+        self.rows = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+        self._last = self.start
+
+    def message(self, text):
+        if not self.quiet:
+            print(text, file=self.stream, flush=True)
+
+    def update(self, rows, errors=0):
+        self.rows += rows
+        self.errors += errors
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            done = ' ({:.1f}%)'.format(100.0 * self.rows / self.total) if self.total else ''
+            self.message('{} rows{} converted, {:.0f} rows/s'.format(self.rows, done, self.rate(now)))
+
+    def rate(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.start
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def finish(self):
+        self.message('{} rows converted in {:.2f}s ({:.0f} rows/s), {} errors'.format(
+            self.rows, time.perf_counter() - self.start, self.rate(), self.errors))
+
+
+def _detect_format(file, fmt):
+    if fmt is not None:
+        return fmt
+    return 'jsonl' if file is not None and file.endswith(JSONL_SUFFIXES) else 'csv'
+
+
+def _spool(stream):
+    """ Copies a text stream to a temporary file and returns its name """
+    fd, name = tempfile.mkstemp(prefix='fixerio3-', suffix='.input')
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+        shutil.copyfileobj(stream, f)
+    return name
+
+
+def _read_rows(file, fmt):
+    """ Yields the csv header (None for jsonl) and then every row of file """
+    with _open_text(file, 'r') as f:
+        if fmt == 'csv':
+            reader = csv.reader(f)
+            yield next(reader, [])
+            yield from reader
+        else:
+            yield None
+            yield from (line for line in f if line.strip())
+
+
+def _chunks(rows, size):
+    """ Yields (number of the first row, list of rows) chunks of at most size rows """
+    first = 1
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield first, chunk
+        first += len(chunk)
+
+
+def _new_converter(args, header):
+    """ Returns the Converter of the command line arguments (without rates) """
+    fixed = {field: value for field, value in (('base', args.base), ('target', args.target), ('date', args.date))
+             if value is not None}
+    names = {'amount': args.amount_column, 'base': args.base_column, 'target': args.target_column,
+             'date': args.date_column}
+    columns = dict()
+    for field, name in names.items():
+        if field in fixed:
+            continue
+        if header is None:
+            columns[field] = name
+        elif name in header:
+            columns[field] = header.index(name)
+        elif field != 'date':
+            raise FixerioException("Column '{}' not found in the header of the input "
+                                   "(see --{}-column)".format(name, field))
+    return Converter(args.format, columns, fixed, args.output_column, args.precision, args.skip_errors)
+
+
+def _scan(converter, rows, progress):
+    """ Returns the {(base, date): targets} of the rows and their number """
+    tables = dict()
+    count = 0
+    for row in rows:
+        count += 1
+        try:
+            base, date, target = converter.key(converter.parse(row))
+        except (ValueError, IndexError, AttributeError) as e:
+            if not converter.skip_errors:
+                raise FixerioException('Row {}: {}'.format(count, e)) from e
+            continue
+        tables.setdefault((base, date), set()).add(target)
+    progress.message('{} rows, {} tables to look up'.format(count, len(tables)))
+    return tables, count
+
+
+def _prefetch(fixerio, tables, skip_errors, max_workers=DEFAULT_WORKERS):
+    """ Returns the {(base, date): {target: rate}} snapshot of tables, looked up at once """
+
+    def lookup(item):
+        (base, date), targets = item
+        symbols = sorted(x for x in targets if x is not None and x != base)
+        try:
+            rates = fixerio.get_rates(date=date, base=base, symbols=symbols) if symbols else dict()
+        except (FixerioException, ValueError, TypeError) as e:
+            if not skip_errors:
+                raise FixerioException('Could not get the rates of {} on {}: {}'.format(base, date, e)) from e
+            return (base, date), dict()
+        rates = {x: float(rate) for x, rate in rates.items()}
+        rates[base] = 1.0
+        return (base, date), rates
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(executor.map(lookup, tables.items()))
+
+
+def _convert(converter, chunks, out, workers, progress):
+    """ Converts the chunks, in a pool of worker processes if workers > 1, and writes
+        them to out in order """
+    if workers <= 1:
+        for chunk in chunks:
+            text, rows, errors = converter.convert_chunk(chunk)
+            out.write(text)
+            progress.update(rows, errors)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(converter,)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_convert_chunk, chunk))
+            # at most two chunks per worker are held in memory
+            while len(pending) >= 2 * workers:
+                text, rows, errors = pending.popleft().result()
+                out.write(text)
+                progress.update(rows, errors)
+        while pending:
+            text, rows, errors = pending.popleft().result()
+            out.write(text)
+            progress.update(rows, errors)
+
+
+def _new_fixerio(args):
+    kwargs = {'triangulate': args.triangulate, 'base_url': args.base_url}
+    if args.access_key is not None:
+        kwargs.update(paid_membership=True, access_key=args.access_key)
+    if args.cache is not None and os.path.exists(args.cache):
+        kwargs.update(in_file=args.cache, in_format='json')
+    return Fixerio(**kwargs)
+
+
+def run(args):
+    """ Converts the input of the parsed command line arguments """
+    progress = Progress(quiet=args.quiet)
+    args.format = _detect_format(args.input, args.format)
+    spooled = None
+    if args.input is None or args.input == '-':
+        spooled = args.input = _spool(sys.stdin)
+    try:
+        rows = _read_rows(args.input, args.format)
+        header = next(rows)
+        converter = _new_converter(args, header)
+        tables, total = _scan(converter, rows, progress)
+
+        with _new_fixerio(args) as fixerio:
+            converter.rates = _prefetch(fixerio, tables, args.skip_errors)
+            if args.cache is not None:
+                write_to_file(fixerio.get_cache(), args.cache, 'json')
+        progress.message('{} tables fetched in {:.2f}s'.format(len(converter.rates),
+                                                                time.perf_counter() - progress.start))
+
+        progress.total = total
+        progress.start = time.perf_counter()
+        rows = _read_rows(args.input, args.format)
+        next(rows)
+        chunks = _chunks(rows, args.chunk_size)
+        workers = args.workers if total > args.chunk_size else 1
+        if args.output is None or args.output == '-':
+            out = sys.stdout
+            if header is not None:
+                csv.writer(out).writerow(header + [args.output_column])
+            _convert(converter, chunks, out, workers, progress)
+            out.flush()
+        else:
+            with _atomic_text_writer(args.output) as out:
+                if header is not None:
+                    csv.writer(out).writerow(header + [args.output_column])
+                _convert(converter, chunks, out, workers, progress)
+        progress.finish()
+    finally:
+        if spooled is not None:
+            os.unlink(spooled)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='fixerio3',
+                                     description='Converts the amounts of a CSV or JSONL ledger with fixer.io rates')
+    parser.add_argument('input', nargs='?', help='file to convert (default: stdin), gzip compressed if it ends with .gz')
+    parser.add_argument('-o', '--output', help='file to write to (default: stdout), replaced atomically')
+    parser.add_argument('--format', choices=('csv', 'jsonl'),
+                        help='format of the input and output (default: from the file name, otherwise csv)')
+    parser.add_argument('--amount-column', default='amount', help='column of the amounts to convert')
+    parser.add_argument('--base-column', default='base', help='column of the currencies to convert from')
+    parser.add_argument('--target-column', default='target', help='column of the currencies to convert to')
+    parser.add_argument('--date-column', default='date',
+                        help='column of the dates to quote rates on (default: {} if missing)'.format(DEFAULT_DATE))
+    parser.add_argument('--from', dest='base', help='currency to convert every row from')
+    parser.add_argument('--to', dest='target', help='currency to convert every row to')
+    parser.add_argument('--on', dest='date', help="date ('yyyy-mm-dd' or 'latest') to quote every row on")
+    parser.add_argument('--output-column', default='converted', help='column to write the converted amounts to')
+    parser.add_argument('--precision', type=int, help='digits to round the converted amounts to')
+    parser.add_argument('--skip-errors', action='store_true',
+                        help='leave the converted amount of invalid rows empty instead of stopping')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows per chunk')
+    parser.add_argument('--access-key', help='fixer.io API key (paid membership)')
+    parser.add_argument('--base-url', help='API endpoint, e.g. a mirror or a mock server')
+    parser.add_argument('--triangulate', action='store_true', help='derive every rate from the EUR table')
+    parser.add_argument('--cache', help='json file cache to read the rates from and to save them to')
+    parser.add_argument('--quiet', action='store_true', help='do not report progress on stderr')
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
+    try:
+        return run(args)
+    except FixerioException as e:
+        print('fixerio3: {}'.format(e), file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # the reader of stdout went away (e.g. piped into head)
+        sys.stderr.close()
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
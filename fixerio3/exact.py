@@ -0,0 +1,293 @@
+"""
+This file provides the exact conversion engine of Fixerio(exact=True) and
+Fixerio.convert_minor_units. Rates are stored once as integers scaled by 10**RATE_DIGITS
+(parsed from their shortest decimal representation, so 1.1987 is 11987000000 and not
+the nearest binary float), amounts are parsed into an integer coefficient and a power
+of ten, and a conversion is a single integer multiplication and division rounded to the
+minor units of the target currency (MINOR_UNITS) with a decimal rounding mode.
+Cross rates are kept as the fraction of two scaled rates, so they are rounded only once.
+
+parse_amount(amount) -> (int, int):
+scale_rate(rate, digits=RATE_DIGITS, rounding=ROUND_HALF_EVEN) -> int:
+divide(numerator: int, denominator: int, rounding=DEFAULT_ROUNDING) -> int:
+convert_units(amount, numerator: int, denominator: int, minor_units: int, rounding=DEFAULT_ROUNDING) -> int:
+to_decimal(units: int, minor_units: int) -> Decimal:
+ExactTable(base, rates, date=None, digits=RATE_DIGITS, minor_units=None, rounding=DEFAULT_ROUNDING)
+"""
+
+from array import array
+from math import gcd
+from decimal import Context
+from decimal import Decimal
+from decimal import MAX_EMAX
+from decimal import MAX_PREC
+from decimal import MIN_EMIN
+from decimal import ROUND_CEILING
+from decimal import ROUND_DOWN
+from decimal import ROUND_FLOOR
+from decimal import ROUND_HALF_DOWN
+from decimal import ROUND_HALF_EVEN
+from decimal import ROUND_HALF_UP
+from decimal import ROUND_UP
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# Modify RATE_DIGITS to change the decimals the rates are stored with (fixer.io publishes at most 6)
+RATE_DIGITS = 10
+# Modify DEFAULT_ROUNDING to change how converted amounts are rounded to the minor units of
+# their currency (any of the decimal module rounding modes except ROUND_05UP)
+DEFAULT_ROUNDING = ROUND_HALF_EVEN
+# Decimals of the minor unit of each currency (ISO 4217), DEFAULT_MINOR_UNITS for the others
+MINOR_UNITS = {'ISK': 0, 'JPY': 0, 'KRW': 0}
+DEFAULT_MINOR_UNITS = 2
+
+ROUNDINGS = (ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP)
+_POWERS = [10 ** x for x in range(64)]
+# to_decimal must neither round nor depend on the context of the caller
+_EXACT_CONTEXT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _pow10(exponent):
+    return _POWERS[exponent] if exponent < 64 else 10 ** exponent
+
+
+def _parse_text(text):
+    """ Returns (coefficient, exponent) of a decimal string such as '-12.50' or '1.5e-05' """
+    whole, _, fraction = text.partition('.')
+    if not fraction or fraction.isdigit():
+        try:
+            return int(whole + fraction), -len(fraction)
+        except ValueError:
+            pass  # an exponent or something else int() does not read
+    exponent = 0
+    text = text.strip().lower()
+    if 'e' in text:
+        text, power = text.split('e')
+        exponent = int(power)
+    whole, _, fraction = text.partition('.')
+    if fraction and not fraction.isdigit():
+        raise ValueError('Invalid amount: {!r}'.format(text))
+    # int() rejects anything else that is not a (signed) number
+    return int(whole + fraction), exponent - len(fraction)
+
+
+def parse_amount(amount):
+    """ Returns the (coefficient, exponent) integers of an amount, equal to coefficient * 10**exponent.
+        Floats are taken at their shortest decimal representation (repr) """
+    if type(amount) is str:
+        return _parse_text(amount)
+    if isinstance(amount, int) and not isinstance(amount, bool):
+        return amount, 0
+    if isinstance(amount, str):
+        return _parse_text(str(amount))
+    if isinstance(amount, float):
+        if amount != amount or amount in (float('inf'), float('-inf')):
+            raise ValueError('Invalid amount: {!r}'.format(amount))
+        return _parse_text(repr(float(amount)))  # float() for numpy.float64
+    if isinstance(amount, Decimal):
+        if not amount.is_finite():
+            raise ValueError('Invalid amount: {!r}'.format(amount))
+        sign, digits, exponent = amount.as_tuple()
+        coefficient = int(''.join(map(str, digits)))
+        return -coefficient if sign else coefficient, exponent
+    if hasattr(amount, 'item'):  # numpy scalars
+        return parse_amount(amount.item())
+    raise TypeError('Invalid amount: {!r}'.format(amount))
+
+
+def divide(numerator, denominator, rounding=DEFAULT_ROUNDING):
+    """ Returns numerator / denominator (denominator > 0) rounded to an integer with 'rounding' """
+    q, r = divmod(numerator, denominator)  # q is the floor
+    if not r or rounding == ROUND_FLOOR:
+        return q
+    if rounding == ROUND_CEILING:
+        return q + 1
+    if rounding == ROUND_DOWN:
+        return q if numerator >= 0 else q + 1
+    if rounding == ROUND_UP:
+        return q + 1 if numerator >= 0 else q
+    twice = 2 * r
+    if twice != denominator:
+        return q + 1 if twice > denominator else q
+    if rounding == ROUND_HALF_EVEN:
+        return q + (q & 1)
+    if rounding == ROUND_HALF_UP:
+        return q + 1 if numerator >= 0 else q
+    if rounding == ROUND_HALF_DOWN:
+        return q if numerator >= 0 else q + 1
+    raise ValueError('Unsupported rounding mode: {}'.format(rounding))
+
+
+def scale_rate(rate, digits=RATE_DIGITS, rounding=ROUND_HALF_EVEN):
+    """ Returns rate as an integer scaled by 10**digits """
+    coefficient, exponent = parse_amount(rate)
+    if coefficient <= 0:
+        raise ValueError('Invalid rate: {!r}'.format(rate))
+    exponent += digits
+    if exponent >= 0:
+        return coefficient * _pow10(exponent)
+    scaled = divide(coefficient, _pow10(-exponent), rounding)
+    if not scaled:
+        raise ValueError('The rate {!r} is smaller than 10**-{} (increase the rate digits)'.format(rate, digits))
+    return scaled
+
+
+def convert_units(amount, numerator, denominator, minor_units, rounding=DEFAULT_ROUNDING):
+    """ Returns amount * numerator / denominator in minor units (10**-minor_units) of the
+        target currency, rounded once with 'rounding' """
+    coefficient, exponent = parse_amount(amount)
+    exponent += minor_units
+    if exponent >= 0:
+        return divide(coefficient * numerator * _pow10(exponent), denominator, rounding)
+    return divide(coefficient * numerator, denominator * _pow10(-exponent), rounding)
+
+
+def to_decimal(units, minor_units):
+    """ Returns an amount of minor units as an exact Decimal (e.g. 1250, 2 -> Decimal('12.50')) """
+    return Decimal(units).scaleb(-minor_units, _EXACT_CONTEXT)
+
+
+def _divide_array(values, numerator, denominator, rounding):
+    """ divide(x * numerator, denominator) over a numpy int64 array, vectorized. The caller
+        makes sure that x * numerator and 2 * denominator fit in int64 """
+    products = values * numerator
+    q, r = numpy.divmod(products, denominator)
+    inexact = r != 0
+    if rounding == ROUND_CEILING:
+        q += inexact
+    elif rounding == ROUND_DOWN:
+        q += inexact & (products < 0)
+    elif rounding == ROUND_UP:
+        q += inexact & (products >= 0)
+    elif rounding != ROUND_FLOOR:
+        twice = 2 * r
+        tie = twice == denominator
+        if rounding == ROUND_HALF_EVEN:
+            tie &= (q & 1) == 1
+        elif rounding == ROUND_HALF_UP:
+            tie &= products >= 0
+        else:
+            tie &= products < 0
+        q += (twice > denominator) | tie
+    return q
+
+
+def _divide_many(numerators, denominator, rounding):
+    """ divide over an iterable, with the default rounding inlined """
+    if rounding != ROUND_HALF_EVEN:
+        return [divide(x, denominator, rounding) for x in numerators]
+    result = []
+    append = result.append
+    for x in numerators:
+        q, r = divmod(x, denominator)
+        twice = 2 * r
+        append(q + 1 if twice > denominator or (twice == denominator and q & 1) else q)
+    return result
+
+
+class ExactTable:
+    """
+    Rates of one table as integers scaled by 10**digits, converting amounts exactly.
+    The rate from currency a to currency b is the fraction rates[b] / rates[a], the base
+    of the table being 10**digits, so any two currencies of the table can be converted.
+
+    minor_units: {currency: decimals} overriding MINOR_UNITS
+    rounding: a rounding mode, or a {currency: rounding mode} dictionary (DEFAULT_ROUNDING
+              for the currencies it leaves out) applied to the amounts converted to them
+    """
+    __slots__ = ('base', 'date', 'digits', 'rates', 'minor_units', 'rounding', '_minor')
+
+    def __init__(self, base, rates, date=None, digits=RATE_DIGITS, minor_units=None, rounding=DEFAULT_ROUNDING):
+        for mode in (rounding.values() if isinstance(rounding, dict) else (rounding,)):
+            if mode not in ROUNDINGS:
+                raise ValueError('Unsupported rounding mode: {}'.format(mode))
+        self.base = base
+        self.date = date
+        self.digits = digits
+        self.rates = {currency: scale_rate(rate, digits) for currency, rate in rates.items()}
+        self.rates[base] = _pow10(digits)
+        self.minor_units = minor_units or dict()
+        self.rounding = rounding
+        self._minor = dict(MINOR_UNITS)
+        self._minor.update(self.minor_units)
+
+    def __contains__(self, currency):
+        return currency in self.rates
+
+    def minor(self, currency):
+        """ Returns the decimals of the minor unit of currency """
+        return self._minor.get(currency, DEFAULT_MINOR_UNITS)
+
+    def rounding_of(self, currency):
+        if isinstance(self.rounding, dict):
+            return self.rounding.get(currency, DEFAULT_ROUNDING)
+        return self.rounding
+
+    def fraction(self, base, target):
+        """ Returns the rate from base to target as a (numerator, denominator) pair of integers """
+        return self.rates[target], self.rates[base]
+
+    def parameters(self, base, target):
+        """ Returns the (numerator, denominator, minor units, rounding) converting base to
+            target with convert_units, e.g. to convert many amounts without a lookup each """
+        return self.rates[target], self.rates[base], self.minor(target), self.rounding_of(target)
+
+    def convert_units(self, amount, base, target):
+        """ Returns amount of base converted to minor units of target """
+        numerator, denominator = self.fraction(base, target)
+        return convert_units(amount, numerator, denominator, self.minor(target), self.rounding_of(target))
+
+    def convert(self, amount, base, target):
+        """ Returns amount of base converted to target as a Decimal rounded to its minor units """
+        minor = self._minor.get(target, DEFAULT_MINOR_UNITS)
+        return to_decimal(convert_units(amount, self.rates[target], self.rates[base], minor,
+                                        self.rounding_of(target)), minor)
+
+    def convert_minor_units(self, amounts, base, target):
+        """
+        Converts integer amounts in minor units of base to minor units of target.
+        amounts is an iterable of int, an array.array or a numpy integer array; the result
+        is of the same kind (a list for other iterables).
+        """
+        if isinstance(amounts, array) and amounts.typecode in 'fd':
+            raise TypeError('Amounts in minor units must be integers')
+        if numpy is not None and isinstance(amounts, numpy.ndarray) and amounts.dtype.kind not in 'iu':
+            raise TypeError('Amounts in minor units must be integers')
+        numerator, denominator = self.fraction(base, target)
+        shift = self.minor(target) - self.minor(base)
+        if shift >= 0:
+            numerator *= _pow10(shift)
+        else:
+            denominator *= _pow10(-shift)
+        divisor = gcd(numerator, denominator)
+        numerator //= divisor
+        denominator //= divisor
+        rounding = self.rounding_of(target)
+        if numpy is not None and isinstance(amounts, (array, numpy.ndarray)) and len(amounts):
+            # in int64 when no product can overflow (rates reduce to small fractions)
+            values = numpy.asarray(amounts, dtype=numpy.int64)
+            largest = max(int(values.max()), -int(values.min()))
+            if largest * numerator <= _INT64_MAX and 2 * denominator <= _INT64_MAX:
+                converted = _divide_array(values, numerator, denominator, rounding)
+                if isinstance(amounts, array):
+                    if amounts.typecode in 'ql' and amounts.itemsize == 8:
+                        return array(amounts.typecode, converted.tobytes())
+                    return array(amounts.typecode, converted.tolist())
+                limits = numpy.iinfo(amounts.dtype)
+                if converted.min() < limits.min or converted.max() > limits.max:
+                    raise OverflowError('The converted amounts do not fit in {}'.format(amounts.dtype))
+                return converted.astype(amounts.dtype, copy=False)
+        values = amounts.tolist() if numpy is not None and isinstance(amounts, numpy.ndarray) else list(amounts)
+        for x in values:
+            if not isinstance(x, int) or isinstance(x, bool):
+                raise TypeError('Amounts in minor units must be integers')
+        converted = _divide_many((x * numerator for x in values), denominator, rounding)
+        if isinstance(amounts, array):
+            return array(amounts.typecode, converted)
+        if numpy is not None and isinstance(amounts, numpy.ndarray):
+            return numpy.array(converted, dtype=amounts.dtype)
+        return converted
@@ -17,3 +17,24 @@ class FixerioInvalidCurrency(FixerioException):
 class FixerioInvalidDate(FixerioException):
     """ Wrong or unavailable date """
     pass
+
+
+class FixerioApiError(FixerioException):
+    """ Error response of the API, 'code' being its fixer.io error code (see utils.ERROR_CODES)
+        or, if the request failed with a server error or rate limiting, 'status' its HTTP status """
+    def __init__(self, *args, code=None, info=None, error_type=None, status=None):
+        FixerioException.__init__(self, *args)
+        self.code = code
+        self.info = info
+        self.error_type = error_type
+        self.status = status
+
+
+class FixerioCircuitOpen(FixerioException):
+    """ The API is not called because recent calls failed (see breaker.CircuitBreaker).
+        'retry_after' is the number of seconds until the next call is let through and 'code'
+        the error code of the last failure, if it was an API error """
+    def __init__(self, *args, retry_after=None, code=None):
+        FixerioException.__init__(self, *args)
+        self.retry_after = retry_after
+        self.code = code
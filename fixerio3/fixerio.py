@@ -7,26 +7,67 @@ objects use caching to avoid having to wait for API queries.
 get_rates(date: str = DEFAULT_DATE, base: str = DEFAULT_BASE, symbols: str = None) -> dict:
 convert(amount: float, target: str, base: str = DEFAULT_BASE, date: str = DEFAULT_DATE) -> float:
 
-NOTE: Whenever using the class, you are responsible for calling the clear_cache() method
-whenever you see fit so that the cache does not get to large in size (which shouldn't be
-a concern for most people)
+NOTE: The cache of the class is unbounded by default. Pass max_entries and/or max_memory
+to have the least recently used tables evicted, or call the clear_cache() method whenever
+you see fit. Cached tables never expire: 'latest' is resolved to the date of the last
+update, which moves on at the next UPDATE_TIME_UTC rollover, and the table it resolved to
+before stays cached as the historical rates of its date.
 """
 
 from datetime import date as dtdate
 from datetime import timedelta
 from datetime import datetime
-import requests
+from datetime import timezone
+from collections import OrderedDict
+from collections import namedtuple
+from functools import lru_cache
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
 from fixerio3.exceptions import FixerioException
 from fixerio3.exceptions import FixerioInvalidDate
 from fixerio3.exceptions import FixerioInvalidCurrency
 from fixerio3.exceptions import FixerioCurrencyUnavailable
+from fixerio3.exceptions import FixerioApiError
 from fixerio3.utils import ERROR_CODES
-from fixerio3.utils import _json_to_csv
-from fixerio3.utils import _csv_to_json
-from fixerio3.utils import read_from_file
-from fixerio3.utils import write_to_file
+from fixerio3.utils import read_stream
+from fixerio3.utils import write_stream
+from fixerio3.utils import Batcher
+from fixerio3.utils import Cache
+from fixerio3.store import RateStore
+from fixerio3.store import MappedRateStore
+from fixerio3.store import write_binary
+from fixerio3.store import RateMatrix
+from fixerio3.journal import Journal
+from fixerio3.journal import DEFAULT_COMPACT_EVERY
+from fixerio3.transport import DEFAULT_TIMEOUT
+from fixerio3.transport import DEFAULT_POOL_SIZE
+from fixerio3.transport import DEFAULT_RETRIES
+from fixerio3.transport import DEFAULT_BACKOFF
+from fixerio3.transport import new_session
+from fixerio3.transport import fetch_json
+from fixerio3.metrics import Metrics
+from fixerio3.metrics import DEFAULT_METRICS
+from fixerio3.businessdays import BusinessCalendar
+from fixerio3.businessdays import ALIASES_SUFFIX
+from fixerio3.breaker import CircuitBreaker
+from fixerio3.breaker import NegativeCache
+from fixerio3.breaker import NEGATIVE_TTL
+from fixerio3.analytics import RangeIndex
+from fixerio3.exact import ExactTable
+from fixerio3.exact import convert_units
+from fixerio3.exact import to_decimal
+from fixerio3.exact import RATE_DIGITS
+from fixerio3.exact import DEFAULT_ROUNDING
 from string import whitespace
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 OPEN_BASE_URL = 'https://api.fixer.io/'
 FREE_BASE_URL = 'http://data.fixer.io/api/'
 PAID_BASE_URL = 'https://data.fixer.io/api/'
@@ -44,22 +85,57 @@ ALL_CURRENCIES = {"AUD", "BGN", "BRL", "CAD", "CHF", "CNY", "CZK",
                   "ILS", "INR", "ISK", "JPY", "KRW", "MXN", "MYR",
                   "NOK", "NZD", "PHP", "PLN", "RON", "RUB", "SEK",
                   "SGD", "THB", "TRY", "USD", "ZAR"}
+MAX_TIMESERIES_DAYS = 365  # longest timeframe the timeseries endpoint accepts (error 505)
+# Modify MAX_MATRICES to change how many cross-rate matrices (one per base and date) are kept
+MAX_MATRICES = 256
+# Modify MAX_INDEXES to change how many range indexes (one per base and symbols) fluctuation
+# and stats keep
+MAX_INDEXES = 256
+# Modify DEFAULT_WORKERS to change how many requests get_timeseries runs at once
+DEFAULT_WORKERS = 4
+# Modify DEFAULT_BATCH_WINDOW to change how long (in seconds) a request for some symbols,
+# made while another request of the same base and date is in flight, waits for requests
+# of other symbols to merge them into one call
+DEFAULT_BATCH_WINDOW = 0.002
+# Modify DEFAULT_FULL_FETCH_AFTER to change how many symbols of a table must be requested
+# before the whole table is fetched instead
+DEFAULT_FULL_FETCH_AFTER = 5
+# Modify these to change how old (in seconds) a table served by stale_while_revalidate may
+# be, and how often the current table is requested while it is not published yet
+DEFAULT_MAX_STALE = 4 * 24 * 3600
+REVALIDATE_INTERVAL = 30
 # Modify currencies to specify which currencies to retrieve when 'symbols'
 # is omitted in the 'get_rates' method
 CURRENCIES = ALL_CURRENCIES
 
 
+_latest = [None, 0.0]  # the date fixer.io was last updated and the timestamp it is valid until
+
+
 def _date(date=None):
-    """ Returns the date fixer.io should've been last updated """
+    """ Returns the date fixer.io should've been last updated
+        (only recomputed once it changes, at the next UPDATE_TIME_UTC) """
     if (date == LATEST) or (date is None):
-        if datetime.utcnow().time().hour < UPDATE_TIME_UTC:
-            return str(datetime.utcnow().date() - timedelta(1))
-        else:
-            return str(datetime.utcnow().date())
+        if time.time() >= _latest[1]:
+            if datetime.utcnow().time().hour < UPDATE_TIME_UTC:
+                latest = str(datetime.utcnow().date() - timedelta(1))
+            else:
+                latest = str(datetime.utcnow().date())
+            _latest[:] = [latest, _next_update()]
+        return _latest[0]
     else:
         return date
 
 
+def _next_update():
+    """ Returns the timestamp of the next time fixer.io will be updated """
+    now = datetime.utcnow()
+    update = now.replace(hour=UPDATE_TIME_UTC, minute=0, second=0, microsecond=0)
+    if now >= update:
+        update += timedelta(1)
+    return update.replace(tzinfo=timezone.utc).timestamp()
+
+
 def _valid_date(date):
     """ Validates that the given date is withing the accepted ranges for the fixer.io API """
     try:
@@ -126,7 +202,7 @@ def _format_currency(currencies):
                 return [currencies]
             else:
                 return None
-        elif isinstance(currencies, list):
+        elif isinstance(currencies, (list, tuple)):
             return currencies
         else:
             return None
@@ -135,8 +211,115 @@ def _format_currency(currencies):
                                          'either on a list or as a string of comma separated values') from e
 
 
+class StaleRates(dict):
+    """
+    Rates of an older table returned for 'latest' while the current table is fetched in
+    the background (see the stale_while_revalidate parameter of Fixerio). 'date' is the
+    date of the table and 'age' the seconds since it was fetched.
+    """
+    stale = True
+
+    def __init__(self, rates, date, age):
+        dict.__init__(self, rates)
+        self.date = date
+        self.age = age
+
+
+class RequestKey(namedtuple('RequestKey', 'date base symbols latest')):
+    """
+    Validated and normalised parameters of a rates request, used as the key of the cache
+    and of the calls in flight. date is a 'yyyy-mm-dd' string ('latest' resolved to the
+    last update), symbols a sorted tuple of currencies or None for all, and latest tells
+    whether 'latest' was requested.
+    """
+    __slots__ = ()
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(date):
+    """ Validates a date and returns it as 'yyyy-mm-dd' or 'latest' (memoized) """
+    if not _valid_date(date):
+        raise FixerioInvalidDate('Please enter a valid date')
+    return LATEST if date == LATEST else str(_format_date(date))
+
+
+@lru_cache(maxsize=4096)
+def _parse_currencies(currencies, name='symbols (aka target currency)'):
+    """ Validates currencies (a string or tuple) and returns them as a sorted tuple, or None
+        for all currencies (memoized) """
+    if not _valid_currency(list(currencies) if isinstance(currencies, tuple) else currencies):
+        raise FixerioInvalidCurrency('Please enter valid {}'.format(name))
+    return None if currencies is None else tuple(sorted(set(_format_currency(currencies))))
+
+
+@lru_cache(maxsize=4096)
+def _make_key(date, base, symbols):
+    """ Validates the parameters of a rates request (memoized). The date of the key is left
+        as 'latest' for _request_key to resolve """
+    try:
+        parsed = _parse_date(date)
+        if base is None or len(_parse_currencies(base, 'base currency')) != 1:
+            raise FixerioInvalidCurrency('Please enter a valid base currency')
+        return RequestKey(parsed, base, _parse_currencies(symbols), parsed == LATEST)
+    except TypeError as e:
+        raise FixerioInvalidCurrency('Please enter valid currency codes.') from e
+
+
+def _request_key(date, base, symbols) -> RequestKey:
+    """ Validates the parameters of a rates request once and returns its RequestKey """
+    if isinstance(symbols, list):
+        symbols = tuple(symbols)
+    try:
+        key = _make_key(date, base, symbols)
+    except TypeError as e:
+        raise FixerioInvalidCurrency('Please enter valid currency codes.') from e
+    if key.latest:
+        return RequestKey(_date(), key.base, key.symbols, True)
+    return key
+
+
+def _column(values, length):
+    """ Returns an iterable of length items: values itself or a scalar (str/None) repeated """
+    if isinstance(values, str) or values is None:
+        return repeat(values, length)
+    if len(values) != length:
+        raise ValueError('All columns must have the same length as amounts')
+    return values
+
+
+def _date_range(start, end, days=1):
+    """ Yields (first, last) date pairs of at most 'days' days covering start to end """
+    while start <= end:
+        last = min(start + timedelta(days - 1), end)
+        yield start, last
+        start = last + timedelta(1)
+
+
+def _build_request(base_url, date, base, symbols, access_key=None):
+    """ Returns the url and query parameters of an API request, leaving out omitted parameters """
+    if isinstance(symbols, (list, tuple)):
+        symbols = ','.join(symbols)
+    payload = tuple((k, v) for k, v in (('access_key', access_key), ('base', base), ('symbols', symbols))
+                    if v is not None)
+    return base_url + str(date), payload
+
+
+def _check_response(json_data):
+    """ Raises a FixerioApiError if the API responded with an error, otherwise returns json_data """
+    if 'error' in json_data:
+        error = json_data['error']
+        if not isinstance(error, dict):
+            error = {'info': error}
+        code = error.get('code')
+        raise FixerioApiError('Something went wrong with your request.\n'
+                              'Error message: {}'.format(json_data['error']),
+                              code=code, info=error.get('info', ERROR_CODES.get(code)), error_type=error.get('type'))
+    return json_data
+
+
 def get_rates(date: str=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None,
-              paid_membership=False, access_key=None) -> dict:
+              paid_membership=False, access_key=None, session=None, timeout=DEFAULT_TIMEOUT,
+              metrics=DEFAULT_METRICS) -> dict:
     """ Fetches rates for the given parameters (NO CACHING)
 
         date: OPTIONAL type str
@@ -150,32 +333,38 @@ def get_rates(date: str=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None,
         symbols: OPTIONAL type str or list
             a string of comma separated currency codes like 'USD,JPY,EUR' or list like ['USD', 'EUR'].
             If omitted, all rates are returned for the corresponding base and date.
+
+        session: OPTIONAL type requests.Session
+            session to send the request through. If omitted, a pooled session shared by
+            all module level calls is used.
+
+        timeout: OPTIONAL type float or tuple
+            (connect, read) timeout in seconds. If omitted, DEFAULT_TIMEOUT is used.
+
+        metrics: OPTIONAL type metrics.Metrics
+            where the request is recorded. If omitted, metrics.DEFAULT_METRICS is used.
     """
     if paid_membership:
         if access_key is not None:
-            url = PAID_BASE_URL + date
+            base_url = PAID_BASE_URL
         else:
             raise FixerioException('When using the paid membership an API kEY must also be provided.')
     else:
-        url = OPEN_BASE_URL + date
+        base_url = OPEN_BASE_URL
         access_key = None
 
-    if isinstance(symbols, list):
-        symbols = ','.join(symbols)
-    elif not (isinstance(symbols, str) or (symbols is None)):
+    if not (isinstance(symbols, (list, str)) or (symbols is None)):
         raise ValueError(""" Invalid value entered for the symbols parameter.
                                      Check your input and try again """)
-    payload = (('access_key', access_key), ('base', base), ('symbols', symbols))
-    response = requests.get(url, params=payload)
-    json_data = response.json()
-    if 'error' in json_data:
-        raise FixerioException('Something went wrong with your request.\n'
-                               'Error message: {}'.format(json_data['error']))
+    url, payload = _build_request(base_url, date, base, symbols, access_key)
+    json_data = _check_response(fetch_json(url, params=payload, session=session, timeout=timeout,
+                                           metrics=metrics))
     return json_data['rates']
 
 
 def convert(amount: float, target: str, base: str=DEFAULT_BASE, date=DEFAULT_DATE,
-            paid_membership=False, access_key=None) -> float:
+            paid_membership=False, access_key=None, session=None, timeout=DEFAULT_TIMEOUT,
+            metrics=DEFAULT_METRICS) -> float:
     """ Converts an amount from the base currency to the target currency (NO CACHING)
 
         amount: REQUIRED type float or str
@@ -191,11 +380,15 @@ def convert(amount: float, target: str, base: str=DEFAULT_BASE, date=DEFAULT_DAT
         date: OPTIONAL type str
             a date form January 4th 1999 to today in the format 'yyyy-mm-dd'
             or 'latest'. If omitted, DEFAULT_DATE is used (usually 'latest' if you haven't changed it).
+
+        session, timeout, metrics: OPTIONAL
+            passed through to get_rates.
     """
     if base == target:
         return amount
     conversion_rate = get_rates(date=date, base=base, symbols=target,
-                                paid_membership=paid_membership, access_key=access_key)
+                                paid_membership=paid_membership, access_key=access_key,
+                                session=session, timeout=timeout, metrics=metrics)
     return float(amount) * conversion_rate[target]
 
 
@@ -204,11 +397,103 @@ class Fixerio:
     Class to interact with the free fixer.io API
     Similar to the 'get_rates' and 'convert' functions but uses caching to
     avoid invoking the fixer.io API on every request
+
+    With triangulate=True every base is derived from the cached full table of a single
+    pivot currency (EUR by default) for the date, so one API call per date serves all
+    bases: rate(base -> target) = rate(pivot -> target) / rate(pivot -> base).
+
+    With cache_to_file=True and journal=True, each fetched table is appended to the
+    '<out_name>.journal' file instead of rewriting out_name on every cache miss; out_name
+    is rewritten in the background every compact_every appends. The journal is replayed
+    on construction.
+
+    Concurrent requests for some symbols of the same base and date are merged into one
+    API call (a request waits up to batch_window seconds for others to merge with, but
+    only while another request of that table is in flight), and partial tables are
+    merged in the cache. Once full_fetch_after symbols of a table have been asked for, the whole table
+    is fetched instead.
+
+    Dates on which no rates are published (weekends and TARGET holidays, plus any other
+    date the API answers with the rates of an earlier day) are resolved to the date of
+    the table holding their rates by a businessdays.BusinessCalendar (see get_calendar),
+    so they are served from the cache. With cache_to_file the learnt aliases are saved
+    to '<out_name>.aliases' and read back from '<in_file>.aliases'.
+
+    The cache is kept in memory unless a cache backend shared between processes (see
+    fixerio3.backends) is passed in with 'cache'.
+
+    base_url overrides the API endpoint, e.g. to use a mirror or a local mock server
+    (see fixerio3.test.mock_server).
+
+    API requests, cache hits/misses/evictions and file persistence are recorded in a
+    metrics.Metrics object (see get_metrics), a new one per object unless one is passed
+    in with 'metrics'.
+
+    API calls go through a breaker.CircuitBreaker (a new one unless passed in with
+    'breaker') that fails fast with FixerioCircuitOpen after repeated failures or once the
+    monthly quota is exhausted, and the FixerioApiError of a request is remembered for
+    the time negative_ttl gives for its error code (see breaker.NEGATIVE_TTL).
+
+    With stale_while_revalidate=True a 'latest' request whose table is not cached yet
+    (e.g. right after the UPDATE_TIME_UTC rollover) immediately returns the previous
+    latest table of the base as StaleRates, flagged with its age, while the current table
+    is fetched in the background. Tables older than max_stale seconds are not served.
+
+    With exact=True convert and convert_many return Decimals rounded to the minor units
+    of the target currency (see exact.MINOR_UNITS, overridden per currency with
+    'minor_units') with 'rounding' (a decimal rounding mode, or a {currency: mode}
+    dictionary). The rates are stored once per table as integers scaled by
+    10**rate_digits and amounts are converted in integer arithmetic (see fixerio3.exact);
+    convert_minor_units converts whole arrays of integer minor units the same way.
+
+    Each object owns a pooled HTTP session (unless one is passed in with 'session')
+    so connections are reused across calls. Call close() or use the object as a
+    context manager to release the connections.
     """
 
     def __init__(self, cache_to_file=False, out_name=None, out_format=None,
-                 in_file=None, in_format=None, paid_membership=False, access_key=None):
-        self._cache = dict()
+                 in_file=None, in_format=None, paid_membership=False, access_key=None,
+                 session=None, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, triangulate=False, pivot='EUR',
+                 max_entries=None, max_memory=None, journal=False, compact_every=DEFAULT_COMPACT_EVERY,
+                 cache=None, base_url=None, metrics=None, batch_window=DEFAULT_BATCH_WINDOW,
+                 full_fetch_after=DEFAULT_FULL_FETCH_AFTER, calendar=None, breaker=None,
+                 negative_ttl=NEGATIVE_TTL, stale_while_revalidate=False, max_stale=DEFAULT_MAX_STALE,
+                 exact=False, rounding=DEFAULT_ROUNDING, minor_units=None, rate_digits=RATE_DIGITS):
+        if triangulate and not _valid_currency(pivot):
+            raise FixerioInvalidCurrency('Please enter a valid pivot currency')
+        self._triangulate = triangulate
+        self._pivot = pivot
+        self._metrics = metrics if metrics is not None else Metrics()
+        if cache is None:
+            cache = Cache(RateStore(ALL_CURRENCIES, MIN_DATE), max_entries=max_entries, max_memory=max_memory,
+                          on_evict=self._metrics.record_eviction)
+        self._cache = cache
+        self._lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()
+        self._batcher = Batcher(batch_window)
+        self._full_fetch_after = full_fetch_after
+        self._scheduler = None
+        self._matrices = OrderedDict()
+        self._indexes = OrderedDict()
+        self._exact = exact
+        self._exact_options = {'digits': rate_digits, 'minor_units': minor_units, 'rounding': rounding}
+        self._exact_tables = OrderedDict()
+        self._identity(pivot)  # validates the rounding modes
+        self._calendar = calendar if calendar is not None else BusinessCalendar()
+        self._breaker = breaker if breaker is not None else CircuitBreaker()
+        self._negative = NegativeCache(negative_ttl)
+        self._stale_while_revalidate = stale_while_revalidate
+        self._max_stale = max_stale
+        self._latest_tables = dict()
+        self._revalidating = dict()
+        if session is None:
+            self._session = self._new_session(pool_size, retries, backoff)
+            self._owns_session = True
+        else:
+            self._session = session
+            self._owns_session = False
+        self._timeout = timeout
         self._cache_to_file = cache_to_file
         self._out_file_name = out_name
         self._format_to_file = out_format
@@ -221,17 +506,60 @@ class Fixerio:
         else:
             self._access_key = None
             self._base_url = OPEN_BASE_URL
+        self._paid_membership = paid_membership
+        if base_url is not None:
+            self._base_url = base_url
         if in_file is not None:
-            if in_format == 'json':
-                self._cache = read_from_file(in_file, in_format)
-            elif in_format == 'csv':
-                self._cache = _csv_to_json(read_from_file(in_file, in_format))
-            else:
-                raise ValueError("Please enter a valid in_file format. "
-                                 "Supported values are 'json' (default), and 'csv'")
+            self._load_file(in_file, in_format, mapped=True)
+        self._journal = None
+        if cache_to_file and journal:
+            # the journal only holds the tables cached since the last snapshot
+            if out_name != in_file and os.path.exists(out_name):
+                self._load_file(out_name, out_format)
+            self._journal = Journal(out_name, self._write_snapshot, compact_every=compact_every)
+            self._load(self._journal.replay())
+            self._calendar.load(out_name + ALIASES_SUFFIX)
 
-    def _in_cache(self, base, symbols, date=_date()):
-        """ Checks to see if the specified rates have already been retrieved and are in the cache """
+    def _load_file(self, file, fmt, mapped=False):
+        """ Adds the tables of a json, csv or bin file and its aliases to the cache. A bin
+            file is mapped as a read-only layer of the cache if 'mapped', otherwise copied """
+        if fmt in ('json', 'csv'):
+            self._load(read_stream(file, fmt))
+        elif fmt == 'bin' and mapped and isinstance(self._cache, Cache):
+            self._cache.store.layer = MappedRateStore(file)
+        elif fmt == 'bin':
+            store = MappedRateStore(file)
+            self._load((base, date, store.get(base, date)) for base, date in store.keys())
+            store.close()
+        else:
+            raise ValueError("Please enter a valid in_file format. "
+                             "Supported values are 'json' (default), 'csv' and 'bin'")
+        self._calendar.load(file + ALIASES_SUFFIX)
+
+    def _load(self, tables):
+        """ Adds (base, date, rates) tables to the cache as they are read """
+        for base, date, rates in tables:
+            self._merge(base, date, rates)
+
+    def _merge(self, base, date, rates):
+        """ Caches the rates of base on date, merged with the rates already cached for
+            them unless they contain every cached symbol, and returns the cached table """
+        cached = self._cache.peek(base, date)
+        if cached is not None and not all(x in rates for x in cached):
+            merged = dict(cached)
+            merged.update(rates)
+            rates = merged
+        self._cache.set(base, date, rates)
+        if self._stale_while_revalidate and date >= _date():
+            # kept after the rollover, to be served while the next latest table is fetched
+            latest = self._latest_tables.get(base)
+            if latest is None or latest[0] <= date:
+                self._latest_tables[base] = (date, dict(rates), time.time())
+        return rates
+
+    def _in_cache(self, base, symbols, date=_date(), table=None):
+        """ Checks to see if the specified rates have already been retrieved and are in the cache
+            (or in 'table', the cached table of base on date if it has already been looked up) """
         try:
             if symbols is None:
                 in_date = dtdate(*(int(x.lstrip('0')) for x in date.split('-')))
@@ -244,57 +572,453 @@ class Fixerio:
 
             symbols = _format_currency(symbols)
 
-            if base in self._cache:
-                if date in self._cache[base]:
-                    if symbols is not None:
-                        for x in symbols:
-                            if x not in self._cache[base][date]:
-                                return False
-                        else:
-                            return True
+            if table is None:
+                table = self._cache.peek(base, date)
+            if table is not None:
+                if symbols is not None:
+                    for x in symbols:
+                        if x not in table:
+                            return False
                     else:
-                        return CURRENCIES.difference({base}).issubset(self._cache[base][date].keys())
+                        return True
                 else:
-                    return False
+                    return CURRENCIES.difference({base}).issubset(table.keys())
             else:
                 return False
         except KeyError:
             return False
 
-    def _return_cache(self, base, symbols, date=_date()):
+    def _return_cache(self, base, symbols, date=_date(), table=None):
         """ Returns cached items if available (check availability with '_in_cache') """
         try:
             if symbols is None:
                 symbols = CURRENCIES
-            cached_items = {x: self._cache[base][date][x]
-                            for x in self._cache[base][date] if x in symbols}
+            if table is None:
+                table = self._cache.peek(base, date)
+            cached_items = {x: table[x] for x in table if x in symbols}
             return cached_items
-        except KeyError as e:
+        except (KeyError, TypeError) as e:
             raise ValueError('Error returning cache. Make sure to first check if the '
                              'object is in the cache with the "_in_cache" method') from e
 
+    def _cached(self, base, symbols, date):
+        """ Returns the cached rates if they are all available, otherwise None """
+        with self._lock:
+            table = self._cache.peek(base, date)
+            # a table without every symbol is a miss, for the cache statistics and the metrics alike
+            hit = table is not None and self._in_cache(base, symbols, date, table)
+            self._cache.count(base, date, hit)
+            if hit:
+                self._metrics.record_cache(True, base, date)
+                return self._return_cache(base, symbols, date, table)
+        self._metrics.record_cache(False, base, date)
+        return None
+
     def _to_cache(self, json_data):
-        """ Caches the given info for future use """
+        """ Caches the given info for future use and returns the cached table (see _merge) """
         try:
             base = json_data['base']
             date = json_data['date']
-            if base not in self._cache:
-                self._cache[base] = dict()
-            if date not in self._cache[base]:
-                self._cache[base][date] = dict()
-            self._cache[base][date] = json_data['rates']
-            return None
+            rates = json_data['rates']
+            with self._lock:
+                self._matrices.pop((base, date), None)
+                self._exact_tables.pop((base, date), None)
+                return self._merge(base, date, rates)
         except KeyError as e:
             raise FixerioException("Error caching data. Make sure you are passing in the "
                                    "json_data portion of the response") from e
 
+    def _new_session(self, pool_size, retries, backoff):
+        """ Returns the HTTP session owned by this object """
+        return new_session(pool_size=pool_size, retries=retries, backoff=backoff)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Closes the pooled HTTP session if it is owned by this object and the connections
+            of the cache backend """
+        self.stop_prefetch()
+        if self._owns_session:
+            self._session.close()
+        if self._journal is not None:
+            self._journal.close()
+        self._cache.close()
+
+    def _check_args(self, date, base, symbols):
+        """ Raises an exception if any of the get_rates parameters is invalid """
+        if not _valid_date(date):
+            raise FixerioInvalidDate('Please enter a valid date')
+        if not _valid_currency(base):
+            raise FixerioInvalidCurrency('Please enter a valid base currency')
+        if not _valid_currency(symbols):
+            raise FixerioInvalidCurrency('Please enter valid symbols (aka target currency)')
+
+    def _from_response(self, json_data, key=None):
+        """ Caches (and writes to file if enabled) the rates of an API response and returns
+            the cached table, i.e. with any rates of the table cached before. If the response
+            is dated before the date of the RequestKey it answers, the alias is recorded """
+        _check_response(json_data)
+        table = self._to_cache(json_data)
+        if key is not None and json_data['date'] != key.date:
+            self._alias(key, json_data['date'])
+        if self._cache_to_file:
+            self._persist([(json_data['base'], json_data['date'], json_data['rates'])])
+        return table
+
+    def _alias(self, key, effective):
+        """ Records that the table of effective holds the rates of the date of key, unless
+            key is dated today or later (its rates may just not be published yet) """
+        if key.date >= _date():
+            return
+        if self._calendar.record(key.date, effective) and self._cache_to_file:
+            self._calendar.save(self._out_file_name + ALIASES_SUFFIX)
+
+    def _key(self, date, base, symbols):
+        """ Returns the RequestKey of a request, dated on the table holding its rates """
+        key = _request_key(date, base, symbols)
+        effective = self._calendar.resolve(key.date)
+        return key if effective == key.date else key._replace(date=effective)
+
+    def _persist(self, tables=()):
+        """ Appends the given (base, date, rates) tables to the journal if enabled,
+            otherwise rewrites the output file with the whole cache """
+        if self._journal is not None:
+            with self._metrics.persisting('journal', len(tables)):
+                for base, date, rates in tables:
+                    self._journal.append(base, date, rates)
+        else:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """ Writes the whole cache to the output file. The tables are copied under the lock
+            and written outside of it, so cache lookups are not blocked by the write """
+        with self._snapshot_lock, self._metrics.persisting('snapshot'):
+            with self._lock:
+                tables = [(base, date, dict(rates)) for (base, date), rates in self._cache.items()]
+            if self._format_to_file == 'bin':
+                store = RateStore(ALL_CURRENCIES, MIN_DATE)
+                for base, date, rates in tables:
+                    store.set(base, date, rates)
+                write_binary(store, self._out_file_name)
+            else:
+                write_stream(tables, self._out_file_name, self._format_to_file)
+            if len(self._calendar):
+                self._calendar.save(self._out_file_name + ALIASES_SUFFIX)
+
+    def _request_symbols(self, key, symbols):
+        """ Returns the symbols to request for the table of key: None (the whole table) if
+            the table would then hold full_fetch_after symbols or more """
+        if symbols is None or self._full_fetch_after is None:
+            return symbols
+        cached = self._cache.peek(key.base, key.date)
+        wanted = set(symbols).union(cached or ())
+        if len(wanted) >= self._full_fetch_after:
+            return None
+        return tuple(sorted(symbols))
+
+    def _fetch(self, key, symbols):
+        """ Requests the rates of symbols (None: all) of the table of key from the API and
+            returns the cached table, unless a call that just finished already cached them """
+        with self._lock:
+            table = self._cache.peek(key.base, key.date)
+            if table is not None and self._in_cache(key.base, symbols and list(symbols), key.date, table):
+                return table
+            symbols = self._request_symbols(key, symbols)
+        url, payload = _build_request(self._base_url, LATEST if key.latest else key.date, key.base,
+                                      symbols, self._access_key)
+        return self._from_response(self._call_api(url, payload), key)
+
+    def _call_api(self, url, payload):
+        """ Requests url through the circuit breaker and returns the json response,
+            raising FixerioApiError if it is an error """
+        self._breaker.before()
+        try:
+            json_data = _check_response(fetch_json(url, params=payload, session=self._session,
+                                                   timeout=self._timeout, metrics=self._metrics))
+        except Exception as e:
+            self._breaker.record(e)
+            raise
+        self._breaker.record()
+        return json_data
+
+    def _refresh(self, bases, symbols=None, expected_date=None):
+        """
+        Fetches the latest tables of every base from the API and swaps them into the cache
+        at once. Returns False without touching the cache if the API answered with a date
+        other than expected_date (i.e. the new rates are not published yet)
+        """
+        if self._triangulate:
+            bases, symbols = [self._pivot], None
+        responses = []
+        for base in bases:
+            url, payload = _build_request(self._base_url, LATEST, base, _format_currency(symbols), self._access_key)
+            json_data = self._call_api(url, payload)
+            if expected_date is not None and json_data['date'] != expected_date:
+                return False
+            responses.append(json_data)
+        with self._lock:
+            for json_data in responses:
+                self._to_cache(json_data)
+        if self._cache_to_file:
+            self._persist([(x['base'], x['date'], x['rates']) for x in responses])
+        return True
+
+    def start_prefetch(self, bases, symbols=None, **kwargs):
+        """
+        Starts a background thread that fetches the latest tables of 'bases' now and after
+        every UPDATE_TIME_UTC rollover, so that get_rates never waits on the API for them.
+        Keyword arguments (jitter, retries, retry_delay) are passed to PrefetchScheduler.
+
+        :return: the scheduler.PrefetchScheduler
+        """
+        # imported here because the scheduler module depends on this one
+        from fixerio3.scheduler import PrefetchScheduler
+        self.stop_prefetch()
+        self._scheduler = PrefetchScheduler(self, bases, symbols, **kwargs)
+        self._scheduler.start()
+        return self._scheduler
+
+    def stop_prefetch(self):
+        """ Stops the prefetch thread started by start_prefetch """
+        if self._scheduler is not None:
+            self._scheduler.stop()
+            self._scheduler = None
+
+    def _matrix(self, source, date):
+        """ Returns the cross-rate matrix built from the table of source on date (already
+            resolved with _date) if it has been built, otherwise None """
+        return self._matrices.get((source, date))
+
+    def _build_matrix(self, date, bases):
+        """ Builds the cross-rate matrix of date from the most complete cached table among
+            bases, unless the matrix of that table is already built """
+        with self._lock:
+            best = None
+            for base in bases:
+                table = self._cache.peek(base, date)
+                if table is not None and (best is None or len(table) > len(best[1])):
+                    best = (base, table)
+            if best is None:
+                return None
+            matrix = self._matrices.get((best[0], date))
+            if matrix is not None and matrix.size > len(best[1]):
+                return matrix
+            matrix = RateMatrix(date, best[0], best[1])
+            self._matrices[(best[0], date)] = matrix
+            while len(self._matrices) > MAX_MATRICES:
+                self._matrices.popitem(last=False)
+            return matrix
+
+    def _identity(self, currency):
+        """ Returns the ExactTable converting currency to itself (rounded to its minor units) """
+        return ExactTable(currency, dict(), **self._exact_options)
+
+    def _cached_exact(self, key):
+        """ Returns the ExactTable converting key.base to key.symbols on key.date, built once
+            from the cached table (of the pivot when triangulating), None if it is not cached """
+        source = self._pivot if self._triangulate else key.base
+        needed = (key.base,) + (key.symbols or ())
+        table = self._exact_tables.get((source, key.date))
+        if table is not None:
+            for currency in needed:
+                if currency not in table.rates:
+                    break
+            else:
+                return table
+        with self._lock:
+            table = self._exact_tables.get((source, key.date))
+            if table is None or not all(x in table for x in needed):
+                rates = self._cache.peek(source, key.date)
+                if rates is None or not all(x in rates or x == source for x in needed):
+                    return None
+                table = ExactTable(source, rates, key.date, **self._exact_options)
+                self._exact_tables[(source, key.date)] = table
+                while len(self._exact_tables) > MAX_MATRICES:
+                    self._exact_tables.popitem(last=False)
+        return table
+
+    def _exact_from(self, key, rates):
+        """ Returns the ExactTable of key once its rates have been fetched. The rates returned
+            are used if they are not cached (e.g. served stale) """
+        table = self._cached_exact(key)
+        if table is None:
+            table = ExactTable(key.base, rates, key.date, **self._exact_options)
+        for symbol in key.symbols or ():
+            if symbol not in table:
+                raise FixerioCurrencyUnavailable('{} is not available on the {} table for this date'
+                                                 .format(symbol, key.base))
+        return table
+
+    def _exact_table(self, key):
+        """ Returns the ExactTable of a RequestKey, fetching its rates if they are not cached """
+        table = self._cached_exact(key)
+        if table is not None:
+            self._metrics.record_cache(True, key.base, key.date)
+            return table
+        return self._exact_from(key, self._rates(key))
+
+    def get_matrix(self, date: str=DEFAULT_DATE) -> RateMatrix:
+        """
+        Returns the dense cross-rate matrix of a date: matrix.rate(base, target) converts
+        between any two currencies of the table it was built from, matrix.currencies gives
+        the currency of every row/column position and matrix.tolist() the rows.
+        Built from a cached table of the date, fetching the full table of the pivot
+        currency (EUR unless changed) if none is cached.
+
+        date
+            :param date: a date to quote rates on. If omitted, DEFAULT_DATE is used
+            :type: str in the format 'yyyy-mm-dd' or 'latest'
+
+        :return store.RateMatrix: the cross-rate matrix
+        """
+        key = self._key(date, self._pivot, None)
+        matrix = self._matrix(self._pivot, key.date)
+        if matrix is None or matrix.size < len(CURRENCIES):
+            matrix = self._build_matrix(key.date, [self._pivot, DEFAULT_BASE] + sorted(ALL_CURRENCIES))
+        if matrix is None or matrix.size < len(CURRENCIES) - 2:
+            self._get_table(key)
+            matrix = self._build_matrix(key.date, [self._pivot])
+        return matrix
+
+    def _cross_rates(self, table, base, symbols):
+        """ Derives the rates of base from the full table of the pivot currency """
+        table = dict(table)
+        table[self._pivot] = 1.0
+        if base not in table:
+            raise FixerioCurrencyUnavailable('{} is not available on the {} table for this date'
+                                             .format(base, self._pivot))
+        targets = table.keys() if symbols is None else _format_currency(symbols)
+        base_rate = float(table[base])
+        try:
+            return {x: float(table[x]) / base_rate for x in targets if x != base}
+        except KeyError as e:
+            raise FixerioCurrencyUnavailable('{} is not available on the {} table for this date'
+                                             .format(e.args[0], self._pivot)) from e
+
+    def _get_table(self, key):
+        """ Returns the rates of a RequestKey from cache if available, otherwise from the API.
+            Concurrent requests for the same base and date are merged by the batcher """
+        cached = self._cached(key.base, key.symbols, key.date)
+        if cached is not None:
+            return cached
+        if key.latest and self._stale_while_revalidate:
+            stale = self._stale(key)
+            if stale is not None:
+                self._revalidate(key)
+                return stale
+        return self._request_table(key)
+
+    def _request_table(self, key):
+        """ Returns the rates of a RequestKey from the API (unless the request recently failed) """
+        self._negative.check(key)
+        symbols = None if key.symbols is None else frozenset(key.symbols)
+        try:
+            table = self._batcher.do(key._replace(symbols=None), symbols, self._fetch)
+        except FixerioApiError as e:
+            self._negative.add(key, e)
+            raise
+        return self._select(table, key.symbols)
+
+    def _stale(self, key):
+        """ Returns the previous latest table of key.base as StaleRates if it has the symbols
+            of key and is not older than max_stale, otherwise None """
+        latest = self._latest_tables.get(key.base)
+        if latest is None:
+            return None
+        date, table, fetched = latest
+        age = time.time() - fetched
+        if date >= key.date or (self._max_stale is not None and age > self._max_stale):
+            return None
+        if key.symbols is not None and not all(x in table for x in key.symbols):
+            return None
+        return StaleRates(self._select(table, key.symbols), date, age)
+
+    def _start_revalidation(self, key):
+        """ Returns True if no refresh of key ran in the last REVALIDATE_INTERVAL seconds
+            (marking one as started) """
+        now = time.time()
+        with self._lock:
+            if self._revalidating.get(key, 0.0) > now:
+                return False
+            self._revalidating[key] = now + REVALIDATE_INTERVAL
+            for old in [k for k, until in self._revalidating.items() if until <= now]:
+                del self._revalidating[old]
+            return True
+
+    def _revalidate(self, key):
+        """ Fetches the table of key in a background thread (at most once per REVALIDATE_INTERVAL) """
+        if self._start_revalidation(key):
+            threading.Thread(target=self._run_revalidation, args=(key,), name='fixerio3-revalidate',
+                             daemon=True).start()
+
+    def _run_revalidation(self, key):
+        """ Refreshes the table of key, recording the outcome in the metrics (on failure the
+            stale table keeps being served) """
+        try:
+            self._request_table(key)
+        except Exception as e:
+            self._metrics.record_revalidation(key.base, key.date, e)
+        else:
+            self._metrics.record_revalidation(key.base, key.date)
+
+    @staticmethod
+    def _select(table, symbols):
+        """ Returns the rates of symbols (None: all) found in table """
+        if symbols is None:
+            return dict(table)
+        return {x: table[x] for x in symbols if x in table}
+
+    def _rates(self, key):
+        """ Returns the rates of a RequestKey, derived from the pivot table when triangulating """
+        if self._triangulate:
+            table = self._get_table(key._replace(base=self._pivot, symbols=None))
+            rates = self._cross_rates(table, key.base, key.symbols)
+            return StaleRates(rates, table.date, table.age) if isinstance(table, StaleRates) else rates
+        return self._get_table(key)
+
     def clear_cache(self):
         """ Clears any references to the cache dictionary """
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._matrices.clear()
+            self._indexes.clear()
+            self._exact_tables.clear()
+            self._negative.clear()
+
+    def get_stats(self):
+        """ Returns counters of the API calls made ('fetches'), of the calls that shared
+            the result of another call for the same table instead ('coalesced'), of the
+            errors served from the negative cache ('negative_hits'), the state of the
+            circuit breaker and the cache statistics (see utils.Cache.stats) """
+        stats = {'fetches': self._batcher.calls, 'coalesced': self._batcher.coalesced,
+                 'negative_hits': self._negative.hits}
+        stats.update(self._breaker.stats())
+        stats.update(self._cache.stats())
+        return stats
+
+    def get_metrics(self):
+        """ Returns the metrics.Metrics of this object: API request latencies, bytes, HTTP
+            statuses and error codes, cache hits/misses/evictions and persistence timings.
+            Use add_hook on it to be called on every event """
+        return self._metrics
+
+    def export_metrics(self):
+        """ Returns the metrics of this object and the statistics of its cache in the
+            Prometheus/OpenMetrics text format """
+        return self._metrics.to_openmetrics(gauges=self._cache.stats())
+
+    def get_calendar(self):
+        """ Returns the businessdays.BusinessCalendar resolving the dates without rates of
+            this object, e.g. to seed it with get_calendar().seed(start, end) """
+        return self._calendar
 
     def get_cache(self):
         """ Returns all contents in the cache """
-        return self._cache
+        return self._cache.as_dict()
 
     def get_rates(self, date: str=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None) -> dict:
         """
@@ -315,32 +1039,14 @@ class Fixerio:
 
         :return dict: a dictionary with the requested rates
         """
-        if not _valid_date(date):
-            raise FixerioInvalidDate('Please enter a valid date')
-        if not _valid_currency(base):
-            raise FixerioInvalidCurrency('Please enter a valid base currency')
-        if not _valid_currency(symbols):
-            raise FixerioInvalidCurrency('Please enter valid symbols (aka target currency)')
-        if self._in_cache(base, symbols, _date(date)):
-            return self._return_cache(base, symbols, _date(date))
-        else:
-            url = self._base_url + date
-            symbols = _format_currency(symbols)
-            payload = (('access_key', self._access_key), ('base', base), ('symbols', symbols))
-            response = requests.get(url, params=payload)
-            json_data = response.json()
-            if 'error' in json_data:
-                raise FixerioException('Something went wrong with your request.\n'
-                                       'Error message: {}'.format(json_data['error']))
-            self._to_cache(json_data)
-            if self._cache_to_file:
-                write_to_file(self._cache, self._out_file_name, self._format_to_file)
-            return json_data['rates']
+        return self._rates(self._key(date, base, symbols))
 
     def convert(self, amount, target, base=DEFAULT_BASE, date=DEFAULT_DATE):
         """
         Converts an amount from the base currency to the target currency.
         Fetches from cache if available, otherwise from the API call.
+        Once the table of base (of the pivot currency when triangulating) is cached, the
+        conversions are served by the cross-rate matrix of the date (see get_matrix).
 
         amount
             :param amount: amount of base currency to convert
@@ -358,21 +1064,368 @@ class Fixerio:
             :param target: currency to convert to
             :type: str (e.g. 'EUR')
 
-        :return float: the converted amount
+        :return float: the converted amount (a Decimal with exact=True)
         """
         try:
             if target is None:
                 raise FixerioInvalidCurrency("Enter a valid 'target' currency")
-            if not _valid_currency(','.join([base, target])):
-                raise FixerioInvalidCurrency('Please enter a valid currencies for the conversion')
+            key = self._key(date, base, target)
+            if self._exact:
+                table = self._identity(base) if base == target else self._exact_table(key)
+                return table.convert(amount, base, target)
             if base == target:
                 return float(amount)
-            elif self._in_cache(base, target, date):
-                conversion_rate = self._return_cache(base, target, date)
-            else:
-                conversion_rate = self.get_rates(date=date, base=base, symbols=target)
+            # without triangulation only the matrix built from the table of base gives its rates
+            matrix = self._matrix(self._pivot if self._triangulate else base, key.date)
+            if matrix is not None:
+                rate = matrix.rate(base, target)
+                if rate is not None:
+                    self._metrics.record_cache(True, base, key.date)
+                    return float(amount) * rate
+            conversion_rate = self._cached(base, key.symbols, key.date)
+            if conversion_rate is None:
+                conversion_rate = self._rates(key)
+            # the next conversions on this date are served by the matrix
+            self._build_matrix(key.date, [self._pivot if self._triangulate else base])
             return float(amount) * float(conversion_rate[target])
         except ValueError as e:
             raise ValueError('Please enter a valid numeric amount to convert') from e
         except TypeError as e:
             raise TypeError('Please enter valid currency codes.') from e
+
+    def convert_many(self, amounts, targets, bases=DEFAULT_BASE, dates=DEFAULT_DATE):
+        """
+        Converts many amounts at once (the same parameters as convert, one per amount).
+        Rows are grouped by (base, date) so each table is looked up (or fetched) only
+        once, then all amounts are multiplied by their rates.
+
+        amounts
+            :param amounts: amounts of base currency to convert
+            :type: list, numpy array or pandas Series of numbers
+
+        targets
+            :param targets: currencies to convert to, one per amount or a single one for all
+            :type: str or list of str (e.g. 'EUR')
+
+        bases
+            :param bases: currencies to convert from, one per amount or a single one for all.
+                          If omitted, DEFAULT_BASE is used
+            :type: str or list of str (e.g. 'USD')
+
+        dates
+            :param dates: dates to quote rates on, one per amount or a single one for all.
+                          If omitted, DEFAULT_DATE is used
+            :type: str or list of str in the format 'yyyy-mm-dd' or 'latest'
+
+        :return: the converted amounts aligned with the input; a numpy array (a list if
+                 numpy is not installed, a list of Decimals with exact=True) or a pandas
+                 Series with the index of amounts
+        """
+        rows, groups = self._conversion_rows(amounts, targets, bases, dates)
+        rates = dict()
+        for (base, date), group in groups.items():
+            symbols = sorted(group.difference({base}))
+            if not symbols:
+                table = self._identity(base) if self._exact else dict()
+            elif self._exact:
+                table = self._exact_table(self._key(date, base, symbols))
+            else:
+                table = self.get_rates(date=date, base=base, symbols=symbols)
+            self._group_rates(rates, base, date, group, table)
+        return self._converted(amounts, rows, rates)
+
+    @staticmethod
+    def _conversion_rows(amounts, targets, bases, dates):
+        """ Returns the (base, target, date) row of every amount and the targets of every
+            (base, date) group of rows """
+        length = len(amounts)
+        rows = list(zip(_column(bases, length), _column(targets, length), _column(dates, length)))
+        groups = dict()
+        for base, target, date in set(rows):
+            if target is None:
+                raise FixerioInvalidCurrency("Enter a valid 'target' currency")
+            groups.setdefault((base, date), set()).add(target)
+        if not _valid_currency([x for key in groups for x in groups[key] | {key[0]}]):
+            raise FixerioInvalidCurrency('Please enter a valid currencies for the conversion')
+        return rows, groups
+
+    def _group_rates(self, rates, base, date, group, table):
+        """ Adds the rate (the ExactTable parameters with exact=True) of every row of a group
+            to rates, table being the rates of base on date """
+        if self._exact:
+            rates.update(((base, target, date), table.parameters(base, target)) for target in group)
+        else:
+            for target in group:
+                rates[(base, target, date)] = 1.0 if target == base else float(table[target])
+
+    def _converted(self, amounts, rows, rates):
+        """ Returns the amounts converted with the rates of their rows (see convert_many) """
+        length = len(amounts)
+        try:
+            if self._exact:
+                converted = [to_decimal(convert_units(amount, *rates[row]), rates[row][2])
+                             for amount, row in zip(amounts, rows)]
+            elif numpy is not None:
+                converted = numpy.asarray(amounts, dtype=float) * numpy.fromiter(
+                    (rates[row] for row in rows), dtype=float, count=length)
+            else:
+                converted = [float(amount) * rates[row] for amount, row in zip(amounts, rows)]
+        except (ValueError, TypeError) as e:
+            raise ValueError('Please enter valid numeric amounts to convert') from e
+        index = getattr(amounts, 'index', None)
+        if index is not None and hasattr(amounts, 'to_numpy'):
+            return type(amounts)(converted, index=index, name=getattr(amounts, 'name', None))
+        return converted
+
+    def convert_minor_units(self, amounts, target, base=DEFAULT_BASE, date=DEFAULT_DATE):
+        """
+        Converts integer amounts in minor units of the base currency (e.g. cents) to minor
+        units of the target currency, exactly: the rate is stored once as a scaled integer
+        and every amount is converted in integer arithmetic, rounded with the rounding mode
+        of the target (see the exact, rounding and minor_units parameters of Fixerio).
+
+        amounts
+            :param amounts: amounts in minor units of base
+            :type: int, list of int, array.array or numpy integer array
+
+        target
+            :param target: currency to convert to
+            :type: str (e.g. 'EUR')
+
+        base
+            :param base: currency to convert from. If omitted, DEFAULT_BASE is used
+            :type: str (e.g. 'USD')
+
+        date
+            :param date: a date to quote rates on. If omitted, DEFAULT_DATE is used
+            :type: str in the format 'yyyy-mm-dd' or 'latest'
+
+        :return: the amounts in minor units of target, of the same kind as amounts
+                 (a list for other iterables)
+        """
+        if target is None:
+            raise FixerioInvalidCurrency("Enter a valid 'target' currency")
+        key = self._key(date, base, target)
+        table = self._identity(base) if base == target else self._exact_table(key)
+        return self._minor_units(table, amounts, base, target)
+
+    @staticmethod
+    def _minor_units(table, amounts, base, target):
+        """ Converts amounts in minor units with an ExactTable (see convert_minor_units) """
+        if isinstance(amounts, int) and not isinstance(amounts, bool):
+            return table.convert_minor_units([amounts], base, target)[0]
+        try:
+            return table.convert_minor_units(amounts, base, target)
+        except TypeError as e:
+            raise ValueError('Please enter integer amounts of minor units to convert') from e
+
+    def _timeseries_request(self, start, end, base, symbols):
+        """ Returns the url and query parameters of one chunk of the timeseries endpoint """
+        url, payload = _build_request(self._base_url, 'timeseries', base, symbols, self._access_key)
+        return url, payload + (('start_date', str(start)), ('end_date', str(end)))
+
+    def _fetch_timeseries(self, start, end, base, symbols):
+        """ Requests one chunk of the timeseries endpoint and caches every table it contains """
+        return self._cache_timeseries(self._call_api(*self._timeseries_request(start, end, base, symbols)), base)
+
+    def _cache_timeseries(self, json_data, base):
+        """ Caches every table of a timeseries response and returns its {date: rates} """
+        with self._lock:
+            for date, rates in json_data['rates'].items():
+                self._to_cache({'base': json_data.get('base', base), 'date': date, 'rates': rates})
+        return json_data['rates']
+
+    def _check_range(self, start, end, base, symbols):
+        """ Raises an exception if any of the parameters of a range of dates is invalid,
+            otherwise returns the first and last dates of the range """
+        self._check_args(start, base, symbols)
+        self._check_args(end, base, symbols)
+        first = _format_date(_date(start))
+        last = _format_date(_date(end))
+        if first > last:
+            raise FixerioInvalidDate('Please enter a start date before the end date')
+        return first, last
+
+    def get_timeseries(self, start, end=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None,
+                       max_workers=DEFAULT_WORKERS) -> dict:
+        """
+        Returns the rates of every day between start and end (both included).
+        With the paid membership the range is downloaded from the timeseries endpoint in
+        chunks of at most MAX_TIMESERIES_DAYS days, otherwise (the open and free endpoints
+        have no timeseries) one request per day is made. Either way up to max_workers
+        requests run at once and every table is added to the cache.
+
+        start
+            :param start: first date of the range
+            :type: str in the format 'yyyy-mm-dd'
+
+        end
+            :param end: last date of the range. If omitted, DEFAULT_DATE is used
+            :type: str in the format 'yyyy-mm-dd' or 'latest'
+
+        base
+            :param base: currency to quote rates against. If omitted, DEFAULT_BASE is used
+            :type: str (e.g. 'USD')
+
+        symbols
+            :param symbols: currency symbols to request specific exchange rates for
+            :type: str or list e.g. 'USD,JPY,EUR' or [USD, JPY, EUR]
+
+        :return dict: a dictionary mapping each date ('yyyy-mm-dd') to its rates
+        """
+        first, last = self._check_range(start, end, base, symbols)
+        series = dict()
+        fetched = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if self._paid_membership and not self._triangulate:
+                chunks = executor.map(lambda chunk: self._fetch_timeseries(chunk[0], chunk[1], base,
+                                                                           _format_currency(symbols)),
+                                      _date_range(first, last, MAX_TIMESERIES_DAYS))
+                for chunk in chunks:
+                    series.update(chunk)
+                fetched = [(base, date, rates) for date, rates in series.items()]
+            else:
+                # get_rates already persists every table it fetches
+                days = [str(day) for day, _ in _date_range(first, last)]
+                tables = executor.map(lambda day: self.get_rates(date=day, base=base, symbols=symbols), days)
+                series.update(zip(days, tables))
+        if self._cache_to_file:
+            self._persist(fetched)
+        return series
+
+    def _missing_days(self, days, base, symbols):
+        """ Returns the days of 'days' (sorted) whose rates are not cached yet and, with the
+            paid membership, the (first, last) timeseries chunks covering them """
+        table_base, table_symbols = (self._pivot, None) if self._triangulate else (base, symbols)
+        with self._lock:
+            cached = [self._in_cache(table_base, table_symbols, day) for day in days]
+        missing = [day for day, in_cache in zip(days, cached) if not in_cache]
+        if not missing or not self._paid_membership or self._triangulate:
+            return missing, None
+        # one timeseries request per run of consecutive missing days
+        runs = []
+        for i, day in enumerate(days):
+            if not cached[i]:
+                if i and not cached[i - 1]:
+                    runs[-1][1] = day
+                else:
+                    runs.append([day, day])
+        return missing, [chunk for first, last in runs
+                         for chunk in _date_range(_format_date(first), _format_date(last), MAX_TIMESERIES_DAYS)]
+
+    def _history(self, days, base, symbols, max_workers):
+        """ Returns the {date: rates} tables of the resolved business days 'days' (sorted),
+            requesting only the days whose rates are not cached yet """
+        missing, chunks = self._missing_days(days, base, symbols)
+        if missing:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                if chunks is not None:
+                    fetched = [(base, date, rates)
+                               for chunk in executor.map(lambda chunk: self._fetch_timeseries(chunk[0], chunk[1],
+                                                                                              base, symbols), chunks)
+                               for date, rates in chunk.items()]
+                    if self._cache_to_file:
+                        self._persist(fetched)
+                else:
+                    list(executor.map(lambda day: self.get_rates(date=day, base=base, symbols=symbols), missing))
+        return {date: self.get_rates(date=date, base=base, symbols=symbols) for date in self._history_dates(days)}
+
+    def _history_dates(self, days):
+        """ Returns the dates of the tables holding the rates of days, each once. Days the API
+            answered with an earlier table (closures the calendar rules do not know about)
+            are resolved again so that every table is counted once """
+        return sorted({self._calendar.resolve(day) for day in days})
+
+    def _range_key(self, start, end, base, symbols):
+        """ Returns the RequestKey of the last table of the range start to end, the date of
+            its first table and either the range indexes already covering the range or,
+            if there are none, the dates of its tables """
+        first, last = self._check_range(start, end, base, symbols)
+        key = self._key(str(last), base, symbols)
+        first_table = self._calendar.resolve(str(first))
+        with self._lock:
+            entry = self._indexes.get(key[1:3])
+            if entry is not None and entry[0] <= first_table and key.date <= entry[1]:
+                self._indexes.move_to_end(key[1:3])
+                return key, first_table, entry[2], None
+        days = sorted({self._calendar.resolve(str(day)) for day, _ in _date_range(first, last)})
+        return key, first_table, None, days
+
+    def _index_history(self, key, history):
+        """ Builds the {currency: RangeIndex} of the tables of history and keeps them """
+        dates = sorted(history)
+        currencies = set(key.symbols) if key.symbols is not None else {x for rates in history.values() for x in rates}
+        indexes = dict()
+        for currency in currencies:
+            known = [date for date in dates if currency in history[date]]
+            if known:
+                indexes[currency] = RangeIndex(known, [float(history[date][currency]) for date in known])
+        with self._lock:
+            self._indexes[key[1:3]] = (dates[0], dates[-1], indexes)
+            self._indexes.move_to_end(key[1:3])
+            while len(self._indexes) > MAX_INDEXES:
+                self._indexes.popitem(last=False)
+        return indexes
+
+    def _range_indexes(self, start, end, base, symbols, max_workers):
+        """ Returns the first and last table dates of the range start to end and the
+            {currency: RangeIndex} of base and symbols covering them, built once per range """
+        key, first_table, indexes, days = self._range_key(start, end, base, symbols)
+        if indexes is None:
+            indexes = self._index_history(key, self._history(days, base, key.symbols, max_workers))
+        return first_table, key.date, indexes
+
+    def _range_query(self, start, end, base, symbols, max_workers, query):
+        return self._query_indexes(*self._range_indexes(start, end, base, symbols, max_workers), query)
+
+    @staticmethod
+    def _query_indexes(first, last, indexes, query):
+        """ Returns the result of query on the span of first to last of every index """
+        results = dict()
+        for currency, index in sorted(indexes.items()):
+            span = index.span(first, last)
+            if span is not None:
+                results[currency] = query(index, *span)
+        return results
+
+    def fluctuation(self, start, end=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None,
+                    max_workers=DEFAULT_WORKERS) -> dict:
+        """
+        Returns how the rates changed between start and end, like the fluctuation endpoint
+        of fixer.io but computed locally from the cached tables. Only the days not cached
+        yet are requested (see get_timeseries), and the range indexes built from the tables
+        are kept so that any range within them is answered without going through the days.
+        Dates without rates (weekends, holidays) count as the previous business day.
+
+        start
+            :param start: first date of the range
+            :type: str in the format 'yyyy-mm-dd'
+
+        end
+            :param end: last date of the range. If omitted, DEFAULT_DATE is used
+            :type: str in the format 'yyyy-mm-dd' or 'latest'
+
+        base
+            :param base: currency to quote rates against. If omitted, DEFAULT_BASE is used
+            :type: str (e.g. 'USD')
+
+        symbols
+            :param symbols: currency symbols to request specific exchange rates for
+            :type: str or list e.g. 'USD,JPY,EUR' or [USD, JPY, EUR]
+
+        :return dict: a dictionary mapping each currency to its 'start_rate', 'end_rate',
+                      'change' and 'change_pct' (currencies without rates in the range are left out)
+        """
+        return self._range_query(start, end, base, symbols, max_workers, RangeIndex.fluctuation)
+
+    def stats(self, start, end=DEFAULT_DATE, base: str=DEFAULT_BASE, symbols=None,
+              max_workers=DEFAULT_WORKERS) -> dict:
+        """
+        Returns the statistics of the rates between start and end, computed locally like
+        fluctuation (same parameters): for each currency the fluctuation plus 'start_date',
+        'end_date', 'count' (tables in the range), 'min' and 'max' with their dates
+        ('min_date', 'max_date'), 'mean' and 'stdev' (population standard deviation).
+
+        :return dict: a dictionary mapping each currency to its statistics
+        """
+        return self._range_query(start, end, base, symbols, max_workers, RangeIndex.summary)
@@ -0,0 +1,124 @@
+"""
+This file provides the append-only journal used by Fixerio to persist its cache
+incrementally. Every table fetched from the API is appended to '<file>.journal' as one
+checksummed line instead of rewriting the whole cache file. Every compact_every appends
+the journal is compacted in a background thread: the journal is rotated, a full snapshot
+is written to '<file>' (atomically, through the 'snapshot' callable) and the rotated
+journal is deleted.
+
+On load the snapshot is read first and then replay() yields the tables of the rotated
+and current journals in order. A line torn by a crash fails its checksum; it and
+anything after it are discarded and the journal is truncated to its last good line.
+
+Journal(file, snapshot, compact_every=DEFAULT_COMPACT_EVERY, fsync=False)
+"""
+
+import json
+import os
+import threading
+import zlib
+
+# Modify DEFAULT_COMPACT_EVERY to change how many appends trigger a compaction
+DEFAULT_COMPACT_EVERY = 1000
+
+
+def _encode(base, date, rates):
+    """ Returns a journal line: the crc32 of the json record followed by the record """
+    record = json.dumps({'base': base, 'date': date, 'rates': dict(rates)},
+                        ensure_ascii=False, separators=(',', ':'))
+    return '{:08x} {}\n'.format(zlib.crc32(record.encode('utf-8')), record)
+
+
+def _decode(line):
+    """ Returns the record of a journal line, None if the line is torn or corrupt """
+    if not line.endswith('\n') or line[8:9] != ' ':
+        return None
+    record = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(record.encode('utf-8')):
+            return None
+        return json.loads(record)
+    except ValueError:
+        return None
+
+
+class Journal:
+    """
+    Append-only journal of rate tables.
+
+    file: the snapshot file; the journal is kept in '<file>.journal'
+    snapshot: callable writing the full cache to 'file' atomically, called on compaction
+    compact_every: number of appends after which the journal is compacted (None: never)
+    fsync: whether every append is flushed to disk with os.fsync
+    """
+
+    def __init__(self, file, snapshot, compact_every=DEFAULT_COMPACT_EVERY, fsync=False):
+        self.file = file
+        self.path = file + '.journal'
+        self._rotated = file + '.journal.compacting'
+        self._snapshot = snapshot
+        self._compact_every = compact_every
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._compacting = threading.Lock()
+        self._appends = 0
+        self._handle = None
+
+    def _replay_file(self, path, truncate):
+        """ Yields the records of one journal file up to its first torn or corrupt line """
+        if not os.path.exists(path):
+            return
+        good = 0
+        with open(path, 'r', encoding='utf-8', newline='\n') as f:
+            for line in iter(f.readline, ''):
+                record = _decode(line)
+                if record is None:
+                    break
+                good += len(line.encode('utf-8'))
+                yield record['base'], record['date'], record['rates']
+        if truncate and good != os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(good)
+
+    def replay(self):
+        """ Yields (base, date, rates) for every table journaled since the last snapshot """
+        with self._lock:
+            yield from self._replay_file(self._rotated, truncate=False)
+            yield from self._replay_file(self.path, truncate=True)
+
+    def append(self, base, date, rates):
+        """ Appends a table to the journal, starting a background compaction when due """
+        line = _encode(base, date, rates)
+        with self._lock:
+            if self._handle is None:
+                self._handle = open(self.path, 'a', encoding='utf-8', newline='\n')
+            self._handle.write(line)
+            self._handle.flush()
+            if self._fsync:
+                os.fsync(self._handle.fileno())
+            self._appends += 1
+            due = self._compact_every is not None and self._appends >= self._compact_every
+        if due and not self._compacting.locked():
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self):
+        """ Writes a full snapshot and discards the journaled tables it contains """
+        with self._compacting:
+            with self._lock:
+                if self._handle is not None:
+                    self._handle.close()
+                    self._handle = None
+                if os.path.exists(self.path) and not os.path.exists(self._rotated):
+                    os.replace(self.path, self._rotated)
+                self._appends = 0
+            # tables cached before this point are in the snapshot, later ones are journaled
+            self._snapshot()
+            if os.path.exists(self._rotated):
+                os.unlink(self._rotated)
+
+    def close(self):
+        """ Closes the journal file """
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
@@ -0,0 +1,280 @@
+"""
+This file provides the instrumentation of fixerio3: a Metrics object counting the API
+requests (with a latency histogram, the bytes received, the HTTP statuses and the API
+error codes, e.g. 104 when the monthly quota is exhausted), the cache hits, misses and
+evictions, the background revalidations of stale tables and the time spent persisting
+the cache to file.
+
+Every Fixerio object records into its own Metrics (or the one passed with 'metrics'),
+the module functions record into DEFAULT_METRICS. Callbacks registered with add_hook
+are called with every event as it is recorded, and to_openmetrics() renders the
+counters in the Prometheus/OpenMetrics text format.
+
+Events passed to the hooks as hook(event, fields):
+    'request': url, seconds, status, bytes, code (API error code or None), error (exception or None)
+    'cache': hit (bool), base, date
+    'evict': base, date
+    'revalidate': base, date, error (exception or None)
+    'persist': kind ('snapshot' or 'journal'), seconds, tables
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from datetime import timezone
+
+# Modify these to change the buckets (upper bounds in seconds) of the histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PERSIST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DEFAULT_PREFIX = 'fixerio3'
+
+
+class Histogram:
+    """ Counts observations into buckets of upper bounds 'buckets' (plus +Inf), with their sum """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """ Returns (upper bound, observations <= upper bound) pairs, the last bound being +Inf """
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def as_dict(self):
+        return {'count': self.count, 'sum': self.sum,
+                'buckets': {_format_bound(bound): count for bound, count in self.cumulative()}}
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _month(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m')
+
+
+def _error_code(json_data):
+    """ Returns the API error code of a decoded response, None if it is not an error """
+    if isinstance(json_data, dict) and isinstance(json_data.get('error'), dict):
+        return json_data['error'].get('code')
+    return None
+
+
+class Metrics:
+    """
+    Thread-safe counters of a Fixerio object (or of the module functions).
+
+    quota: the number of API requests allowed per calendar month (UTC) by the fixer.io
+           plan, used to report quota_remaining. Only the requests recorded by this object
+           are counted, pass the same Metrics to every Fixerio sharing an access key.
+    """
+
+    def __init__(self, quota=None, clock=time.time):
+        self.quota = quota
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hooks = []
+        self.reset()
+
+    def reset(self):
+        """ Sets every counter back to zero (the hooks are kept) """
+        with self._lock:
+            self.requests = 0
+            self.failed_requests = 0
+            self.bytes_received = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.revalidations = 0
+            self.failed_revalidations = 0
+            self.last_revalidation_error = None
+            self.hook_errors = 0
+            self.statuses = dict()
+            self.error_codes = dict()
+            self.latency = Histogram(LATENCY_BUCKETS)
+            self.persistence = dict()
+            self._months = dict()
+
+    def add_hook(self, hook):
+        """ Registers hook(event, fields) to be called on every event (see the module docstring) """
+        with self._lock:
+            self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self._hooks = [x for x in self._hooks if x is not hook]
+
+    def _emit(self, event, fields):
+        # an exception in a hook must not fail the call being recorded
+        for hook in self._hooks:
+            try:
+                hook(event, fields)
+            except Exception:
+                with self._lock:
+                    self.hook_errors += 1
+
+    def record_request(self, url, seconds, status=None, size=0, json_data=None, error=None):
+        """ Records an API request: its duration, HTTP status, response size and API error code """
+        code = _error_code(json_data)
+        month = _month(self._clock())
+        with self._lock:
+            self.requests += 1
+            self._months[month] = self._months.get(month, 0) + 1
+            self.latency.observe(seconds)
+            self.bytes_received += size
+            if status is not None:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+            if code is not None:
+                self.error_codes[code] = self.error_codes.get(code, 0) + 1
+            if error is not None:
+                self.failed_requests += 1
+        if self._hooks:
+            self._emit('request', {'url': url, 'seconds': seconds, 'status': status, 'bytes': size,
+                                   'code': code, 'error': error})
+
+    def record_cache(self, hit, base=None, date=None):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if self._hooks:
+            self._emit('cache', {'hit': hit, 'base': base, 'date': date})
+
+    def record_eviction(self, base, date):
+        with self._lock:
+            self.evictions += 1
+        if self._hooks:
+            self._emit('evict', {'base': base, 'date': date})
+
+    def record_revalidation(self, base, date, error=None):
+        """ Records a background refresh of a stale table, and the exception it raised if any """
+        with self._lock:
+            self.revalidations += 1
+            if error is not None:
+                self.failed_revalidations += 1
+                self.last_revalidation_error = error
+        if self._hooks:
+            self._emit('revalidate', {'base': base, 'date': date, 'error': error})
+
+    def record_persist(self, kind, seconds, tables=None):
+        with self._lock:
+            histogram = self.persistence.get(kind)
+            if histogram is None:
+                histogram = self.persistence[kind] = Histogram(PERSIST_BUCKETS)
+            histogram.observe(seconds)
+        if self._hooks:
+            self._emit('persist', {'kind': kind, 'seconds': seconds, 'tables': tables})
+
+    @contextmanager
+    def persisting(self, kind, tables=None):
+        """ Context manager recording the time spent in its block as a 'kind' persistence """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_persist(kind, time.perf_counter() - start, tables)
+
+    @property
+    def hit_ratio(self):
+        """ Fraction of the cache lookups that were hits, None before any lookup """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    @property
+    def quota_used(self):
+        """ API requests recorded during the current calendar month (UTC) """
+        return self._months.get(_month(self._clock()), 0)
+
+    @property
+    def quota_remaining(self):
+        """ API requests left this month according to 'quota', None if no quota is set """
+        return None if self.quota is None else max(self.quota - self.quota_used, 0)
+
+    def snapshot(self):
+        """ Returns every counter as a dictionary """
+        with self._lock:
+            snapshot = {'requests': self.requests, 'failed_requests': self.failed_requests,
+                        'bytes_received': self.bytes_received, 'hits': self.hits, 'misses': self.misses,
+                        'evictions': self.evictions, 'revalidations': self.revalidations,
+                        'failed_revalidations': self.failed_revalidations, 'statuses': dict(self.statuses),
+                        'error_codes': dict(self.error_codes), 'latency': self.latency.as_dict(),
+                        'persistence': {k: v.as_dict() for k, v in self.persistence.items()},
+                        'hook_errors': self.hook_errors}
+        snapshot['hit_ratio'] = self.hit_ratio
+        snapshot['quota_used'] = self.quota_used
+        snapshot['quota_remaining'] = self.quota_remaining
+        return snapshot
+
+    def to_openmetrics(self, prefix=DEFAULT_PREFIX, gauges=None):
+        """
+        Returns the counters in the OpenMetrics text format (also readable by Prometheus).
+        'gauges' is an optional {name: number} dictionary exported as extra gauges, e.g. the
+        stats() of the cache backend.
+        """
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+            for suffix, labels, value in samples:
+                label_text = ','.join('{}="{}"'.format(k, v) for k, v in labels)
+                lines.append('{}_{}{}{} {}'.format(prefix, name, suffix,
+                                                  '{' + label_text + '}' if label_text else '', value))
+
+        def histogram(histogram, labels=()):
+            samples = [('_bucket', labels + (('le', _format_bound(bound)),), count)
+                       for bound, count in histogram.cumulative()]
+            return samples + [('_sum', labels, repr(histogram.sum)), ('_count', labels, histogram.count)]
+
+        with self._lock:
+            metric('requests', 'counter', 'API requests made.', [('_total', (), self.requests)])
+            metric('failed_requests', 'counter', 'API requests that raised an exception.',
+                   [('_total', (), self.failed_requests)])
+            metric('received_bytes', 'counter', 'Bytes of API responses received.',
+                   [('_total', (), self.bytes_received)])
+            metric('request_duration_seconds', 'histogram', 'Duration of the API requests.',
+                   histogram(self.latency))
+            metric('http_responses', 'counter', 'API responses by HTTP status.',
+                   [('_total', (('status', status),), count) for status, count in sorted(self.statuses.items())])
+            metric('api_errors', 'counter', 'API error responses by fixer.io error code.',
+                   [('_total', (('code', code),), count) for code, count in sorted(self.error_codes.items())])
+            metric('cache_hits', 'counter', 'Lookups served from the cache.', [('_total', (), self.hits)])
+            metric('cache_misses', 'counter', 'Lookups not found in the cache.', [('_total', (), self.misses)])
+            metric('cache_evictions', 'counter', 'Tables evicted from the cache.', [('_total', (), self.evictions)])
+            metric('revalidations', 'counter', 'Background refreshes of stale tables.',
+                   [('_total', (), self.revalidations)])
+            metric('failed_revalidations', 'counter', 'Background refreshes of stale tables that failed.',
+                   [('_total', (), self.failed_revalidations)])
+            samples = []
+            for kind in sorted(self.persistence):
+                samples.extend(histogram(self.persistence[kind], (('kind', kind),)))
+            metric('persist_duration_seconds', 'histogram', 'Duration of the writes of the cache to file.',
+                   samples)
+        metric('quota_used', 'gauge', 'API requests made this calendar month (UTC).',
+               [('', (), self.quota_used)])
+        if self.quota is not None:
+            metric('quota_remaining', 'gauge', 'API requests left this month.', [('', (), self.quota_remaining)])
+        for name, value in sorted((gauges or dict()).items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metric('cache_backend_' + name, 'gauge', 'Cache backend statistic {}.'.format(name), [('', (), value)])
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+# Metrics of the module functions fixerio.get_rates/convert and aio.get_rates/convert
+DEFAULT_METRICS = Metrics()
@@ -0,0 +1,92 @@
+"""
+This file provides the background scheduler that prefetches the latest rates of a
+Fixerio object right after fixer.io publishes them (UPDATE_TIME_UTC), so that calls made
+after the rollover find the new tables already cached instead of blocking on the API.
+Start it with Fixerio.start_prefetch().
+
+PrefetchScheduler(fixerio, bases, symbols=None, jitter=DEFAULT_JITTER,
+                  retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY)
+"""
+
+import random
+import threading
+import time
+from fixerio3.fixerio import _date
+from fixerio3.fixerio import _format_date
+from fixerio3.fixerio import _next_update
+from fixerio3.businessdays import previous_business_day
+
+# Modify these to change the defaults of every new scheduler
+DEFAULT_JITTER = 60  # seconds, a random delay up to this is added after each rollover
+DEFAULT_RETRIES = 10
+DEFAULT_RETRY_DELAY = 30  # seconds between attempts while the new tables are not published
+
+
+class PrefetchScheduler:
+    """
+    Thread prefetching the latest tables of 'bases' (limited to 'symbols' if given) once
+    when started and then after every rollover, plus a random delay of up to 'jitter'
+    seconds so that many processes do not hit the API at the same time. If the API has
+    not published the new date yet, or the request fails, it is retried up to 'retries'
+    times every 'retry_delay' seconds. All tables are swapped into the cache at once.
+    """
+
+    def __init__(self, fixerio, bases, symbols=None, jitter=DEFAULT_JITTER,
+                 retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+        self._fixerio = fixerio
+        self._bases = list(bases)
+        self._symbols = symbols
+        self._jitter = jitter
+        self._retries = retries
+        self._retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.failures = 0
+        self.last_error = None
+
+    def start(self):
+        """ Starts the scheduler thread """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='fixerio3-prefetch', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """ Stops the scheduler thread and waits for it to exit """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def prefetch(self):
+        """ Fetches the latest tables now, retrying until the current date is published.
+            Returns True if the cache was updated """
+        for attempt in range(self._retries + 1):
+            if attempt and self._stop.wait(self._retry_delay):
+                return False
+            try:
+                if self._fixerio._refresh(self._bases, self._symbols, expected_date=self._expected_date()):
+                    self.runs += 1
+                    return True
+            except Exception as e:
+                self.last_error = e
+        self.failures += 1
+        return False
+
+    def _expected_date(self):
+        """ Returns the date of the latest table: the current date, or the last business day
+            before it on weekends and holidays (when no new rates are published) """
+        return self._fixerio._calendar.resolve(str(previous_business_day(_format_date(_date()))))
+
+    def _run(self):
+        self.prefetch()
+        while not self._stop.is_set():
+            delay = _next_update() - time.time() + random.uniform(0, self._jitter)
+            if self._stop.wait(max(delay, 0)):
+                return
+            self.prefetch()
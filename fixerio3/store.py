@@ -0,0 +1,399 @@
+"""
+This file provides the columnar store backing the Fixerio cache.
+Rather than nested dictionaries of boxed floats (or strings), every table is one float64
+row with a column per currency, kept in a {day: row} map per base currency: currencies
+are interned into a column index, dates into a day ordinal counted from the store epoch
+(MIN_DATE for Fixerio), and missing rates are NaN. Only the days actually stored hold a
+row, and a row is released as soon as its table is deleted. Looking up a rate is two
+dictionary lookups and one array read.
+
+A store can be saved to a binary file with write_binary and opened again with
+MappedRateStore, which memory-maps the file: opening is near-instant, rows are read
+from disk on demand and every process mapping the same file shares its page cache.
+Binary file layout (all integers unsigned, in the byte order recorded in the header):
+
+    header      magic b'FXR3', version (H), byte order (H, 1 = little), number of
+                currencies (I), number of bases (I), epoch ordinal (I)
+    currencies  8 bytes (ascii, NUL padded) per currency column
+    bases       base (8s), first day (I), number of rows (I), data offset (Q) per base
+    data        float64 rows of every base, 8 byte aligned, NaN for missing rates
+
+RateStore(currencies, epoch, layer=None)
+MappedRateStore(file)
+write_binary(store, file)
+RateMatrix(date, base, table, expires=None)
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from datetime import date as dtdate
+from functools import lru_cache
+from fixerio3.exceptions import FixerioException
+from fixerio3.utils import atomic_write
+
+NAN = float('nan')
+MAGIC = b'FXR3'
+VERSION = 1
+_HEADER = struct.Struct('<4sHHIII')
+_CURRENCY = struct.Struct('<8s')
+_BASE = struct.Struct('<8sIIQ')
+
+
+# bytes used by an array object besides its items
+_ROW_OVERHEAD = sys.getsizeof(array('d'))
+
+
+@lru_cache(maxsize=16384)
+def _ordinal(date):
+    """ Returns the proleptic Gregorian ordinal of a 'yyyy-mm-dd' date (memoized) """
+    return dtdate(*(int(x) for x in date.split('-'))).toordinal()
+
+
+class RatesView(Mapping):
+    """ Read-only {symbol: rate} mapping over one row of a RateStore, created without copying """
+    __slots__ = ('_index', '_currencies', '_data', '_offset')
+
+    def __init__(self, index, currencies, data, offset):
+        self._index = index
+        self._currencies = currencies
+        self._data = data
+        self._offset = offset
+
+    def __getitem__(self, symbol):
+        rate = self._data[self._offset + self._index[symbol]]
+        if rate != rate:
+            raise KeyError(symbol)
+        return rate
+
+    def __contains__(self, symbol):
+        i = self._index.get(symbol)
+        return i is not None and self._data[self._offset + i] == self._data[self._offset + i]
+
+    def __iter__(self):
+        data, offset = self._data, self._offset
+        return (c for i, c in enumerate(self._currencies) if data[offset + i] == data[offset + i])
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class RateStore:
+    """
+    Columnar storage of rate tables keyed by (base, date).
+
+    currencies: the initial column index (e.g. ALL_CURRENCIES). Currencies outside of it
+    are appended to the index the first time they are stored.
+    epoch: the first date that can be stored (e.g. MIN_DATE).
+    layer: an optional read-only store (e.g. a MappedRateStore) consulted for the tables
+    this store does not hold. Tables are always written to this store.
+    """
+
+    def __init__(self, currencies, epoch, layer=None):
+        self.currencies = sorted(currencies)
+        self._index = {c: i for i, c in enumerate(self.currencies)}
+        self._epoch = epoch.toordinal()
+        self._tables = dict()
+        self.layer = layer
+
+    @property
+    def width(self):
+        """ Number of currency columns """
+        return len(self.currencies)
+
+    @property
+    def row_size(self):
+        """ Bytes used by one row """
+        return self.width * 8 + _ROW_OVERHEAD
+
+    @property
+    def rows(self):
+        """ Number of rows held by this store (not counting its layer) """
+        return sum(len(table) for table in self._tables.values())
+
+    @property
+    def nbytes(self):
+        """ Bytes used by the rows of every base """
+        return self.rows * self.row_size
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        base, date = key
+        table = self._tables.get(base)
+        if table is not None and self._day(date) in table:
+            return True
+        return self.layer is not None and key in self.layer
+
+    def _day(self, date):
+        """ Returns the day ordinal of date counted from the epoch """
+        day = _ordinal(date) - self._epoch
+        if day < 0:
+            raise ValueError('{} is before the first date of the store'.format(date))
+        return day
+
+    def _add_currency(self, symbol):
+        """ Appends a column for symbol to every row """
+        self._index[symbol] = self.width
+        self.currencies.append(symbol)
+        for table in self._tables.values():
+            for day, row in table.items():
+                table[day] = row + array('d', [NAN])
+
+    def offset(self, base, date):
+        """ Returns (array, offset) of the row of base on date, None if it is not stored """
+        table = self._tables.get(base)
+        if table is None:
+            return None
+        row = table.get(self._day(date))
+        if row is None:
+            return None
+        return row, 0
+
+    def get(self, base, date):
+        """ Returns a read-only view of the rates of base on date, None if not stored """
+        row = self.offset(base, date)
+        if row is None:
+            return None if self.layer is None else self.layer.get(base, date)
+        return RatesView(self._index, self.currencies, row[0], row[1])
+
+    def rate(self, base, date, symbol):
+        """ Returns a single rate, None if it is not stored """
+        row = self.offset(base, date)
+        if row is None:
+            return None if self.layer is None else self.layer.rate(base, date, symbol)
+        i = self._index.get(symbol)
+        if i is None:
+            return None
+        rate = row[0][row[1] + i]
+        return None if rate != rate else rate
+
+    def set(self, base, date, rates):
+        """ Stores the rates of base on date, replacing any rates stored for that day """
+        for symbol in rates:
+            if symbol not in self._index:
+                self._add_currency(symbol)
+        day = self._day(date)
+        row = array('d', [NAN]) * self.width
+        for symbol, rate in rates.items():
+            row[self._index[symbol]] = float(rate)
+        table = self._tables.get(base)
+        if table is None:
+            table = self._tables[base] = dict()
+        stored = table.get(day)
+        if stored is None:
+            table[day] = row
+        else:
+            # replaced in place, so views of the row see the new rates
+            stored[:] = row
+
+    def delete(self, base, date):
+        """ Removes the rates of base on date, releasing their row """
+        table = self._tables.get(base)
+        if table is not None and table.pop(self._day(date), None) is not None and not table:
+            del self._tables[base]
+
+    def clear(self):
+        """ Removes every table (and detaches the read-only layer) """
+        self._tables.clear()
+        self.layer = None
+
+    def keys(self):
+        """ Returns the (base, date) pairs of every stored table """
+        keys = [(base, str(dtdate.fromordinal(self._epoch + day)))
+                for base, table in self._tables.items() for day in sorted(table)]
+        if self.layer is not None:
+            own = set(keys)
+            keys.extend(key for key in self.layer.keys() if key not in own)
+        return keys
+
+
+class MappedRateStore:
+    """
+    Read-only store over a binary file written by write_binary. The file is memory-mapped,
+    so rows are only read from disk when they are looked up.
+    """
+
+    def __init__(self, file):
+        with open(file, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, byteorder, ncurrencies, nbases, epoch = _HEADER.unpack_from(self._mmap, 0)
+        except struct.error as e:
+            raise FixerioException('{} is not a fixerio3 binary cache file'.format(file)) from e
+        if magic != MAGIC or version != VERSION:
+            raise FixerioException('{} is not a fixerio3 binary cache file (version {})'.format(file, VERSION))
+        if byteorder != (1 if sys.byteorder == 'little' else 2):
+            raise FixerioException('{} was written on a machine with a different byte order'.format(file))
+        position = _HEADER.size
+        self.currencies = []
+        for _ in range(ncurrencies):
+            self.currencies.append(_CURRENCY.unpack_from(self._mmap, position)[0].rstrip(b'\0').decode('ascii'))
+            position += _CURRENCY.size
+        self._index = {c: i for i, c in enumerate(self.currencies)}
+        self._epoch = epoch
+        self._view = memoryview(self._mmap)
+        self._tables = dict()
+        for _ in range(nbases):
+            base, start, rows, offset = _BASE.unpack_from(self._mmap, position)
+            position += _BASE.size
+            data = self._view[offset:offset + rows * ncurrencies * 8].cast('d')
+            self._tables[base.rstrip(b'\0').decode('ascii')] = (start, rows, data)
+
+    @property
+    def width(self):
+        """ Number of currency columns """
+        return len(self.currencies)
+
+    @property
+    def row_size(self):
+        """ Bytes used by one row """
+        return self.width * 8
+
+    def close(self):
+        """ Unmaps the file. The store must not be used afterwards """
+        for _, _, data in self._tables.values():
+            data.release()
+        self._tables.clear()
+        self._view.release()
+        self._mmap.close()
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        return self.offset(*key) is not None
+
+    def offset(self, base, date):
+        """ Returns (array, offset) of the row of base on date, None if it is not stored """
+        table = self._tables.get(base)
+        if table is None:
+            return None
+        start, rows, data = table
+        row = _ordinal(date) - self._epoch - start
+        if row < 0 or row >= rows:
+            return None
+        offset = row * self.width
+        for i in range(offset, offset + self.width):
+            if data[i] == data[i]:
+                return data, offset
+        return None
+
+    def get(self, base, date):
+        """ Returns a read-only view of the rates of base on date, None if not stored """
+        row = self.offset(base, date)
+        if row is None:
+            return None
+        return RatesView(self._index, self.currencies, row[0], row[1])
+
+    def rate(self, base, date, symbol):
+        """ Returns a single rate, None if it is not stored """
+        row = self.offset(base, date)
+        i = self._index.get(symbol)
+        if row is None or i is None:
+            return None
+        rate = row[0][row[1] + i]
+        return None if rate != rate else rate
+
+    def keys(self):
+        """ Returns the (base, date) pairs of every stored table """
+        keys = []
+        for base, (start, rows, data) in self._tables.items():
+            for row in range(rows):
+                date = str(dtdate.fromordinal(self._epoch + start + row))
+                if self.offset(base, date) is not None:
+                    keys.append((base, date))
+        return keys
+
+
+def write_binary(store, file):
+    """
+    Writes every table of store (a RateStore, including its read-only layer, or a
+    MappedRateStore) to file in the binary format read by MappedRateStore.
+    The file is written to a temporary file first and then renamed, so processes that
+    have the previous version mapped keep reading a consistent copy.
+    """
+    currencies = list(store.currencies)
+    if getattr(store, 'layer', None) is not None:
+        currencies.extend(c for c in store.layer.currencies if c not in store._index)
+    index = {c: i for i, c in enumerate(currencies)}
+    width = len(currencies)
+    tables = dict()
+    for base, date in store.keys():
+        tables.setdefault(base, []).append((_ordinal(date) - store._epoch, date))
+
+    header = _HEADER.pack(MAGIC, VERSION, 1 if sys.byteorder == 'little' else 2,
+                          width, len(tables), store._epoch)
+    offset = _HEADER.size + width * _CURRENCY.size + len(tables) * _BASE.size
+    offset += -offset % 8
+    entries = []
+    for base, days in tables.items():
+        start = min(day for day, _ in days)
+        rows = max(day for day, _ in days) - start + 1
+        entries.append((base, start, rows, offset))
+        offset += rows * width * 8
+
+    with atomic_write(file, 'wb') as f:
+        f.write(header)
+        for currency in currencies:
+            f.write(_CURRENCY.pack(currency.encode('ascii')))
+        for base, start, rows, data_offset in entries:
+            f.write(_BASE.pack(base.encode('ascii'), start, rows, data_offset))
+        f.write(b'\0' * (-f.tell() % 8))
+        for base, start, rows, _ in entries:
+            data = array('d', [NAN]) * (rows * width)
+            for day, date in tables[base]:
+                rates = store.get(base, date)
+                offset = (day - start) * width
+                for symbol in rates:
+                    data[offset + index[symbol]] = rates[symbol]
+            data.tofile(f)
+
+
+class RateMatrix:
+    """
+    Dense N x N cross-rate matrix of one date, built from the table of one base: the rate
+    from currency i to currency j is table[j] / table[i], stored at row index[i], column
+    index[j] of a flat float64 array.
+    """
+    __slots__ = ('date', 'currencies', 'index', 'data', 'source', 'expires')
+
+    def __init__(self, date, base, table, expires=None):
+        rates = {symbol: float(rate) for symbol, rate in table.items()}
+        rates[base] = 1.0
+        self.date = date
+        self.source = base
+        self.expires = expires
+        self.currencies = sorted(rates)
+        self.index = {c: i for i, c in enumerate(self.currencies)}
+        values = [rates[c] for c in self.currencies]
+        self.data = array('d', [target / source for source in values for target in values])
+
+    @property
+    def size(self):
+        """ Number of currencies of the matrix """
+        return len(self.currencies)
+
+    def rate(self, base, target):
+        """ Returns the rate from base to target, None if either currency is not in the matrix """
+        i = self.index.get(base)
+        j = self.index.get(target)
+        if i is None or j is None:
+            return None
+        return self.data[i * len(self.currencies) + j]
+
+    def row(self, base):
+        """ Returns the {symbol: rate} table of base """
+        i = self.index[base] * len(self.currencies)
+        return {c: self.data[i + j] for j, c in enumerate(self.currencies) if c != base}
+
+    def tolist(self):
+        """ Returns the matrix as a list of rows """
+        n = len(self.currencies)
+        return [self.data[i * n:(i + 1) * n].tolist() for i in range(n)]
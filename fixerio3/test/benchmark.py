@@ -0,0 +1,328 @@
+"""
+Benchmark suite of fixerio3. Every scenario runs against a local MockFixerServer, so
+results are deterministic and do not depend on (or consume the quota of) the real API.
+
+    python -m fixerio3.test.benchmark [--output results.json] [--compare old.json]
+                                      [--repeat 5] [--latency 0.0] [--quick] [--filter name]
+
+Each scenario is timed 'repeat' times; the results (min, median, mean and stdev of the
+seconds per operation and operations per second) are printed and, with --output, written
+as json together with the library version and the platform so that runs of different
+versions can be compared with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as dtdate
+from datetime import timedelta
+from fixerio3.fixerio import Fixerio
+from fixerio3.utils import _csv_to_json
+from fixerio3.utils import _json_to_csv
+from fixerio3.test.mock_server import MockFixerServer
+
+# Modify these to change the defaults of the command line
+DEFAULT_REPEAT = 5
+CACHE_SIZES = (10, 100, 1000)
+QUICK_CACHE_SIZES = (10, 100)
+CONVERSIONS = 10000
+THREADS = 8
+
+BASES = ('EUR', 'USD', 'GBP', 'JPY', 'CHF')
+TARGETS = ('USD', 'JPY', 'GBP', 'CHF', 'AUD', 'CAD', 'SEK', 'NOK')
+
+
+def _business_days(count, last=dtdate(2018, 1, 10)):
+    """ Returns 'count' distinct weekdays ending on 'last', newest last """
+    days = []
+    day = last
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(str(day))
+        day -= timedelta(1)
+    return days[::-1]
+
+
+def _version():
+    try:
+        from importlib.metadata import version
+        return version('fixerio3')
+    except Exception:
+        return 'unknown'
+
+
+class Benchmark:
+    """
+    Collects the timings of the scenarios. A scenario is a callable returning the number
+    of operations it performed; 'setup' (if given) runs before every repetition, untimed,
+    and its return value is passed to the scenario.
+    """
+
+    def __init__(self, repeat=DEFAULT_REPEAT, name_filter=None):
+        self.repeat = repeat
+        self.name_filter = name_filter
+        self.results = []
+
+    def wanted(self, *names):
+        """ Returns True if any of the scenario names passes the --filter """
+        return not self.name_filter or any(self.name_filter in name for name in names)
+
+    def run(self, name, scenario, setup=None, teardown=None, **params):
+        if not self.wanted(name):
+            return None
+        timings = []
+        operations = 1
+        for _ in range(self.repeat):
+            state = setup() if setup is not None else None
+            start = time.perf_counter()
+            operations = scenario(state) if setup is not None else scenario()
+            elapsed = time.perf_counter() - start
+            if teardown is not None:
+                teardown(state)
+            timings.append(elapsed / max(operations, 1))
+        result = {'name': name, 'params': params, 'repeat': self.repeat, 'operations': operations,
+                  'min': min(timings), 'median': statistics.median(timings),
+                  'mean': statistics.mean(timings),
+                  'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0}
+        result['ops_per_sec'] = 1.0 / result['median'] if result['median'] else float('inf')
+        self.results.append(result)
+        print('{:<40} {:>14.3f} us/op {:>14.1f} ops/s  (min {:.3f} us, stdev {:.3f} us)'.format(
+            name, result['median'] * 1e6, result['ops_per_sec'], result['min'] * 1e6, result['stdev'] * 1e6))
+        return result
+
+    def report(self, latency):
+        return {'version': _version(), 'python': platform.python_version(),
+                'implementation': platform.python_implementation(), 'platform': platform.platform(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'latency': latency,
+                'results': self.results}
+
+
+def _warm(server, tables, **kwargs):
+    """ Returns a Fixerio with the full tables of BASES cached for 'tables' dates """
+    fixerio = Fixerio(base_url=server.url, **kwargs)
+    for day in _business_days(max(tables // len(BASES), 1)):
+        for base in BASES:
+            fixerio.get_rates(date=day, base=base)
+    return fixerio
+
+
+def lookups(bench, server):
+    """ Cold (API) and warm (cache) get_rates and convert """
+    if not bench.wanted('get_rates.cold', 'convert.cold', 'get_rates.warm.symbols', 'convert.warm',
+                        'get_rates.warm.triangulated'):
+        return
+    days = _business_days(20)
+
+    def cold_get_rates(fixerio):
+        for day in days:
+            fixerio.get_rates(date=day, base='USD')
+        return len(days)
+
+    def cold_convert(fixerio):
+        for day in days:
+            fixerio.convert(100, 'JPY', base='USD', date=day)
+        return len(days)
+
+    new = lambda: Fixerio(base_url=server.url)
+    close = lambda fixerio: fixerio.close()
+    bench.run('get_rates.cold', cold_get_rates, setup=new, teardown=close, tables=len(days))
+    bench.run('convert.cold', cold_convert, setup=new, teardown=close, tables=len(days))
+
+    warm = _warm(server, len(days) * len(BASES))
+    loops = 2000
+
+    def warm_get_rates():
+        for i in range(loops):
+            warm.get_rates(date=days[i % len(days)], base=BASES[i % len(BASES)])
+        return loops
+
+    def warm_get_rates_symbols():
+        for i in range(loops):
+            warm.get_rates(date=days[i % len(days)], base='USD', symbols=['EUR', 'JPY'])
+        return loops
+
+    def warm_convert():
+        for i in range(loops):
+            warm.convert(100, TARGETS[i % len(TARGETS)], base=BASES[i % len(BASES)], date=days[i % len(days)])
+        return loops
+
+    bench.run('get_rates.warm', warm_get_rates)
+    bench.run('get_rates.warm.symbols', warm_get_rates_symbols)
+    bench.run('convert.warm', warm_convert)
+    warm.close()
+
+    triangulated = Fixerio(base_url=server.url, triangulate=True)
+    for day in days:
+        triangulated.get_rates(date=day, base='EUR')
+
+    def warm_triangulated():
+        for i in range(loops):
+            triangulated.get_rates(date=days[i % len(days)], base=BASES[i % len(BASES)], symbols='JPY')
+        return loops
+
+    bench.run('get_rates.warm.triangulated', warm_triangulated)
+    triangulated.close()
+
+
+def bulk(bench, server, conversions):
+    """ convert_many against a warm cache and the equivalent loop of convert calls, in
+        float and in exact mode, and the integer batch path of convert_minor_units """
+    if not bench.wanted('convert_many', 'convert.loop', 'convert_many.exact', 'convert.loop.exact',
+                        'convert_minor_units'):
+        return
+    fixerio = _warm(server, 5 * len(BASES))
+    days = _business_days(5)
+    amounts = [float(i % 1000) for i in range(conversions)]
+    bases = [BASES[i % len(BASES)] for i in range(conversions)]
+    targets = [TARGETS[i % len(TARGETS)] for i in range(conversions)]
+    dates = [days[i % len(days)] for i in range(conversions)]
+
+    def convert_many():
+        fixerio.convert_many(amounts, targets, bases, dates)
+        return conversions
+
+    def convert_loop():
+        for row in zip(amounts, targets, bases, dates):
+            fixerio.convert(*row)
+        return conversions
+
+    bench.run('convert_many', convert_many, rows=conversions)
+    bench.run('convert.loop', convert_loop, rows=conversions)
+    fixerio.close()
+
+    fixerio = _warm(server, 5 * len(BASES), exact=True)
+    texts = ['{:.2f}'.format(amount) for amount in amounts]
+    units = array('q', (int(amount) * 100 for amount in amounts))
+    bench.run('convert_many.exact', convert_many, rows=conversions)
+    bench.run('convert.loop.exact', convert_loop, rows=conversions)
+
+    def convert_texts():
+        for row in zip(texts, targets, bases, dates):
+            fixerio.convert(*row)
+        return conversions
+
+    def convert_minor_units():
+        fixerio.convert_minor_units(units, 'JPY', base='USD', date=days[0])
+        return conversions
+
+    bench.run('convert.loop.exact.str', convert_texts, rows=conversions)
+    bench.run('convert_minor_units', convert_minor_units, rows=conversions)
+    fixerio.close()
+
+
+def files(bench, server, sizes):
+    """ Saving, opening (the constructor alone, where the mapped bin format only reads its
+        header) and fully loading the file cache in every format, and the csv/json converters """
+    if not bench.wanted('utils._json_to_csv', 'utils._csv_to_json',
+                        *('file.{}.{}'.format(x, y) for x in ('save', 'open', 'load') for y in ('json', 'csv', 'bin'))):
+        return
+    directory = tempfile.mkdtemp(prefix='fixerio3-bench-')
+    try:
+        for size in sizes:
+            for fmt in ('json', 'csv', 'bin'):
+                name = os.path.join(directory, 'cache_{}.{}'.format(size, fmt))
+                # the journal keeps warming linear, a snapshot would be rewritten on every miss
+                fixerio = _warm(server, size, cache_to_file=True, out_name=name, out_format=fmt, journal=True)
+                tables = sum(len(dates) for dates in fixerio.get_cache().values())
+                fixerio._write_snapshot()
+
+                def save():
+                    fixerio._write_snapshot()
+                    return 1
+
+                def open_file():
+                    Fixerio(in_file=name, in_format=fmt).close()
+                    return 1
+
+                def load():
+                    loaded = Fixerio(in_file=name, in_format=fmt)
+                    loaded.get_cache()
+                    loaded.close()
+                    return 1
+
+                bench.run('file.save.{}'.format(fmt), save, tables=tables)
+                bench.run('file.open.{}'.format(fmt), open_file, tables=tables, bytes=os.path.getsize(name))
+                bench.run('file.load.{}'.format(fmt), load, tables=tables, bytes=os.path.getsize(name))
+                data = fixerio.get_cache()
+                fixerio.close()
+
+            csv = _json_to_csv(data)
+            bench.run('utils._json_to_csv', lambda: _json_to_csv(data) and 1, tables=tables)
+            bench.run('utils._csv_to_json', lambda: _csv_to_json(csv) and 1, tables=tables, bytes=len(csv))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def concurrency(bench, server, threads):
+    """ Many threads asking for the same table (coalesced) and for distinct tables """
+    if not bench.wanted('threads.same_table', 'threads.distinct_tables', 'threads.get_timeseries'):
+        return
+    days = _business_days(threads * 4)
+
+    def same_table(fixerio):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda _: fixerio.get_rates(date=days[0], base='USD'), range(threads * 4)))
+        return threads * 4
+
+    def distinct_tables(fixerio):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda day: fixerio.get_rates(date=day, base='USD'), days))
+        return len(days)
+
+    def timeseries(fixerio):
+        return len(fixerio.get_timeseries(days[0], days[-1], base='USD', max_workers=threads))
+
+    new = lambda: Fixerio(base_url=server.url, pool_size=threads)
+    close = lambda fixerio: fixerio.close()
+    bench.run('threads.same_table', same_table, setup=new, teardown=close, threads=threads)
+    bench.run('threads.distinct_tables', distinct_tables, setup=new, teardown=close, threads=threads)
+    bench.run('threads.get_timeseries', timeseries, setup=new, teardown=close, threads=threads)
+
+
+def compare(results, previous):
+    """ Prints the ratio of the median timings of results to those of a previous run """
+    old = {(x['name'], json.dumps(x['params'], sort_keys=True)): x for x in previous['results']}
+    print('\ncompared to version {} ({}):'.format(previous.get('version'), previous.get('timestamp')))
+    for result in results['results']:
+        before = old.get((result['name'], json.dumps(result['params'], sort_keys=True)))
+        if before is not None and before['median']:
+            print('{:<40} {:>8.2f}x {}'.format(result['name'], result['median'] / before['median'],
+                                               json.dumps(result['params'], sort_keys=True)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks fixerio3 against a local mock of the fixer.io API')
+    parser.add_argument('--output', help='file to write the results to as json')
+    parser.add_argument('--compare', help='results of a previous run to compare with')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='repetitions of every scenario')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the mock server waits per request')
+    parser.add_argument('--quick', action='store_true', help='smaller cache sizes and fewer conversions')
+    parser.add_argument('--filter', help='only run the scenarios whose name contains this')
+    args = parser.parse_args(argv)
+
+    bench = Benchmark(repeat=args.repeat, name_filter=args.filter)
+    with MockFixerServer(latency=args.latency) as server:
+        lookups(bench, server)
+        bulk(bench, server, CONVERSIONS // 10 if args.quick else CONVERSIONS)
+        files(bench, server, QUICK_CACHE_SIZES if args.quick else CACHE_SIZES)
+        concurrency(bench, server, THREADS)
+    results = bench.report(args.latency)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import pytest
+from fixerio3.test.mock_server import MockFixerServer
+
+
+@pytest.fixture(scope='module')
+def mock_server():
+    """ A local fixer.io API shared by the tests of a module """
+    with MockFixerServer() as server:
+        yield server
+
+
+@pytest.fixture
+def server(mock_server):
+    """ The local fixer.io API, without the requests and failures of the previous test """
+    mock_server.reset()
+    yield mock_server
+    mock_server.reset()
@@ -0,0 +1,222 @@
+"""
+This file provides a local HTTP server emulating the fixer.io API, used by the benchmark
+suite (benchmark.py) and handy to try the library without network access:
+
+    with MockFixerServer() as server:
+        test = Fixerio(base_url=server.url)
+
+Rates are deterministic (a function of the currency and the date only), dates on a
+weekend are answered with the rates of the previous Friday like the real API, and the
+error responses of the API are returned for invalid bases, symbols, dates and endpoints.
+
+MockFixerServer(host='127.0.0.1', port=0, latency=0.0, latest=None, access_key=None, quota=None)
+"""
+
+import json
+import math
+import threading
+import time
+from datetime import date as dtdate
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+from fixerio3.fixerio import ALL_CURRENCIES
+from fixerio3.fixerio import MAX_TIMESERIES_DAYS
+from fixerio3.fixerio import MIN_DATE
+from fixerio3.utils import ERROR_CODES
+
+# rates of the currencies against EUR, moved a little every day by _rate
+_EUR_RATES = {currency: 0.5 + index * 0.75 for index, currency in enumerate(sorted(ALL_CURRENCIES))}
+_EUR_RATES['EUR'] = 1.0
+
+
+def _business_day(day):
+    """ Returns the day itself or, on a weekend, the previous Friday """
+    return day - timedelta(max(day.weekday() - 4, 0))
+
+
+def _currencies(day):
+    """ Returns the currencies published on a day (ILS from 2011, ISK from 2018-02-01) """
+    currencies = set(ALL_CURRENCIES)
+    if day < dtdate(2018, 2, 1):
+        currencies.discard('ISK')
+    if day < dtdate(2011, 1, 3):
+        currencies.discard('ILS')
+    return currencies
+
+
+def _rate(currency, day):
+    """ Returns the deterministic EUR rate of currency on day """
+    if currency == 'EUR':
+        return 1.0
+    return round(_EUR_RATES[currency] * (1 + 0.05 * math.sin(day.toordinal() / 30.0 + _EUR_RATES[currency])), 6)
+
+
+def _table(day, base, symbols):
+    """ Returns the rates of base on day, limited to symbols if not None """
+    currencies = _currencies(day)
+    targets = currencies if symbols is None else symbols
+    base_rate = _rate(base, day)
+    return {x: round(_rate(x, day) / base_rate, 6) for x in sorted(targets) if x != base}
+
+
+def _error(code):
+    return {'success': False, 'error': {'code': code, 'info': ERROR_CODES.get(code, '')}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.mock
+        status, body = server.handle(self.path)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class MockFixerServer:
+    """
+    Threaded HTTP server answering the latest, historical ('yyyy-mm-dd') and timeseries
+    endpoints of fixer.io on 127.0.0.1 (a free port unless 'port' is given).
+
+    latency: seconds every response is delayed by, to emulate a remote API
+    latest: the date answered for 'latest' (the last business day by default)
+    access_key: if set, requests without this access_key get error 101
+    quota: if set, requests after the first 'quota' ones get error 104
+
+    Every request path is recorded in 'requests'. fail_next(code) makes the next request
+    fail with an API error code, fail_next(None, status=503) with an HTTP error status.
+    The 'yyyy-mm-dd' dates added to 'closures' are answered with the rates of the previous
+    business day, like an unplanned market closure.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, latest=None, access_key=None, quota=None):
+        self.latency = latency
+        self.latest = latest
+        self.access_key = access_key
+        self.quota = quota
+        self.requests = []
+        self.closures = set()
+        self._failures = []
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def start(self):
+        """ Starts serving in a background thread """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name='fixerio3-mock', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """ Stops the server and releases its port """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def reset(self):
+        """ Forgets the recorded requests, the pending failures and the closures """
+        with self._lock:
+            self.requests = []
+            self.closures = set()
+            self._failures = []
+
+    def fail_next(self, code, times=1, status=200):
+        """ Makes the next 'times' requests fail with an API error code and/or an HTTP status """
+        with self._lock:
+            self._failures.extend([(code, status)] * times)
+
+    def handle(self, path):
+        """ Returns the (HTTP status, json body) answering a request path """
+        with self._lock:
+            self.requests.append(path)
+            count = len(self.requests)
+            failure = self._failures.pop(0) if self._failures else None
+        if self.latency:
+            time.sleep(self.latency)
+        if failure is not None:
+            code, status = failure
+            return status, {'success': False} if code is None else _error(code)
+
+        url = urlparse(path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if self.access_key is not None and query.get('access_key') != self.access_key:
+            return 200, _error(101)
+        if self.quota is not None and count > self.quota:
+            return 200, _error(104)
+
+        base = query.get('base', 'EUR')
+        if base not in ALL_CURRENCIES:
+            return 200, _error(201)
+        symbols = None
+        if query.get('symbols'):
+            symbols = set(x.strip() for x in query['symbols'].split(','))
+            if not symbols.issubset(ALL_CURRENCIES):
+                return 200, _error(202)
+
+        endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+        if endpoint == 'timeseries':
+            return 200, self._timeseries(query, base, symbols)
+        if endpoint == 'latest':
+            day = dtdate.fromisoformat(self.latest) if self.latest else _business_day(dtdate.today())
+        else:
+            try:
+                day = dtdate.fromisoformat(endpoint)
+            except ValueError:
+                return 200, _error(103)
+        if not MIN_DATE <= day <= dtdate.today():
+            return 200, _error(302)
+        day = _business_day(day)
+        while str(day) in self.closures:
+            day = _business_day(day - timedelta(1))
+        return 200, {'success': True, 'base': base, 'date': str(day), 'rates': _table(day, base, symbols)}
+
+    def _timeseries(self, query, base, symbols):
+        try:
+            start = dtdate.fromisoformat(query['start_date'])
+        except (KeyError, ValueError):
+            return _error(502)
+        try:
+            end = dtdate.fromisoformat(query['end_date'])
+        except (KeyError, ValueError):
+            return _error(503)
+        if start > end or start < MIN_DATE:
+            return _error(504)
+        if (end - start).days > MAX_TIMESERIES_DAYS:
+            return _error(505)
+        rates = dict()
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                rates[str(day)] = _table(day, base, symbols)
+            day += timedelta(1)
+        return {'success': True, 'timeseries': True, 'base': base, 'start_date': str(start),
+                'end_date': str(end), 'rates': rates}
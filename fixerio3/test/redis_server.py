@@ -0,0 +1,158 @@
+"""
+This file provides a local TCP server speaking the Redis protocol (RESP), implementing
+the few commands RedisCache needs, to test it with a real redis.Redis client and
+without a Redis server:
+
+    with MockRedisServer() as server:
+        cache = RedisCache(url=server.url)
+
+Supported commands: HELLO (RESP2 and RESP3), PING, GET, SET (with EX or PX), DEL, TTL,
+SCAN (with MATCH and COUNT), FLUSHDB, SELECT and CLIENT (acknowledged and ignored).
+Replies use the RESP2 types, except the null reply of a connection switched to RESP3.
+
+MockRedisServer(host='127.0.0.1', port=0, clock=time.time)
+"""
+
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        server = self.server.mock
+        protocol = 2
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            if command[0].upper() == b'HELLO' and len(command) > 1:
+                protocol = int(command[1])
+            self.wfile.write(server.execute(command, protocol))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()
+        command = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            command.append(self.rfile.read(length + 2)[:-2])
+        return command
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _bulk(value, protocol=2):
+    if value is None:
+        return b'_\r\n' if protocol == 3 else b'$-1\r\n'
+    return b'$' + str(len(value)).encode() + b'\r\n' + value + b'\r\n'
+
+
+def _integer(value):
+    return b':' + str(value).encode() + b'\r\n'
+
+
+def _array(items):
+    return b'*' + str(len(items)).encode() + b'\r\n' + b''.join(items)
+
+
+class MockRedisServer:
+    """
+    Threaded Redis protocol server on 127.0.0.1 (a free port unless 'port' is given).
+    The stored values are kept as {key: (value, expires)} in 'values' (keys and values as
+    bytes, expires in seconds of 'clock' or None), and every command received is recorded
+    in 'commands'.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, clock=time.time):
+        self.clock = clock
+        self.values = dict()
+        self.commands = []
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'redis://{}:{}/0'.format(host, port)
+
+    def start(self):
+        """ Starts serving in a background thread """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name='fixerio3-redis', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """ Stops the server and releases its port """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _live(self, key):
+        value, expires = self.values.get(key, (None, None))
+        if expires is not None and expires <= self.clock():
+            del self.values[key]
+            return None
+        return value
+
+    def execute(self, command, protocol=2):
+        """ Returns the RESP encoded reply to a command (a list of bytes) of a connection using 'protocol' """
+        name = command[0].upper().decode('ascii')
+        args = command[1:]
+        with self._lock:
+            self.commands.append([name] + args)
+            if name == 'HELLO':
+                fields = [_bulk(b'server'), _bulk(b'redis'), _bulk(b'proto'), _integer(protocol)]
+                if protocol == 3:
+                    return b'%2\r\n' + b''.join(fields)
+                return _array(fields)
+            if name == 'PING':
+                return b'+PONG\r\n'
+            if name in ('CLIENT', 'SELECT'):
+                return b'+OK\r\n'
+            if name == 'GET':
+                return _bulk(self._live(args[0]), protocol)
+            if name == 'SET':
+                expires = None
+                options = [x.upper() for x in args[2:]]
+                for unit, scale in ((b'EX', 1.0), (b'PX', 0.001)):
+                    if unit in options:
+                        expires = self.clock() + int(args[2 + options.index(unit) + 1]) * scale
+                self.values[args[0]] = (args[1], expires)
+                return b'+OK\r\n'
+            if name == 'DEL':
+                return _integer(sum(self.values.pop(key, None) is not None for key in args))
+            if name == 'TTL':
+                if self._live(args[0]) is None:
+                    return _integer(-2)
+                expires = self.values[args[0]][1]
+                return _integer(-1 if expires is None else int(expires - self.clock()))
+            if name == 'SCAN':
+                options = [x.upper() for x in args[1:]]
+                match = args[1 + options.index(b'MATCH') + 1].decode() if b'MATCH' in options else '*'
+                keys = [key for key in list(self.values)
+                        if fnmatch.fnmatchcase(key.decode(), match) and self._live(key) is not None]
+                return _array([_bulk(b'0'), _array([_bulk(key) for key in keys])])
+            if name == 'FLUSHDB':
+                self.values.clear()
+                return b'+OK\r\n'
+        return "-ERR unknown command '{}'\r\n".format(name).encode()
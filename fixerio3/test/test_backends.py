@@ -0,0 +1,121 @@
+import json
+import sqlite3
+import threading
+import pytest
+from fixerio3.backends import RedisCache
+from fixerio3.backends import SQLiteCache
+from fixerio3.fixerio import Fixerio
+from fixerio3.test.redis_server import MockRedisServer
+
+RATES = {'EUR': 0.8, 'JPY': 110.0}
+
+
+class Clock:
+    """ A clock advanced by hand """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def redis_server():
+    """ A local Redis protocol server, skipping the test if the redis package is missing """
+    pytest.importorskip('redis')
+    clock = Clock()
+    with MockRedisServer(clock=clock) as server:
+        yield server
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        clock = Clock()
+        cache = SQLiteCache(str(tmp_path / 'rates.db'), clock=clock)
+    else:
+        server = request.getfixturevalue('redis_server')
+        clock = server.clock
+        cache = RedisCache(url=server.url, clock=clock)
+    yield cache, clock
+    cache.close()
+
+
+def test_set_get_delete(backend):
+    cache, _ = backend
+    assert cache.get('USD', '2018-01-10') is None
+    cache.set('USD', '2018-01-10', RATES)
+    cache.set('EUR', '2018-01-10', {'USD': 1.25})
+    assert cache.get('USD', '2018-01-10') == RATES
+    assert cache.items() == [(('EUR', '2018-01-10'), {'USD': 1.25}), (('USD', '2018-01-10'), RATES)]
+    cache.delete('USD', '2018-01-10')
+    assert cache.peek('USD', '2018-01-10') is None
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 1}
+    cache.clear()
+    assert cache.items() == []
+
+
+def test_expired_tables(backend):
+    cache, clock = backend
+    cache.set('USD', 'latest', RATES, expires=clock.now + 60)
+    cache.set('USD', '2018-01-10', RATES)
+    assert cache.peek('USD', 'latest') == RATES
+    clock.now += 61
+    assert cache.peek('USD', 'latest') is None
+    assert cache.items() == [(('USD', '2018-01-10'), RATES)]
+    assert cache.stats()['entries'] == 1
+
+
+def test_sqlite_purges_expired_rows(tmp_path):
+    clock = Clock()
+    cache = SQLiteCache(str(tmp_path / 'rates.db'), clock=clock)
+    for day in range(10, 20):
+        cache.set('USD', '2018-01-{}'.format(day), RATES, expires=clock.now + 60)
+    clock.now += 61
+    cache.set('USD', '2018-01-20', RATES)
+    assert cache._connection().execute('SELECT COUNT(*) FROM rates').fetchone()[0] == 1
+    cache.close()
+
+
+def test_sqlite_connections_closed(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'rates.db'))
+    cache.set('USD', '2018-01-10', RATES)
+    thread = threading.Thread(target=cache.get, args=('USD', '2018-01-10'))
+    thread.start()
+    thread.join()
+    connections = list(cache._connections.values())
+    assert len(connections) == 2
+    with Fixerio(cache=cache):
+        pass
+    assert cache._connections == {}
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute('SELECT 1')
+    # reconnects when used again
+    assert cache.get('USD', '2018-01-10') == RATES
+    cache.close()
+
+
+def test_redis_wire_format(redis_server):
+    clock = redis_server.clock
+    cache = RedisCache(url=redis_server.url, clock=clock)
+    cache.set('USD', '2018-01-10', RATES)
+    cache.set('USD', 'latest', RATES, expires=clock.now + 60)
+    assert redis_server.values == {b'fixerio3:USD:2018-01-10': (json.dumps(RATES).encode(), None),
+                                   b'fixerio3:USD:latest': (json.dumps(RATES).encode(), clock.now + 60)}
+    assert ['SET', b'fixerio3:USD:latest', json.dumps(RATES).encode(), b'EX', b'60'] in redis_server.commands
+    cache.close()
+
+
+@pytest.mark.parametrize('kind', ['sqlite', 'redis'])
+def test_shared_between_objects(server, tmp_path, request, kind):
+    if kind == 'sqlite':
+        new = lambda: SQLiteCache(str(tmp_path / 'rates.db'))
+    else:
+        new = lambda: RedisCache(url=request.getfixturevalue('redis_server').url)
+    with Fixerio(base_url=server.url, cache=new()) as first:
+        rates = first.get_rates(date='2018-01-10', symbols='JPY')
+    with Fixerio(base_url=server.url, cache=new()) as second:
+        assert second.get_rates(date='2018-01-10', symbols='JPY') == rates
+    assert len(server.requests) == 1
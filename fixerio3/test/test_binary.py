@@ -0,0 +1,69 @@
+import struct
+import pytest
+from fixerio3.exceptions import FixerioException
+from fixerio3.fixerio import ALL_CURRENCIES
+from fixerio3.fixerio import MIN_DATE
+from fixerio3.store import MappedRateStore
+from fixerio3.store import RateStore
+from fixerio3.store import write_binary
+
+TABLES = {('USD', '2018-01-09'): {'EUR': 0.836, 'JPY': 112.45},
+          ('USD', '2018-01-12'): {'EUR': 0.8342, 'GBP': 0.7391},
+          ('EUR', '2018-01-10'): {'USD': 1.198786, 'CHF': 1.17}}
+
+
+@pytest.fixture
+def mapped(tmp_path):
+    store = RateStore(ALL_CURRENCIES, MIN_DATE)
+    for (base, date), rates in TABLES.items():
+        store.set(base, date, rates)
+    file = str(tmp_path / 'cache.bin')
+    write_binary(store, file)
+    mapped = MappedRateStore(file)
+    yield mapped
+    mapped.close()
+
+
+def test_mapped_lookups(mapped):
+    assert sorted(mapped.keys()) == sorted(TABLES)
+    for (base, date), rates in TABLES.items():
+        assert dict(mapped.get(base, date)) == rates
+    assert mapped.rate('USD', '2018-01-09', 'JPY') == 112.45
+    assert mapped.rate('USD', '2018-01-09', 'GBP') is None
+    # the days between two stored days, around them and of other bases are not stored
+    for base, date in (('USD', '2018-01-10'), ('USD', '2018-01-08'), ('USD', '2018-01-13'), ('GBP', '2018-01-10')):
+        assert mapped.get(base, date) is None and (base, date) not in mapped
+
+
+def test_mapped_layer(mapped, tmp_path):
+    store = RateStore(ALL_CURRENCIES, MIN_DATE, layer=mapped)
+    store.set('USD', '2018-01-09', {'EUR': 0.9})
+    store.set('GBP', '2018-01-10', {'XAU': 0.0009})
+    assert dict(store.get('USD', '2018-01-09')) == {'EUR': 0.9}
+    assert dict(store.get('EUR', '2018-01-10')) == TABLES[('EUR', '2018-01-10')]
+    assert store.rate('USD', '2018-01-12', 'GBP') == 0.7391
+    assert store.rows == 2 and len(store) == 4
+    # tables are never written to the read-only layer
+    assert dict(mapped.get('USD', '2018-01-09')) == TABLES[('USD', '2018-01-09')]
+
+    file = str(tmp_path / 'merged.bin')
+    write_binary(store, file)
+    merged = MappedRateStore(file)
+    try:
+        assert sorted(merged.keys()) == sorted(store.keys())
+        for key in store.keys():
+            assert dict(merged.get(*key)) == dict(store.get(*key))
+    finally:
+        merged.close()
+
+
+def test_not_a_binary_cache(mapped, tmp_path):
+    file = tmp_path / 'cache.bin'
+    contents = file.read_bytes()
+    bad_magic = b'FXR0' + contents[4:]
+    bad_version = contents[:4] + struct.pack('<H', 99) + contents[6:]
+    truncated = contents[:8]
+    for name, data in (('magic.bin', bad_magic), ('version.bin', bad_version), ('short.bin', truncated)):
+        (tmp_path / name).write_bytes(data)
+        with pytest.raises(FixerioException):
+            MappedRateStore(str(tmp_path / name))
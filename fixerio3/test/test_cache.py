@@ -0,0 +1,70 @@
+import sys
+import time
+from datetime import date as dtdate
+from fixerio3 import fixerio
+from fixerio3.fixerio import ALL_CURRENCIES
+from fixerio3.fixerio import Fixerio
+from fixerio3.fixerio import MIN_DATE
+from fixerio3.store import RateStore
+from fixerio3.utils import Cache
+
+RATES = {'EUR': 0.8, 'JPY': 110.0, 'GBP': 0.7}
+
+
+def _allocated(store):
+    return sum(sys.getsizeof(row) for table in store._tables.values() for row in table.values())
+
+
+def test_distant_dates_do_not_allocate_the_days_between():
+    store = RateStore(ALL_CURRENCIES, MIN_DATE)
+    store.set('USD', '1999-01-04', RATES)
+    store.set('USD', '2018-01-10', RATES)
+    assert store.rows == 2
+    assert store.nbytes == _allocated(store) == 2 * store.row_size
+
+
+def test_deleted_rows_are_released():
+    store = RateStore(ALL_CURRENCIES, MIN_DATE)
+    store.set('USD', '2018-01-10', RATES)
+    store.set('USD', '2018-01-11', RATES)
+    view = store.get('USD', '2018-01-10')
+    store.delete('USD', '2018-01-10')
+    assert store.rows == 1
+    assert store.get('USD', '2018-01-10') is None
+    assert view['JPY'] == 110.0
+    store.delete('USD', '2018-01-11')
+    assert store.nbytes == 0
+
+
+def test_memory_bound_is_the_real_size():
+    store = RateStore(ALL_CURRENCIES, MIN_DATE)
+    cache = Cache(store, max_memory=10 * store.row_size)
+    for ordinal in range(dtdate(2000, 1, 1).toordinal(), dtdate(2018, 1, 1).toordinal(), 97):
+        for base in ('USD', 'GBP'):
+            cache.set(base, str(dtdate.fromordinal(ordinal)), RATES)
+            assert cache.memory == _allocated(store) <= cache.max_memory
+    assert len(cache) == 10
+    assert cache.evictions > 0
+
+
+def test_new_currency_column():
+    store = RateStore(['EUR', 'JPY'], MIN_DATE)
+    store.set('USD', '2018-01-10', {'EUR': 0.8})
+    store.set('USD', '2018-01-11', {'XAU': 0.001})
+    assert dict(store.get('USD', '2018-01-10')) == {'EUR': 0.8}
+    assert dict(store.get('USD', '2018-01-11')) == {'XAU': 0.001}
+    assert store.nbytes == _allocated(store)
+
+
+def test_latest_table_kept_after_the_rollover(server, monkeypatch):
+    monkeypatch.setattr(fixerio, '_latest', ['2018-01-10', float('inf')])
+    monkeypatch.setattr(fixerio, '_next_update', time.time)
+    monkeypatch.setattr(server, 'latest', '2018-01-10')
+    with Fixerio(base_url=server.url) as test:
+        latest = test.get_rates(symbols='JPY')
+        # the rollover: 'latest' now resolves to the next date
+        fixerio._latest[:] = ['2018-01-11', float('inf')]
+        server.latest = '2018-01-11'
+        assert test.get_rates(date='2018-01-10', symbols='JPY') == latest
+        assert test.get_rates(symbols='JPY') != latest
+    assert server.requests == ['/latest?base=USD&symbols=JPY'] * 2
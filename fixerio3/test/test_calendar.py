@@ -0,0 +1,32 @@
+from fixerio3.fixerio import Fixerio
+
+
+def test_closure_alias_learnt(server):
+    # a Wednesday the rules know nothing about, answered with the table of the Tuesday
+    server.closures.add('2018-01-10')
+    with Fixerio(base_url=server.url) as test:
+        closed = test.get_rates(date='2018-01-10')
+        assert test.get_calendar().as_dict() == {'2018-01-10': '2018-01-09'}
+        assert test.get_rates(date='2018-01-10') == closed
+        assert test.get_rates(date='2018-01-09') == closed
+    assert server.requests == ['/2018-01-10?base=USD']
+
+
+def test_today_not_recorded(server, monkeypatch):
+    # the rates of today may just not be published yet
+    monkeypatch.setattr('fixerio3.fixerio._date', lambda date=None: '2018-01-10' if date in (None, 'latest') else date)
+    server.closures.add('2018-01-10')
+    with Fixerio(base_url=server.url) as test:
+        test.get_rates(date='2018-01-10')
+        test.get_rates(date='2018-01-10')
+        assert test.get_calendar().as_dict() == {}
+    assert server.requests == ['/2018-01-10?base=USD'] * 2
+
+
+def test_weekend_requests_resolved_once(server):
+    with Fixerio(base_url=server.url) as test:
+        test.get_rates(date='2018-01-13')
+        test.get_rates(date='2018-01-14')
+        assert test.get_rates(date='2018-01-13') == test.get_rates(date='2018-01-12')
+        assert test.get_calendar().as_dict() == {}
+    assert server.requests == ['/2018-01-12?base=USD']
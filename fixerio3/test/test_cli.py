@@ -0,0 +1,51 @@
+import csv
+import json
+import pytest
+from fixerio3 import cli
+from fixerio3.fixerio import Fixerio
+
+ROWS = [('10', 'USD', 'JPY', '2018-01-10'), ('2.5', 'EUR', 'USD', '2018-01-09'),
+        ('-7', 'GBP', 'EUR', '2018-01-13'), ('3', 'USD', 'USD', '2018-01-10')]
+
+
+def _expected(server):
+    with Fixerio(base_url=server.url) as test:
+        return [test.convert(float(amount), target, base, date) for amount, base, target, date in ROWS]
+
+
+@pytest.mark.parametrize('workers, chunk_size', [(1, 10000), (2, 1)])
+def test_csv(server, tmp_path, workers, chunk_size):
+    ledger, output = tmp_path / 'ledger.csv', tmp_path / 'converted.csv'
+    with open(str(ledger), 'w', newline='') as f:
+        csv.writer(f).writerows([('amount', 'base', 'target', 'date')] + ROWS)
+    assert cli.main([str(ledger), '-o', str(output), '--base-url', server.url, '--quiet',
+                     '--workers', str(workers), '--chunk-size', str(chunk_size)]) == 0
+    with open(str(output), newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['amount', 'base', 'target', 'date', 'converted']
+    assert [tuple(row[:4]) for row in rows[1:]] == ROWS
+    assert [float(row[4]) for row in rows[1:]] == pytest.approx(_expected(server))
+
+
+def test_jsonl_fixed_columns(server, tmp_path):
+    ledger, output = tmp_path / 'ledger.jsonl', tmp_path / 'converted.jsonl'
+    with open(str(ledger), 'w') as f:
+        for amount, base, _, date in ROWS:
+            f.write(json.dumps({'value': float(amount), 'base': base, 'date': date}) + '\n')
+    assert cli.main([str(ledger), '-o', str(output), '--base-url', server.url, '--quiet', '--workers', '1',
+                     '--amount-column', 'value', '--to', 'EUR', '--precision', '2']) == 0
+    with open(str(output)) as f:
+        rows = [json.loads(line) for line in f]
+    with Fixerio(base_url=server.url) as test:
+        expected = [round(test.convert(float(amount), 'EUR', base, date), 2) for amount, base, _, date in ROWS]
+    assert [row['converted'] for row in rows] == pytest.approx(expected)
+
+
+def test_skip_errors(server, tmp_path, capsys):
+    ledger = tmp_path / 'ledger.csv'
+    with open(str(ledger), 'w', newline='') as f:
+        csv.writer(f).writerows([('amount', 'base', 'target', 'date'), ('1', 'USD', 'JPY', '2018-01-10'),
+                                 ('x', 'USD', 'JPY', '2018-01-10')])
+    assert cli.main([str(ledger), '--base-url', server.url, '--quiet', '--workers', '1', '--skip-errors']) == 0
+    rows = list(csv.reader(capsys.readouterr().out.splitlines()))
+    assert len(rows) == 3 and rows[2][4] == ''
@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fixerio3.fixerio import Fixerio
+
+
+def _concurrently(calls):
+    """ Runs the calls in as many threads, started together, and returns their results """
+    barrier = threading.Barrier(len(calls))
+
+    def run(call):
+        barrier.wait()
+        return call()
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        return list(executor.map(run, calls))
+
+
+def test_concurrent_requests_coalesced(server, monkeypatch):
+    monkeypatch.setattr(server, 'latency', 0.1)
+    with Fixerio(base_url=server.url) as test:
+        results = _concurrently([lambda: test.get_rates(date='2018-01-10', symbols='JPY')] * 8)
+        assert all(rates == results[0] for rates in results)
+        assert test._batcher.calls == 1 and test._batcher.coalesced == 7
+    assert len(server.requests) == 1
+
+
+def test_failure_shared_by_coalesced_requests(server, monkeypatch):
+    monkeypatch.setattr(server, 'latency', 0.1)
+    server.fail_next(202)
+    with Fixerio(base_url=server.url) as test:
+        def call():
+            try:
+                return test.get_rates(date='2018-01-10', symbols='JPY')
+            except Exception as e:
+                return type(e).__name__
+        assert _concurrently([call] * 4) == ['FixerioApiError'] * 4
+    assert len(server.requests) == 1
+
+
+def test_eviction(server):
+    with Fixerio(base_url=server.url, max_entries=2) as test:
+        for date in ('2018-01-08', '2018-01-09', '2018-01-10'):
+            test.get_rates(date=date, symbols='JPY')
+        test.get_rates(date='2018-01-09', symbols='JPY')
+        assert len(test._cache) == 2
+        assert test._cache.peek('USD', '2018-01-08') is None
+        assert test._metrics.evictions == 1
+        test.get_rates(date='2018-01-08', symbols='JPY')
+        # the least recently used table is evicted
+        assert test._cache.peek('USD', '2018-01-10') is None
+        assert test._cache.peek('USD', '2018-01-09') is not None
+    assert len(server.requests) == 4
+
+
+def test_lone_request_does_not_wait(server):
+    with Fixerio(base_url=server.url, batch_window=1.0) as test:
+        start = time.perf_counter()
+        test.get_rates(date='2018-01-10', symbols='JPY')
+        test.get_rates(date='2018-01-10', symbols='GBP')
+        assert time.perf_counter() - start < 0.5
+
+
+def test_requests_batched_while_one_is_in_flight(server, monkeypatch):
+    monkeypatch.setattr(server, 'latency', 0.2)
+    with Fixerio(base_url=server.url, batch_window=0.05) as test:
+        first = threading.Thread(target=test.get_rates, kwargs={'date': '2018-01-10', 'symbols': 'JPY'})
+        first.start()
+        time.sleep(0.05)
+        results = _concurrently([lambda symbol=symbol: test.get_rates(date='2018-01-10', symbols=symbol)
+                                 for symbol in ('GBP', 'CHF', 'CAD')])
+        first.join()
+        assert [list(rates) for rates in results] == [['GBP'], ['CHF'], ['CAD']]
+    assert len(server.requests) == 2
+    assert sorted(server.requests[1].split('symbols=')[1].split('%2C')) == ['CAD', 'CHF', 'GBP']
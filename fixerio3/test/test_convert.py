@@ -0,0 +1,77 @@
+import pytest
+from fixerio3.exceptions import FixerioCurrencyUnavailable
+from fixerio3.fixerio import Fixerio
+
+
+@pytest.fixture
+def fixerio(server):
+    with Fixerio(base_url=server.url) as test:
+        yield test
+
+
+def test_convert_many_takes_the_arguments_of_convert(fixerio):
+    amounts = [1, 2.5, 10]
+    targets = ['JPY', 'EUR', 'USD']
+    bases = ['USD', 'USD', 'EUR']
+    dates = ['2018-01-10', '2018-01-09', '2018-01-10']
+    expected = [fixerio.convert(*row) for row in zip(amounts, targets, bases, dates)]
+    assert list(fixerio.convert_many(amounts, targets, bases, dates)) == pytest.approx(expected)
+
+
+def test_convert_many_defaults(fixerio):
+    converted = fixerio.convert_many([1, 2], 'JPY', dates='2018-01-10')
+    assert list(converted) == pytest.approx([fixerio.convert(x, 'JPY', date='2018-01-10') for x in (1, 2)])
+
+
+def test_convert_uses_the_table_of_base(fixerio, server):
+    # the mock tables of different bases are not consistent with each other, so a cross
+    # rate derived from the USD table differs from the rate of the EUR table
+    fixerio.get_rates(date='2018-01-10', base='USD')
+    fixerio.convert(1, 'JPY', 'USD', '2018-01-10')
+    converted = fixerio.convert(1, 'JPY', 'EUR', '2018-01-10')
+    assert converted == fixerio.get_rates(date='2018-01-10', base='EUR', symbols='JPY')['JPY']
+    assert fixerio.convert(1, 'JPY', 'EUR', '2018-01-10') == converted
+    assert len(server.requests) == 2
+
+
+def test_convert_triangulated_uses_the_matrix(server):
+    with Fixerio(base_url=server.url, triangulate=True) as test:
+        rates = test.get_rates(date='2018-01-10', base='EUR')
+        assert test.convert(1, 'JPY', 'USD', '2018-01-10') == pytest.approx(rates['JPY'] / rates['USD'])
+        assert test.convert(1, 'GBP', 'JPY', '2018-01-10') == pytest.approx(rates['GBP'] / rates['JPY'])
+    assert len(server.requests) == 1
+
+
+def test_convert_from_several_bases_uses_their_matrices(fixerio, server, monkeypatch):
+    for base in ('USD', 'EUR', 'USD', 'EUR'):
+        fixerio.get_rates(date='2018-01-10', base=base)
+        fixerio.convert(1, 'JPY', base, '2018-01-10')
+    assert fixerio._matrix('USD', '2018-01-10').source == 'USD'
+    assert fixerio._matrix('EUR', '2018-01-10').source == 'EUR'
+    rates = {base: fixerio.get_rates(date='2018-01-10', base=base) for base in ('USD', 'EUR')}
+
+    def cached(*args):
+        raise AssertionError('a matrix conversion looked up the cached table')
+    monkeypatch.setattr(fixerio, '_cached', cached)
+    for base in ('USD', 'EUR'):
+        assert fixerio.convert(2, 'GBP', base, '2018-01-10') == pytest.approx(2 * rates[base]['GBP'])
+    assert len(server.requests) == 2
+
+
+def test_triangulated_get_rates(server):
+    with Fixerio(base_url=server.url, triangulate=True) as test:
+        pivot = test.get_rates(date='2018-01-10', base='EUR')
+        for base in ('USD', 'JPY', 'GBP'):
+            rates = test.get_rates(date='2018-01-10', base=base, symbols='EUR,CHF')
+            assert rates == pytest.approx({'EUR': 1 / pivot[base], 'CHF': pivot['CHF'] / pivot[base]})
+        assert test.get_rates(date='2018-01-10', base='USD')['JPY'] == pytest.approx(pivot['JPY'] / pivot['USD'])
+    assert server.requests == ['/2018-01-10?base=EUR']
+
+
+def test_triangulated_base_missing_from_the_pivot(server):
+    # ISK is only published from 2018-02-01
+    with Fixerio(base_url=server.url, triangulate=True) as test:
+        with pytest.raises(FixerioCurrencyUnavailable):
+            test.get_rates(date='2018-01-10', base='ISK')
+        assert test.get_rates(date='2018-02-01', base='ISK')['EUR'] > 0
+    assert server.requests == ['/2018-01-10?base=EUR', '/2018-02-01?base=EUR']
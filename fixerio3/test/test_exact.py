@@ -0,0 +1,76 @@
+import random
+from decimal import ROUND_CEILING
+from decimal import ROUND_DOWN
+from decimal import ROUND_FLOOR
+from decimal import ROUND_HALF_DOWN
+from decimal import ROUND_HALF_EVEN
+from decimal import ROUND_HALF_UP
+from decimal import ROUND_UP
+from decimal import Decimal
+from decimal import localcontext
+import pytest
+from fixerio3.exact import ROUNDINGS
+from fixerio3.exact import ExactTable
+from fixerio3.exact import numpy
+from fixerio3.fixerio import Fixerio
+
+
+@pytest.mark.parametrize('rounding, expected', [
+    (ROUND_HALF_EVEN, ['0.02', '0.04', '-0.02']), (ROUND_HALF_UP, ['0.03', '0.05', '-0.03']),
+    (ROUND_HALF_DOWN, ['0.02', '0.04', '-0.02']), (ROUND_CEILING, ['0.03', '0.05', '-0.02']),
+    (ROUND_FLOOR, ['0.02', '0.04', '-0.03']), (ROUND_UP, ['0.03', '0.05', '-0.03']),
+    (ROUND_DOWN, ['0.02', '0.04', '-0.02'])])
+def test_rounding_of_ties(rounding, expected):
+    table = ExactTable('USD', {'EUR': '0.5'}, rounding=rounding)
+    assert [table.convert(x, 'USD', 'EUR') for x in ('0.05', '0.09', '-0.05')] == [Decimal(x) for x in expected]
+
+
+@pytest.mark.parametrize('rounding', ROUNDINGS)
+def test_same_as_decimal(rounding):
+    generator = random.Random(7)
+    rates = {'EUR': '0.812345', 'JPY': '110.98', 'GBP': '0.7213'}
+    table = ExactTable('USD', rates, rounding=rounding)
+    with localcontext() as context:
+        context.prec = 60
+        for _ in range(500):
+            amount = '{}.{:02d}'.format(generator.randint(-10 ** 9, 10 ** 9), generator.randint(0, 99))
+            for target, rate in rates.items():
+                exponent = Decimal(1).scaleb(-table.minor(target))
+                expected = (Decimal(amount) * Decimal(rate)).quantize(exponent, rounding=rounding)
+                assert table.convert(amount, 'USD', target) == expected
+
+
+def test_cross_rates_rounded_once():
+    table = ExactTable('EUR', {'USD': '1.1987', 'JPY': '131.02'})
+    with localcontext() as context:
+        context.prec = 60
+        expected = (Decimal('1000') * Decimal('131.02') / Decimal('1.1987')).quantize(Decimal(1))
+    assert table.convert('1000', 'USD', 'JPY') == expected
+
+
+def test_minor_units():
+    table = ExactTable('USD', {'EUR': '0.8', 'JPY': '110.5', 'ISK': '101.3'}, minor_units={'ISK': 2})
+    assert table.convert_minor_units([1, 100, 12345], 'USD', 'EUR') == [1, 80, 9876]
+    assert table.convert_minor_units([100, 12345], 'USD', 'JPY') == [110, 13641]
+    assert table.convert_minor_units([100], 'USD', 'ISK') == [10130]
+    if numpy is not None:
+        amounts = numpy.array([1, 100, 12345], dtype=numpy.int64)
+        assert table.convert_minor_units(amounts, 'USD', 'EUR').tolist() == [1, 80, 9876]
+
+
+def test_fixerio_exact(server):
+    with Fixerio(base_url=server.url, exact=True, rounding=ROUND_HALF_UP) as test:
+        converted = test.convert('12.34', 'EUR', 'USD', '2018-01-10')
+        rate = Decimal(str(test.get_rates(date='2018-01-10', symbols='EUR')['EUR']))
+        assert converted == (Decimal('12.34') * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        assert test.convert_many(['12.34', '1'], 'EUR', 'USD', '2018-01-10')[0] == converted
+        assert test.convert_minor_units(1234, 'EUR', 'USD', '2018-01-10') == int(converted * 100)
+        assert test.convert('12.345', 'USD', 'USD', '2018-01-10') == Decimal('12.35')
+    assert len(server.requests) == 1
+
+
+@pytest.mark.parametrize('amounts', [[1.5], [100, 2.0], [True], 1.5, False, ['100']])
+def test_minor_units_must_be_integers(server, amounts):
+    with Fixerio(base_url=server.url) as test:
+        with pytest.raises(ValueError, match='integer amounts of minor units'):
+            test.convert_minor_units(amounts, 'JPY', 'USD', '2018-01-10')
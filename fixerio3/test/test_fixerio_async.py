@@ -0,0 +1,152 @@
+import asyncio
+import time
+from decimal import Decimal
+import pytest
+from fixerio3 import aio
+from fixerio3.aio import AsyncFixerio
+from fixerio3.fixerio import Fixerio
+
+AMOUNTS = [1, 2.5, 10]
+TARGETS = ['JPY', 'EUR', 'USD']
+BASES = ['USD', 'USD', 'EUR']
+DATES = ['2018-01-10', '2018-01-09', '2018-01-10']
+
+
+def _run(server, coroutine, **kwargs):
+    async def run():
+        async with AsyncFixerio(base_url=server.url, **kwargs) as test:
+            return await coroutine(test)
+
+    return asyncio.run(run())
+
+
+def test_module_functions(server, monkeypatch):
+    monkeypatch.setattr(aio, 'OPEN_BASE_URL', server.url)
+    rates = asyncio.run(aio.get_rates(date='2018-01-29', base='USD', symbols=['EUR', 'JPY']))
+    assert sorted(rates) == ['EUR', 'JPY']
+    assert asyncio.run(aio.convert(10, base='USD', target='EUR', date='2018-01-29')) == \
+        pytest.approx(10 * rates['EUR'])
+
+
+def test_get_rates_and_convert(server):
+    async def calls(test):
+        rates = await test.get_rates(date='2018-01-10', base='USD', symbols=['EUR', 'JPY'])
+        converted = await test.convert(20, base='USD', target='JPY', date='2018-01-10')
+        same = await test.convert(20, base='USD', target='USD', date='2018-01-10')
+        return rates, converted, same
+
+    rates, converted, same = _run(server, calls)
+    with Fixerio(base_url=server.url) as test:
+        assert rates == test.get_rates(date='2018-01-10', base='USD', symbols=['EUR', 'JPY'])
+    assert converted == pytest.approx(20 * rates['JPY'])
+    assert same == 20.0
+    # the conversion is served by the cached table
+    assert len(server.requests) == 2
+
+
+def test_gather_rates(server):
+    dates = ['2018-01-08', '2018-01-09', '2018-01-10']
+
+    async def gather(test):
+        await test.get_rates(date='2018-01-08', base='USD', symbols='JPY')
+        return await test.gather_rates(dates, ['USD', 'EUR'], symbols='JPY')
+
+    results = _run(server, gather)
+    assert sorted(results) == sorted((date, base) for date in dates for base in ('USD', 'EUR'))
+    assert all(list(rates) == ['JPY'] for rates in results.values())
+    # the cached pair is not requested again
+    assert len(server.requests) == 6
+
+
+def test_gather_rates_concurrency(server, monkeypatch):
+    monkeypatch.setattr(server, 'latency', 0.2)
+    dates = ['2018-01-{:02d}'.format(day) for day in range(8, 12)]
+    start = time.perf_counter()
+    _run(server, lambda test: test.gather_rates(dates, ['USD'], symbols='JPY'), max_concurrency=2)
+    # four requests of 0.2 seconds, two at a time
+    assert 0.4 <= time.perf_counter() - start < 0.75
+
+
+def test_convert_many(server):
+    converted = _run(server, lambda test: test.convert_many(AMOUNTS, TARGETS, BASES, DATES))
+    with Fixerio(base_url=server.url) as test:
+        assert list(converted) == pytest.approx(list(test.convert_many(AMOUNTS, TARGETS, BASES, DATES)))
+
+
+def test_convert_many_exact(server):
+    converted = _run(server, lambda test: test.convert_many(['1.00', '2.50', '10'], TARGETS, BASES, DATES),
+                     exact=True)
+    with Fixerio(base_url=server.url, exact=True) as test:
+        assert converted == test.convert_many(['1.00', '2.50', '10'], TARGETS, BASES, DATES)
+    assert all(isinstance(x, Decimal) for x in converted)
+
+
+def test_get_timeseries(server):
+    series = _run(server, lambda test: test.get_timeseries('2018-01-08', '2018-01-14', symbols='JPY'))
+    with Fixerio(base_url=server.url) as test:
+        assert series == test.get_timeseries('2018-01-08', '2018-01-14', symbols='JPY')
+    assert sorted(series) == ['2018-01-{:02d}'.format(day) for day in range(8, 15)]
+
+
+def test_get_timeseries_paid(server):
+    series = _run(server, lambda test: test.get_timeseries('2017-06-01', '2018-07-01', symbols='JPY'),
+                  paid_membership=True, access_key='key')
+    assert len(series) == 282  # week days, the timeseries endpoint leaves out weekends
+    assert sum('timeseries' in path for path in server.requests) == 2
+
+
+@pytest.mark.parametrize('paid', [False, True])
+def test_fluctuation_and_stats(server, paid):
+    kwargs = {'paid_membership': True, 'access_key': 'key'} if paid else {}
+
+    async def query(test):
+        return (await test.fluctuation('2018-01-01', '2018-03-31', symbols=['JPY', 'EUR']),
+                await test.stats('2018-01-01', '2018-03-31', symbols=['JPY', 'EUR']))
+
+    fluctuation, stats = _run(server, query, **kwargs)
+    with Fixerio(base_url=server.url, **kwargs) as test:
+        assert fluctuation == test.fluctuation('2018-01-01', '2018-03-31', symbols=['JPY', 'EUR'])
+        assert stats == test.stats('2018-01-01', '2018-03-31', symbols=['JPY', 'EUR'])
+    assert sorted(stats) == ['EUR', 'JPY']
+    assert stats['JPY']['count'] == 64
+
+
+def test_convert_minor_units(server):
+    async def convert(test):
+        return (await test.convert_minor_units([100, 12345, -99], 'JPY', 'USD', '2018-01-10'),
+                await test.convert_minor_units(250, 'EUR', 'EUR', '2018-01-10'))
+
+    converted, same = _run(server, convert, exact=True)
+    with Fixerio(base_url=server.url, exact=True) as test:
+        assert converted == test.convert_minor_units([100, 12345, -99], 'JPY', 'USD', '2018-01-10')
+    assert same == 250
+
+
+def test_concurrent_tasks_make_one_request(server, monkeypatch):
+    monkeypatch.setattr(server, 'latency', 0.1)
+
+    async def calls(test):
+        results = await asyncio.gather(*(test.get_rates(date='2018-01-10', symbols='JPY') for _ in range(8)))
+        return results, test.get_stats()
+
+    results, stats = _run(server, calls)
+    assert all(rates == results[0] for rates in results)
+    assert (stats['fetches'], stats['coalesced']) == (1, 7)
+    assert len(server.requests) == 1
+
+
+def test_tasks_batched_while_one_is_in_flight(server, monkeypatch):
+    monkeypatch.setattr(server, 'latency', 0.2)
+
+    async def calls(test):
+        first = asyncio.ensure_future(test.get_rates(date='2018-01-10', symbols='JPY'))
+        await asyncio.sleep(0.05)
+        results = await asyncio.gather(*(test.get_rates(date='2018-01-10', symbols=symbol)
+                                         for symbol in ('GBP', 'CHF', 'CAD')))
+        await first
+        return results
+
+    results = _run(server, calls, batch_window=0.05)
+    assert [list(rates) for rates in results] == [['GBP'], ['CHF'], ['CAD']]
+    assert len(server.requests) == 2
+    assert sorted(server.requests[1].split('symbols=')[1].replace('%2C', ',').split(',')) == ['CAD', 'CHF', 'GBP']
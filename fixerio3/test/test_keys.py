@@ -0,0 +1,40 @@
+import pytest
+from fixerio3.exceptions import FixerioInvalidCurrency
+from fixerio3.exceptions import FixerioInvalidDate
+from fixerio3.fixerio import _date
+from fixerio3.fixerio import _make_key
+from fixerio3.fixerio import _request_key
+
+
+def test_equivalent_requests_share_a_key():
+    key = _request_key('2018-01-10', 'USD', ['EUR', 'JPY'])
+    assert key == ('2018-01-10', 'USD', ('EUR', 'JPY'), False)
+    for symbols in ('JPY,EUR', 'EUR,JPY,EUR', ('JPY', 'EUR'), ['JPY', 'EUR']):
+        for date in ('2018-01-10', '2018-1-10'):
+            assert _request_key(date, 'USD', symbols) == key
+    assert _request_key('2018-01-10', 'USD', None).symbols is None
+
+
+def test_latest_resolved():
+    key = _request_key('latest', 'USD', 'JPY')
+    assert key.date == _date() and key.latest
+
+
+def test_memoized():
+    _make_key.cache_clear()
+    key = _request_key('2018-01-10', 'GBP', ['EUR', 'JPY'])
+    assert _request_key('2018-01-10', 'GBP', ['EUR', 'JPY']) is key
+    assert _make_key.cache_info().hits == 1
+
+
+@pytest.mark.parametrize('date', ['2018-13-01', '1998-12-31', '2999-01-01', 'yesterday', 20180110])
+def test_invalid_date(date):
+    with pytest.raises(FixerioInvalidDate):
+        _request_key(date, 'USD', None)
+
+
+@pytest.mark.parametrize('base, symbols', [('XXX', None), ('USD,EUR', None), (None, None), ('USD', ['XXX']),
+                                           ('USD', 'JPY;EUR'), ('USD', 5)])
+def test_invalid_currencies(base, symbols):
+    with pytest.raises(FixerioInvalidCurrency):
+        _request_key('2018-01-10', base, symbols)
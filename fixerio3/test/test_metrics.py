@@ -0,0 +1,74 @@
+import pytest
+from fixerio3.exceptions import FixerioApiError
+from fixerio3.fixerio import Fixerio
+from fixerio3.metrics import Metrics
+
+
+@pytest.fixture
+def recorded(server, tmp_path):
+    """ A Fixerio keeping one table and writing it to file, and the events of its metrics """
+    events = []
+    metrics = Metrics()
+    metrics.add_hook(lambda event, fields: events.append((event, fields)))
+    with Fixerio(base_url=server.url, max_entries=1, metrics=metrics, cache_to_file=True,
+                 out_name=str(tmp_path / 'cache.json'), out_format='json') as test:
+        test.get_rates(date='2018-01-10', symbols='JPY')
+        test.get_rates(date='2018-01-10', symbols='JPY')
+        test.get_rates(date='2018-01-09', symbols='JPY')
+        server.fail_next(104)
+        with pytest.raises(FixerioApiError):
+            test.get_rates(date='2018-01-08', symbols='JPY')
+        yield test, events
+
+
+def test_hooks(recorded):
+    test, events = recorded
+    assert [event for event, _ in events] == ['cache', 'request', 'persist', 'cache', 'cache', 'request', 'evict',
+                                              'persist', 'cache', 'request']
+    requests = [fields for event, fields in events if event == 'request']
+    assert [(x['status'], x['code']) for x in requests] == [(200, None), (200, None), (200, 104)]
+    assert [x['url'].rsplit('/', 1)[1] for x in requests] == ['2018-01-10', '2018-01-09', '2018-01-08']
+    assert all(x['bytes'] > 0 and x['error'] is None for x in requests[:2])
+    cache = [(x['hit'], x['date']) for event, x in events if event == 'cache']
+    assert cache == [(False, '2018-01-10'), (True, '2018-01-10'), (False, '2018-01-09'), (False, '2018-01-08')]
+    assert [x for event, x in events if event == 'evict'] == [{'base': 'USD', 'date': '2018-01-10'}]
+    assert [x['kind'] for event, x in events if event == 'persist'] == ['snapshot'] * 2
+
+
+def test_snapshot(recorded):
+    test, _ = recorded
+    snapshot = test.get_metrics().snapshot()
+    assert {k: snapshot[k] for k in ('requests', 'hits', 'misses', 'evictions', 'statuses', 'error_codes')} == \
+        {'requests': 3, 'hits': 1, 'misses': 3, 'evictions': 1, 'statuses': {200: 3}, 'error_codes': {104: 1}}
+    assert snapshot['latency']['count'] == 3 and snapshot['latency']['buckets']['+Inf'] == 3
+    assert snapshot['persistence']['snapshot']['count'] == 2
+    assert snapshot['quota_used'] == 3 and snapshot['hit_ratio'] == 0.25
+
+
+def test_openmetrics(recorded):
+    test, _ = recorded
+    text = test.export_metrics()
+    lines = text.splitlines()
+    assert text.endswith('\n# EOF\n') and lines.count('# EOF') == 1
+    for line in ('# TYPE fixerio3_requests counter', 'fixerio3_requests_total 3',
+                 '# TYPE fixerio3_request_duration_seconds histogram',
+                 'fixerio3_request_duration_seconds_bucket{le="+Inf"} 3', 'fixerio3_request_duration_seconds_count 3',
+                 'fixerio3_http_responses_total{status="200"} 3', 'fixerio3_api_errors_total{code="104"} 1',
+                 'fixerio3_cache_hits_total 1', 'fixerio3_cache_misses_total 3', 'fixerio3_cache_evictions_total 1',
+                 '# TYPE fixerio3_quota_used gauge', 'fixerio3_quota_used 3', 'fixerio3_cache_backend_entries 1'):
+        assert line in lines
+    counters = {x.split()[2] for x in lines if x.startswith('# TYPE') and x.endswith(' counter')}
+    for line in lines:
+        name = line.split('{')[0].split()[0]
+        if not line.startswith('#') and name[:-len('_total')] in counters:
+            assert name.endswith('_total')
+
+
+def test_partial_table_counted_once(server):
+    with Fixerio(base_url=server.url) as test:
+        test.get_rates(date='2018-01-10', symbols='JPY')
+        test.get_rates(date='2018-01-10', symbols='GBP')
+        test.get_rates(date='2018-01-10', symbols='GBP,JPY')
+        stats = test.get_stats()
+        metrics = test.get_metrics()
+        assert (stats['hits'], stats['misses']) == (metrics.hits, metrics.misses) == (1, 2)
@@ -0,0 +1,95 @@
+import threading
+import pytest
+from fixerio3 import fixerio
+from fixerio3.exceptions import FixerioException
+from fixerio3.fixerio import Fixerio
+from fixerio3.utils import _iter_json
+from fixerio3.utils import _open_text
+from fixerio3.utils import read_stream
+from fixerio3.utils import write_stream
+
+
+def _journaled(server, name, **kwargs):
+    return Fixerio(cache_to_file=True, out_name=name, out_format='json', journal=True,
+                   base_url=server.url, **kwargs)
+
+
+def test_journal_replayed_on_top_of_snapshot(server, tmp_path):
+    name = str(tmp_path / 'rates.json')
+    with _journaled(server, name, compact_every=None) as test:
+        test.get_rates(date='2018-01-10')
+        test.get_rates(date='2018-01-11')
+        test._journal.compact()
+        test.get_rates(date='2018-01-12')
+
+    with _journaled(server, name, compact_every=None) as test:
+        server.reset()
+        for date in ('2018-01-10', '2018-01-11', '2018-01-12'):
+            assert test.get_rates(date=date)['JPY'] > 0
+        assert server.requests == []
+        # a compaction must not drop the tables of the previous snapshot
+        test._journal.compact()
+
+    with _journaled(server, name, compact_every=None) as test:
+        assert len(test._cache) == 3
+        assert server.requests == []
+
+
+def test_snapshot_written_outside_the_lock(server, tmp_path, monkeypatch):
+    name = str(tmp_path / 'rates.json')
+    looked_up = threading.Event()
+    waited = []
+
+    def write_stream(tables, file, wformat):
+        waited.append(looked_up.wait(5))
+        write(tables, file, wformat)
+
+    write = fixerio.write_stream
+    with Fixerio(cache_to_file=True, out_name=name, out_format='json', base_url=server.url) as test:
+        test.get_rates(date='2018-01-10')
+        monkeypatch.setattr(fixerio, 'write_stream', write_stream)
+        writer = threading.Thread(target=test._write_snapshot)
+        writer.start()
+        # a cache hit while the snapshot is being written
+        assert test.get_rates(date='2018-01-10', symbols='JPY')['JPY'] > 0
+        looked_up.set()
+        writer.join()
+    assert waited == [True]
+    with Fixerio(in_file=name, in_format='json', base_url=server.url) as test:
+        assert test._cache.peek('USD', '2018-01-10') is not None
+
+
+_TABLES = [('USD', '2018-01-09', {'EUR': 0.836, 'JPY': 112.45, 'GBP': 0.7391}),
+           ('USD', '2018-01-10', {'EUR': 0.8342, 'JPY': 111.392}),
+           ('EUR', '2018-01-10', {'USD': 1.198786, 'CHF': 1.17})]
+
+
+@pytest.mark.parametrize('name', ['cache.json', 'cache.json.gz', 'cache.csv', 'cache.csv.gz'])
+def test_stream_round_trip(tmp_path, name):
+    file = str(tmp_path / name)
+    fmt = name.split('.')[1]
+    write_stream(iter(_TABLES), file, fmt)
+    assert list(read_stream(file, fmt)) == _TABLES
+    write_stream(iter(()), file, fmt)
+    assert list(read_stream(file, fmt)) == []
+
+
+@pytest.mark.parametrize('name', ['cache.json', 'cache.json.gz'])
+def test_json_split_across_chunks(tmp_path, name):
+    # every string and number of the file ends up split between two reads
+    file = str(tmp_path / name)
+    write_stream(iter(_TABLES), file, 'json')
+    for chunk_size in range(1, 12):
+        with _open_text(file) as f:
+            assert list(_iter_json(f, chunk_size)) == _TABLES
+
+
+def test_truncated_json(tmp_path):
+    file = str(tmp_path / 'cache.json')
+    write_stream(iter(_TABLES), file, 'json')
+    with open(file) as f:
+        contents = f.read()
+    with open(file, 'w') as f:
+        f.write(contents[:-10])
+    with pytest.raises(FixerioException):
+        list(read_stream(file, 'json'))
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fixerio3 import fixerio
+from fixerio3.aio import AsyncFixerio
+from fixerio3.breaker import CircuitBreaker
+from fixerio3.exceptions import FixerioApiError
+from fixerio3.exceptions import FixerioCircuitOpen
+from fixerio3.fixerio import Fixerio
+from fixerio3.fixerio import RequestKey
+from fixerio3.fixerio import StaleRates
+
+
+def test_server_errors_open_the_circuit(server):
+    with Fixerio(base_url=server.url, retries=0, breaker=CircuitBreaker(failure_threshold=2)) as test:
+        server.fail_next(None, times=2, status=503)
+        for _ in range(2):
+            with pytest.raises(FixerioApiError) as error:
+                test.get_rates(date='2018-01-10')
+            assert error.value.status == 503
+        with pytest.raises(FixerioCircuitOpen):
+            test.get_rates(date='2018-01-10')
+        assert len(server.requests) == 2
+
+
+def test_rate_limiting_is_a_failure(server):
+    with Fixerio(base_url=server.url, retries=0, breaker=CircuitBreaker(failure_threshold=1)) as test:
+        server.fail_next(None, status=429)
+        with pytest.raises(FixerioApiError):
+            test.get_rates(date='2018-01-10')
+        assert test._breaker.state == 'open'
+
+
+def test_server_errors_open_the_circuit_async(server):
+    async def run():
+        async with AsyncFixerio(base_url=server.url, retries=0,
+                                breaker=CircuitBreaker(failure_threshold=2)) as test:
+            server.fail_next(None, times=2, status=502)
+            for _ in range(2):
+                with pytest.raises(FixerioApiError) as error:
+                    await test.get_rates(date='2018-01-10')
+                assert error.value.status == 502
+            with pytest.raises(FixerioCircuitOpen):
+                await test.get_rates(date='2018-01-10')
+
+    asyncio.run(run())
+    assert len(server.requests) == 2
+
+
+def test_remembered_errors_are_new_exceptions(server):
+    server.fail_next(202)
+    with Fixerio(base_url=server.url) as test:
+        errors = []
+        for _ in range(3):
+            with pytest.raises(FixerioApiError) as error:
+                test.get_rates(date='2018-01-10', symbols='JPY')
+            errors.append(error.value)
+        assert len({id(x) for x in errors}) == 3
+        assert [(x.code, x.info, x.args) for x in errors[1:]] == [(errors[0].code, errors[0].info, errors[0].args)] * 2
+        assert test._negative.hits == 2
+    assert len(server.requests) == 1
+
+
+def test_failed_revalidations_are_recorded(server):
+    key = RequestKey('2018-01-10', 'USD', None, True)
+    with Fixerio(base_url=server.url, retries=0) as test:
+        server.fail_next(None, status=503)
+        test._run_revalidation(key)
+        test._run_revalidation(key)
+        metrics = test._metrics
+        assert (metrics.revalidations, metrics.failed_revalidations) == (2, 1)
+        assert metrics.last_revalidation_error.status == 503
+
+
+def test_failed_revalidations_are_recorded_async(server):
+    async def run():
+        async with AsyncFixerio(base_url=server.url, retries=0) as test:
+            events = []
+            test._metrics.add_hook(lambda event, fields: events.append((event, fields)))
+            server.fail_next(None, status=503)
+            await test._run_revalidation(RequestKey('2018-01-10', 'USD', None, True))
+            return events
+
+    events = asyncio.run(run())
+    assert [e for e, _ in events].count('revalidate') == 1
+    fields = next(f for e, f in events if e == 'revalidate')
+    assert (fields['base'], fields['date'], fields['error'].status) == ('USD', '2018-01-10', 503)
+
+
+@pytest.fixture
+def rollover(server, monkeypatch):
+    """ Makes 2018-01-10 the latest date, returns a function moving it to 2018-01-11 """
+    monkeypatch.setattr(fixerio, '_latest', ['2018-01-10', float('inf')])
+    monkeypatch.setattr(server, 'latest', '2018-01-10')
+
+    def roll():
+        fixerio._latest[:] = ['2018-01-11', float('inf')]
+        server.latest = '2018-01-11'
+    return roll
+
+
+def test_stale_rates_served_while_revalidating(server, rollover, monkeypatch):
+    with Fixerio(base_url=server.url, stale_while_revalidate=True) as test:
+        previous = test.get_rates(symbols='JPY')
+        time.sleep(0.1)
+        rollover()
+        monkeypatch.setattr(server, 'latency', 0.2)
+        barrier = threading.Barrier(8)
+
+        def call():
+            barrier.wait()
+            return test.get_rates(symbols='JPY')
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: call(), range(8)))
+        for rates in results:
+            assert isinstance(rates, StaleRates) and rates == previous
+            assert rates.date == '2018-01-10' and 0.1 <= rates.age < 5
+        for thread in threading.enumerate():
+            if thread.name == 'fixerio3-revalidate':
+                thread.join()
+        assert test.get_metrics().revalidations == 1
+        current = test.get_rates(symbols='JPY')
+        assert not isinstance(current, StaleRates) and current != previous
+    assert server.requests == ['/latest?base=USD&symbols=JPY'] * 2
+
+
+def test_too_stale_rates_fetched(server, rollover):
+    with Fixerio(base_url=server.url, stale_while_revalidate=True, max_stale=0.05) as test:
+        previous = test.get_rates(symbols='JPY')
+        time.sleep(0.1)
+        rollover()
+        current = test.get_rates(symbols='JPY')
+        assert not isinstance(current, StaleRates) and current != previous
+        assert test.get_metrics().revalidations == 0
+    assert server.requests == ['/latest?base=USD&symbols=JPY'] * 2
@@ -0,0 +1,38 @@
+import pytest
+from fixerio3 import scheduler
+from fixerio3.fixerio import Fixerio
+from fixerio3.scheduler import PrefetchScheduler
+
+
+@pytest.fixture
+def weekend(server, monkeypatch):
+    """ A Saturday, the latest table being the one of the Friday before """
+    monkeypatch.setattr(scheduler, '_date', lambda: '2018-01-13')
+    monkeypatch.setattr(server, 'latest', '2018-01-12')
+    return server
+
+
+@pytest.mark.parametrize('date, latest', [('2018-01-13', '2018-01-12'), ('2018-01-10', '2018-01-10'),
+                                          ('2018-12-25', '2018-12-24')])
+def test_expected_date(server, monkeypatch, date, latest):
+    monkeypatch.setattr(scheduler, '_date', lambda: date)
+    with Fixerio(base_url=server.url) as test:
+        assert PrefetchScheduler(test, ['USD'])._expected_date() == latest
+
+
+def test_prefetch_on_a_weekend(weekend):
+    with Fixerio(base_url=weekend.url) as test:
+        prefetch = PrefetchScheduler(test, ['USD', 'EUR'], retries=0)
+        assert prefetch.prefetch()
+        assert prefetch.runs == 1 and prefetch.failures == 0
+        assert test._cache.peek('EUR', '2018-01-12') is not None
+
+
+def test_prefetch_before_publication(server, monkeypatch):
+    monkeypatch.setattr(scheduler, '_date', lambda: '2018-01-11')
+    monkeypatch.setattr(server, 'latest', '2018-01-10')
+    with Fixerio(base_url=server.url) as test:
+        prefetch = PrefetchScheduler(test, ['USD'], retries=0)
+        assert not prefetch.prefetch()
+        assert prefetch.failures == 1
+        assert test._cache.peek('USD', '2018-01-10') is None
@@ -0,0 +1,59 @@
+import pytest
+import requests
+from fixerio3.exceptions import FixerioApiError
+from fixerio3.fixerio import Fixerio
+from fixerio3.transport import fetch_json
+from fixerio3.transport import new_session
+
+
+@pytest.mark.parametrize('status', [503, 429])
+def test_failure_retried(server, status):
+    server.fail_next(None, status=status)
+    with Fixerio(base_url=server.url, retries=2, backoff=0) as test:
+        assert test.get_rates(date='2018-01-10', symbols='JPY')['JPY'] > 0
+    assert server.requests == ['/2018-01-10?base=USD&symbols=JPY'] * 2
+
+
+def test_retries_exhausted(server):
+    server.fail_next(None, times=3, status=503)
+    with Fixerio(base_url=server.url, retries=2, backoff=0) as test:
+        with pytest.raises(FixerioApiError) as error:
+            test.get_rates(date='2018-01-10', symbols='JPY')
+    assert error.value.status == 503
+    assert len(server.requests) == 3
+
+
+def test_fetch_json(server):
+    session = new_session(retries=1, backoff=0)
+    try:
+        server.fail_next(None, times=2, status=502)
+        with pytest.raises(FixerioApiError):
+            fetch_json(server.url + '2018-01-10', session=session)
+        assert fetch_json(server.url + '2018-01-10', params={'base': 'EUR'}, session=session)['base'] == 'EUR'
+    finally:
+        session.close()
+    assert len(server.requests) == 3
+
+
+def _spy_close(session):
+    closed = []
+    session.close = lambda: closed.append(session)
+    return closed
+
+
+def test_owned_session_closed(server):
+    test = Fixerio(base_url=server.url)
+    closed = _spy_close(test._session)
+    test.close()
+    assert closed == [test._session]
+    requests.Session.close(test._session)
+
+
+def test_session_of_the_caller_left_open(server):
+    session = new_session()
+    closed = _spy_close(session)
+    with Fixerio(base_url=server.url, session=session) as test:
+        test.get_rates(date='2018-01-10', symbols='JPY')
+    assert closed == []
+    assert fetch_json(server.url + '2018-01-10', session=session)['success']
+    requests.Session.close(session)
@@ -0,0 +1,95 @@
+"""
+This file provides the HTTP transport shared by the get_rates and convert modules and by
+Fixerio objects. Requests go through a pooled requests.Session so that TCP and TLS
+connections are kept alive between calls, and failed requests (5xx and rate limiting)
+are retried with exponential backoff.
+
+new_session(pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES,
+            backoff: float = DEFAULT_BACKOFF) -> requests.Session:
+get_session() -> requests.Session:
+fetch_json(url, params=None, session=None, timeout=DEFAULT_TIMEOUT, metrics=None) -> dict:
+"""
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from fixerio3.exceptions import FixerioApiError
+
+# Modify these to change the defaults used by every new session
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5  # seconds, doubled on every retry
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) timeout in seconds
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_shared_session = None
+_shared_lock = threading.Lock()
+
+
+def new_session(pool_size: int=DEFAULT_POOL_SIZE, retries: int=DEFAULT_RETRIES,
+                backoff: float=DEFAULT_BACKOFF) -> requests.Session:
+    """ Returns a requests.Session with a connection pool of pool_size connections per host
+        and retries with exponential backoff on 5xx and rate limiting (429) responses """
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=backoff, status_forcelist=RETRY_STATUS,
+                  allowed_methods=frozenset(['GET']), raise_on_status=False,
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """ Returns the session shared by the module level get_rates and convert functions,
+        creating it on first use """
+    global _shared_session
+    if _shared_session is None:
+        with _shared_lock:
+            if _shared_session is None:
+                _shared_session = new_session()
+    return _shared_session
+
+
+def close_session():
+    """ Closes the shared session. A new one is created the next time it is needed """
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
+
+
+def check_status(status):
+    """ Raises FixerioApiError if the HTTP status is a server error or rate limiting (429),
+        i.e. the response is a failure of the API even if its body is json """
+    if status is not None and (status >= 500 or status == 429):
+        raise FixerioApiError('The fixer.io API responded with HTTP status {}'.format(status), status=status)
+
+
+def fetch_json(url, params=None, session=None, timeout=DEFAULT_TIMEOUT, metrics=None) -> dict:
+    """ Performs a GET request on url and returns the decoded json body, raising
+        FixerioApiError if it failed with a server error or rate limiting once retried.
+        The request is recorded in metrics (a metrics.Metrics) if given """
+    if session is None:
+        session = get_session()
+    if metrics is None:
+        response = session.get(url, params=params, timeout=timeout)
+        check_status(response.status_code)
+        return response.json()
+    start = time.perf_counter()
+    response = None
+    try:
+        response = session.get(url, params=params, timeout=timeout)
+        check_status(response.status_code)
+        json_data = response.json()
+    except Exception as e:
+        metrics.record_request(url, time.perf_counter() - start, getattr(response, 'status_code', None),
+                               len(response.content) if response is not None else 0, error=e)
+        raise
+    metrics.record_request(url, time.perf_counter() - start, response.status_code, len(response.content),
+                           json_data)
+    return json_data
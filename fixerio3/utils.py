@@ -1,5 +1,14 @@
+import asyncio
+import gzip
+import io
 import json
+import os
 import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from fixerio3.exceptions import FixerioException
 
 ERROR_CODES = {
@@ -22,10 +31,53 @@ ERROR_CODES = {
     505: 'The specified timeframe is too long, exceeding 365 days. [timeseries, fluctuation]'}
 
 
+@contextmanager
+def atomic_write(file, mode='w'):
+    """
+    Opens a temporary file next to 'file' for writing and renames it to 'file' once the
+    block exits without an exception, so readers never see a partially written file
+    """
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file)), prefix='.fixerio3-')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(temp, file)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def _open_text(file, mode='r'):
+    """ Opens a text file for reading or writing, gzip compressed if its name ends with '.gz' """
+    if file.endswith('.gz'):
+        return gzip.open(file, mode + 't', encoding='utf-8', newline='')
+    return open(file, mode, encoding='utf-8', newline='')
+
+
+@contextmanager
+def _atomic_text_writer(file):
+    """ atomic_write for text, gzip compressing the output if the file name ends with '.gz' """
+    if file.endswith('.gz'):
+        with atomic_write(file, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as compressed:
+                with io.TextIOWrapper(compressed, encoding='utf-8', newline='') as f:
+                    yield f
+    else:
+        with atomic_write(file, 'w') as f:
+            yield f
+
+
+def _iter_nested(data):
+    """ Yields (base, date, rates) for every table of a nested {base: {date: rates}} dictionary """
+    for base in data:
+        for date in data[base]:
+            yield base, date, data[base][date]
+
+
 def write_to_file(data=None, file=None, wformat=None):
     """
-    Writes cached data to a file in JSON or CSV format.
-    If the specified file name already exists, it is overwritten
+    Writes cached data to a file in JSON or CSV format (gzip compressed if the file name
+    ends with '.gz'). If the specified file name already exists, it is atomically replaced
 
     :param data: JSON data to write to file
     :param file: name of the file to write the cached data to
@@ -34,21 +86,52 @@ def write_to_file(data=None, file=None, wformat=None):
     """
     if data is None:
         raise Exception('Data missing. Please specify the data to write to file.')
+    write_stream(_iter_nested(data), file, wformat)
+
+
+def write_stream(tables=None, file=None, wformat=None):
+    """
+    Writes (base, date, rates) tables to a file in JSON or CSV format one table at a time,
+    without building the whole output in memory. For JSON the tables of each base must be
+    consecutive. The file is gzip compressed if its name ends with '.gz' and, if it already
+    exists, atomically replaced
+
+    :param tables: iterable of (base, date, rates) tuples
+    :param file: name of the file to write to
+    :param wformat: output format. Options are 'json' or 'csv'
+    :return: None
+    """
+    if tables is None:
+        raise Exception('Data missing. Please specify the data to write to file.')
     if file is None:
         raise Exception('File name missing. Please specify the name of a file to write to.')
+    if wformat not in ('json', 'csv'):
+        raise ValueError("Please enter a valid write format. Supported values are 'json' (default), and 'csv'")
 
-    with open(file, 'w') as f:
-        if wformat == 'json':
-            json.dump(data, f, ensure_ascii=False)
-        elif wformat == 'csv':
-            f.write(_json_to_csv(data))
-        else:
-            raise ValueError("Please enter a valid write format. Supported values are 'json' (default), and 'csv'")
+    with _atomic_text_writer(file) as f:
+        if wformat == 'csv':
+            for base, date, rates in tables:
+                f.write('base,date,' + base + ',' + date + '\n')
+                f.write(''.join(x + ',' + str(rates[x]) + '\n' for x in rates))
+            return
+        current = None
+        f.write('{')
+        for base, date, rates in tables:
+            if base != current:
+                if current is not None:
+                    f.write('},')
+                f.write(json.dumps(base, ensure_ascii=False) + ':{')
+                current = base
+            else:
+                f.write(',')
+            f.write(json.dumps(date) + ':' + json.dumps(dict(rates), ensure_ascii=False))
+        f.write('}}' if current is not None else '}')
 
 
 def read_from_file(file=None, rformat=None):
     """
-    Reads cached data from a file in JSON or CSV format
+    Reads cached data from a file in JSON or CSV format (gzip compressed if the file name
+    ends with '.gz')
 
     :param file: name of the file to read from
     :param rformat: format of the file being read
@@ -57,7 +140,7 @@ def read_from_file(file=None, rformat=None):
     if file is None:
         raise Exception('File name missing. Please specify the name of a file to read from.')
 
-    with open(file, 'r') as f:
+    with _open_text(file, 'r') as f:
         contents = f.read()
         if rformat == 'json':
             return json.loads(contents)
@@ -67,45 +150,460 @@ def read_from_file(file=None, rformat=None):
             raise ValueError("Please enter a valid rformat. Valid values are 'json', 'numpy', and 'csv'.")
 
 
+def read_stream(file=None, rformat=None):
+    """
+    Reads cached data from a file in JSON or CSV format one table at a time, so that files
+    larger than memory can be loaded. The file is decompressed if its name ends with '.gz'
+
+    :param file: name of the file to read from
+    :param rformat: format of the file being read. Options are 'json' or 'csv'
+    :return: a generator of (base, date, rates) tuples
+    """
+    if file is None:
+        raise Exception('File name missing. Please specify the name of a file to read from.')
+    if rformat not in ('json', 'csv'):
+        raise ValueError("Please enter a valid rformat. Valid values are 'json' and 'csv'.")
+
+    with _open_text(file, 'r') as f:
+        if rformat == 'json':
+            yield from _iter_json(f)
+        else:
+            yield from _iter_csv(f)
+
+
+_CSV_BASE_DATE = re.compile(r'base,date')
+_CSV_CURRENCY = re.compile(r'[A-Z]{3},[0-9.eE+-]+')
+
+
+def _iter_csv(lines):
+    """ Yields (base, date, rates) for every table of properly formatted csv lines """
+    base = None
+    date = None
+    rates = None
+    for line in lines:
+        if _CSV_BASE_DATE.match(line) is not None:
+            if rates is not None:
+                yield base, date, rates
+            base, date = line.rstrip('\r\n').split(',')[2:]
+            rates = dict()
+        elif rates is not None and _CSV_CURRENCY.match(line) is not None:
+            curr, rate = line.rstrip('\r\n').split(',', 1)
+            rates[curr] = float(rate)
+    if rates is not None:
+        yield base, date, rates
+
+
+class _JsonReader:
+    """ Reads the values of a json document from a text file incrementally """
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+
+    def _fill(self):
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            raise FixerioException('Unexpected end of json file.')
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+
+    def char(self):
+        """ Consumes and returns the next non whitespace character """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                self._pos += 1
+                return self._buffer[self._pos - 1]
+            self._fill()
+
+    def peek(self):
+        """ Returns the next non whitespace character without consuming it """
+        c = self.char()
+        self._pos -= 1
+        return c
+
+    def expect(self, expected):
+        c = self.char()
+        if c != expected:
+            raise FixerioException('Invalid json file: expected {!r}, found {!r}.'.format(expected, c))
+
+    def value(self):
+        """ Consumes and returns the next string or object """
+        self.peek()
+        while True:
+            try:
+                value, self._pos = self._decoder.raw_decode(self._buffer, self._pos)
+                return value
+            except ValueError:
+                self._fill()
+
+
+def _iter_json(f, chunk_size=1 << 16):
+    """ Yields (base, date, rates) for every table of a {base: {date: rates}} json file,
+        read chunk_size characters at a time """
+    reader = _JsonReader(f, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        base = reader.value()
+        reader.expect(':')
+        reader.expect('{')
+        if reader.peek() == '}':
+            reader.char()
+        else:
+            while True:
+                date = reader.value()
+                reader.expect(':')
+                yield base, date, reader.value()
+                if reader.char() == '}':
+                    break
+        if reader.char() == '}':
+            return
+
+
 def _csv_to_json(data=None):
     """ Takes properly formatted csv data and returns it in json format """
     converted = dict()
-    base_date = re.compile(r'base,date')
-    currency = re.compile(r'[A-Z]{3},{1}[0-9,.]+')
-    base = None
-    date = None
-    for line in data.splitlines():
-        if base_date.match(line) is not None:
-            base, date = line.split(',')[2:]
-            if base not in converted:
-                converted[base] = dict()
-            if date not in converted[base]:
-                converted[base][date] = dict()
-            continue
-        elif currency.match(line) is not None:
-            curr, rate = line.split(',', 1)
-            converted[base][date][curr] = rate
-            continue
-    else:
-        return converted
+    for base, date, rates in _iter_csv(data.splitlines()):
+        converted.setdefault(base, dict())[date] = rates
+    return converted
 
 
 def _json_to_csv(data=None):
     """ Takes properly formatted json data and returns it in csv format """
-    output = ''
+    output = []
     if data is None:
         raise FixerioException('Data missing, please input json data to convert to csv.')
     for x in data:
         for y in data[x]:
-            output += 'base,date,' + x + ',' + y + '\n'
+            output.append('base,date,' + x + ',' + y + '\n')
             for z in data[x][y]:
-                output += z + ',' + str(data[x][y][z]) + '\n'
-    return output
+                output.append(z + ',' + str(data[x][y][z]) + '\n')
+    return ''.join(output)
+
+
+class _Batch:
+    """ A batch of calls, shared by every caller of Batcher.do whose items it covers """
+    __slots__ = ('items', 'done', 'result', 'error')
+
+    def __init__(self, items, done=None):
+        self.items = items
+        self.done = threading.Event() if done is None else done
+        self.result = None
+        self.error = None
+
+    def add(self, items):
+        if self.items is not None:
+            self.items = None if items is None else self.items | items
+
+    def covers(self, items):
+        return self.items is None or (items is not None and items <= self.items)
+
+
+class Batcher:
+    """
+    Merges concurrent calls made for the same key into a single call of fn(key, items)
+    with the union of the items they asked for (None standing for every item), whose
+    result (or exception) every caller shares. Callers whose items are covered by a call
+    already in flight for the key wait for it instead of calling fn. A call made while
+    another call for the key is in flight waits 'window' seconds for more calls to merge
+    with; any other call is made at once, so a lone call never waits. Calls for every item
+    (None) do not wait since nothing could be merged into them, and with window=0 only the
+    calls covered by a call in flight are merged.
+    'calls' counts the calls actually made and 'coalesced' the calls served by another one.
+    """
+
+    def __init__(self, window=0.0):
+        self.window = window
+        self._lock = threading.Lock()
+        self._open = dict()
+        self._flying = dict()
+        self.calls = 0
+        self.coalesced = 0
+
+    def _start(self, key, batch):
+        self._flying.setdefault(key, []).append(batch)
+
+    def _finish(self, key, batch):
+        flying = self._flying[key]
+        flying.remove(batch)
+        if not flying:
+            del self._flying[key]
+
+    def do(self, key, items, fn):
+        """ Returns fn(key, items) of the batch the call joined (items: a frozenset or None) """
+        with self._lock:
+            batch = self._open.get(key)
+            if batch is not None:
+                batch.add(items)
+            else:
+                batch = next((x for x in self._flying.get(key, ()) if x.covers(items)), None)
+            leader = batch is None
+            if leader:
+                batch = _Batch(items)
+                self.calls += 1
+                wait = self.window > 0 and items is not None and key in self._flying
+                if wait:
+                    self._open[key] = batch
+                else:
+                    self._start(key, batch)
+            else:
+                self.coalesced += 1
+        if not leader:
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            return batch.result
+        if wait:
+            time.sleep(self.window)
+            with self._lock:
+                del self._open[key]
+                self._start(key, batch)
+        try:
+            batch.result = fn(key, batch.items)
+            return batch.result
+        except BaseException as e:
+            batch.error = e
+            raise
+        finally:
+            with self._lock:
+                self._finish(key, batch)
+            batch.done.set()
+
+
+class AsyncBatcher(Batcher):
+    """
+    asyncio counterpart of Batcher: do is a coroutine and fn(key, items) returns an
+    awaitable. The batches are shared by the tasks of one event loop.
+    """
+
+    async def do(self, key, items, fn):
+        """ Returns await fn(key, items) of the batch the call joined (see Batcher.do) """
+        with self._lock:
+            batch = self._open.get(key)
+            if batch is not None:
+                batch.add(items)
+            else:
+                batch = next((x for x in self._flying.get(key, ()) if x.covers(items)), None)
+            leader = batch is None
+            if leader:
+                batch = _Batch(items, asyncio.Event())
+                self.calls += 1
+                wait = self.window > 0 and items is not None and key in self._flying
+                if wait:
+                    self._open[key] = batch
+                else:
+                    self._start(key, batch)
+            else:
+                self.coalesced += 1
+        if not leader:
+            await batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            return batch.result
+        if wait:
+            await asyncio.sleep(self.window)
+            with self._lock:
+                del self._open[key]
+                self._start(key, batch)
+        try:
+            batch.result = await fn(key, batch.items)
+            return batch.result
+        except BaseException as e:
+            batch.error = e
+            raise
+        finally:
+            with self._lock:
+                self._finish(key, batch)
+            batch.done.set()
+
+
+class CacheBackend:
+    """
+    Interface of the cache backends used by Fixerio (see the 'cache' parameter).
+    A backend stores rate tables keyed by (base, date), each with an optional 'expires'
+    timestamp (seconds since the epoch) after which it must no longer be returned, and
+    counts its hits and misses. Cache is the in-memory backend, backends.SQLiteCache and
+    backends.RedisCache share tables between processes.
+    """
+
+    def get(self, base, date):
+        """ Returns the {symbol: rate} table of base on date (counting a hit), None if not cached
+            (counting a miss) """
+        raise NotImplementedError
+
+    def peek(self, base, date):
+        """ Same as get but without counting the lookup """
+        raise NotImplementedError
+
+    def count(self, base, date, hit):
+        """ Counts a lookup of the table of base on date made with peek as a hit or a miss,
+            e.g. a miss when the table does not hold every symbol asked for """
+        raise NotImplementedError
+
+    def set(self, base, date, rates, expires=None):
+        """ Stores the table of base on date """
+        raise NotImplementedError
+
+    def delete(self, base, date):
+        """ Removes the table of base on date if it is cached """
+        raise NotImplementedError
+
+    def clear(self):
+        """ Removes every table """
+        raise NotImplementedError
+
+    def items(self):
+        """ Returns a list of ((base, date), rates) pairs of every cached table, sorted by key """
+        raise NotImplementedError
+
+    def stats(self):
+        """ Returns a dictionary of counters, at least 'hits' and 'misses' """
+        raise NotImplementedError
+
+    def close(self):
+        """ Releases the connections of the backend (called by Fixerio.close). The backend
+            reconnects if it is used again """
+        pass
+
+    def as_dict(self):
+        """ Returns the cached tables as a nested dictionary: {base: {date: {symbol: rate}}} """
+        nested = dict()
+        for (base, date), rates in self.items():
+            nested.setdefault(base, dict())[date] = dict(rates)
+        return nested
+
+
+class Cache(CacheBackend):
+    """
+    In-memory cache engine for rate tables keyed by (base, date), stored in a store.RateStore.
+
+    Holds at most max_entries tables and max_memory bytes of rates, evicting the least
+    recently used tables first; None means unbounded. A table stored with an 'expires'
+    timestamp (seconds since the epoch) is dropped once that time has passed, tables
+    stored without one never expire. Tables held by a read-only layer of the store (see
+    RateStore) are served as well but are neither evicted, expired nor counted in memory.
+    Hits, misses, evictions and expirations are counted and returned by stats(), and
+    on_evict(base, date) (if given) is called for every evicted table.
+    """
+
+    def __init__(self, store, max_entries=None, max_memory=None, clock=time.time, on_evict=None):
+        self.max_entries = max_entries
+        self.max_memory = max_memory
+        self._store = store
+        self._clock = clock
+        self._on_evict = on_evict
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._expires = dict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def store(self):
+        return self._store
+
+    @property
+    def memory(self):
+        """ Bytes used by the rows of the cached tables (see RateStore.nbytes) """
+        return self._store.nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.peek(*key) is not None
+
+    def _expired(self, key):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            return True
+        return False
+
+    def _remove(self, key):
+        del self._entries[key]
+        self._expires.pop(key, None)
+        self._store.delete(*key)
+
+    def _lookup(self, key):
+        if key in self._entries:
+            return None if self._expired(key) else self._store.get(*key)
+        return self._store.get(*key)
+
+    def get(self, base, date):
+        """ Returns the table of base on date and marks it as recently used, None if not cached """
+        with self._lock:
+            rates = self._lookup((base, date))
+            self.count(base, date, rates is not None)
+            return rates
+
+    def peek(self, base, date):
+        """ Same as get but neither counts the lookup nor changes the eviction order """
+        with self._lock:
+            return self._lookup((base, date))
+
+    def count(self, base, date, hit):
+        """ Counts a lookup made with peek, marking the table as recently used on a hit """
+        with self._lock:
+            if not hit:
+                self.misses += 1
+                return
+            if (base, date) in self._entries:
+                self._entries.move_to_end((base, date))
+            self.hits += 1
+
+    def set(self, base, date, rates, expires=None):
+        """ Stores the table of base on date, evicting least recently used tables if needed """
+        key = (base, date)
+        with self._lock:
+            self._store.set(base, date, rates)
+            self._entries[key] = True
+            self._entries.move_to_end(key)
+            self._expires.pop(key, None)
+            if expires is not None:
+                self._expires[key] = expires
+            while self._entries and ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                                     (self.max_memory is not None and self.memory > self.max_memory)):
+                evicted = next(iter(self._entries))
+                self._remove(evicted)
+                self.evictions += 1
+                if self._on_evict is not None:
+                    self._on_evict(*evicted)
+
+    def delete(self, base, date):
+        """ Removes the table of base on date if it is cached """
+        with self._lock:
+            if (base, date) in self._entries:
+                self._remove((base, date))
+
+    def clear(self):
+        """ Removes every table (statistics are kept) """
+        with self._lock:
+            self._entries.clear()
+            self._expires.clear()
+            self._store.clear()
 
-# TODO use new caching function
-class Cache:
-    def __init__(self):
-        _cache = dict()
+    def items(self):
+        """ Returns a list of ((base, date), rates) pairs of the tables that have not expired """
+        with self._lock:
+            items = []
+            for key in sorted(self._store.keys()):
+                rates = self._lookup(key)
+                if rates is not None:
+                    items.append((key, rates))
+            return items
 
-    def __call__(self, *args, **kwargs):
-        pass
\ No newline at end of file
+    def stats(self):
+        """ Returns the hit, miss, eviction and expiration counters and the cache size """
+        with self._lock:
+            return {'entries': len(self._entries), 'memory': self.memory, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions, 'expirations': self.expirations}
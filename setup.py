@@ -41,5 +41,12 @@ setup(name='fixerio3',
       install_requires=[
           'requests',
       ],
+      extras_require={
+          'async': ['aiohttp'],
+          'redis': ['redis'],
+      },
+      entry_points={
+          'console_scripts': ['fixerio3 = fixerio3.cli:main'],
+      },
       include_package_data=True,
       zip_safe=False)